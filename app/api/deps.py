@@ -2,28 +2,105 @@ import httpx
 from app.schemas.user import UserObject
 from app.utils.redis_client import redis_client as redis_client_instance
 from app.utils.erp_db import PostgresDB
+from app.utils.cache import cache
 from fastapi.security import APIKeyHeader
 from ..config import settings, odoo
 import logging
 from fastapi import APIRouter, Request, Header, HTTPException, status, Depends
 import jwt
+from redis.exceptions import RedisError
+import hashlib
 
 # Thay thế HTTPBearer bằng APIKeyHeader
 api_key_header = APIKeyHeader(name="Authorization", auto_error=True)
 logger = logging.getLogger(__name__)
 
 
+TOKEN_SESSION_EXPIRE = 2592000  # 30 ngày
+TOKEN_DIGEST_SIZE = 16  # 16 byte -> 32 ký tự hex
+
+
+def get_token_digest(token):
+    """Digest độ dài cố định của JWT, dùng làm key phiên thay cho nguyên token"""
+    return hashlib.blake2b(token.encode(), digest_size=TOKEN_DIGEST_SIZE).hexdigest()
+
+
 def get_token_key(token):
+    return "{}::{}".format(settings.TOKEN_PREFIX, get_token_digest(token))
+
+
+def get_legacy_token_key(token):
+    """Key phiên kiểu cũ chứa nguyên JWT, chỉ dùng để chuyển đổi các phiên đang còn hạn"""
     return "{}::{}".format(settings.TOKEN_PREFIX, token)
 
 
+def get_user_session_key(uid):
+    """
+    Index phiên theo user: lưu thế hệ (generation) phiên hiện tại của user.
+    Mỗi phiên ghi lại thế hệ lúc tạo, tăng giá trị này sẽ thu hồi toàn bộ phiên cũ trong O(1).
+    """
+    return "{}::user:{}".format(settings.TOKEN_PREFIX, uid)
+
+
+async def migrate_legacy_session(token: str):
+    """
+    Chuyển phiên lưu theo key cũ (nguyên JWT) sang key digest, giữ nguyên TTL còn lại.
+    Phiên cũ luôn thuộc thế hệ 0 nên vẫn bị thu hồi nếu user đã đăng xuất toàn bộ.
+    Có thể bỏ sau 30 ngày kể từ khi triển khai (các key cũ đã hết hạn).
+    """
+    legacy_key = get_legacy_token_key(token)
+    async with redis_client_instance.pipeline() as pipe:
+        pipe.ttl(legacy_key)
+        pipe.getdel(legacy_key)
+    ttl, legacy_value = pipe.results
+    if legacy_value is None:
+        return None
+
+    session = {
+        'login': str(legacy_value).split('login:', 1)[-1],
+        'gen': 0,
+    }
+    await redis_client_instance.set(
+        get_token_key(token), session, expiry=ttl if ttl > 0 else TOKEN_SESSION_EXPIRE
+    )
+    logger.info("Migrated legacy token session to digest key")
+    return session
+
+
 async def parse_token(token: str):
-    if not await redis_client_instance.exists(get_token_key(token)):
+    try:
+        payload = jwt.decode(token, settings.TOKEN_PREFIX, algorithms=["HS256"])
+    except jwt.PyJWTError:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+
+    try:
+        # Phiên và thế hệ phiên hiện tại của user trong một round trip
+        session, generation = await redis_client_instance.mget([
+            get_token_key(token),
+            get_user_session_key(payload.get('uid')),
+        ])
+        if session is None:
+            session = await migrate_legacy_session(token)
+    except RedisError as e:
+        # Redis mất kết nối/đang failover: báo tạm thời không khả dụng thay vì 500
+        logger.error(f"Redis unavailable while checking token session: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Hệ thống đang bận, vui lòng thử lại sau",
+        )
+    if not isinstance(session, dict):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token exists",
         )
-    return jwt.decode(token, settings.TOKEN_PREFIX, algorithms=["HS256"])
+
+    # Phiên thuộc thế hệ cũ hơn thế hệ hiện tại của user -> đã bị thu hồi
+    if int(session.get('gen') or 0) != int(generation or 0):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token revoked",
+        )
+    return payload
 
 
 
@@ -62,7 +139,9 @@ async def verify_signature(
         )
     return True
 
+@cache(ttl=3600, prefix="field_selection", stale_ttl=86400)
 async def get_value_fields_selection(model, fields):
+    # Giá trị selection gần như không đổi: hết hạn thì trả bản cũ và gọi lại Odoo ở nền
     result = await odoo.call_method_not_record(
         model='res.users',
         method='get_select_value_by_model',
@@ -3,7 +3,7 @@ import logging
 from typing import List, Optional, Dict, Any, Annotated
 from app.schemas.common_schema import CommonHeaderPortal
 from app.schemas.authorization_schema import RegisterRequest,DeviceLoginRequest, LoginRequest, SendOTPRequest, VerifyOTPRequest, ZaloMiniappLoginRequest, ZaloPhoneTokenRequest
-from app.api.deps import verify_signature
+from app.api.deps import verify_signature, get_current_user, api_key_header
 from .authorization_service import AuthorizationService
 
 logger = logging.getLogger(__name__)
@@ -97,3 +97,33 @@ async def zalo_miniapp_login(
     logger.info("Zalo Mini App login/register result success=%s", result.get("success"))
     return result
 
+
+@router.post("/logout", summary="Đăng xuất phiên hiện tại")
+async def logout(
+        token: str = Depends(api_key_header),
+        current_user=Depends(get_current_user),
+):
+    """
+    Thu hồi token đang dùng để gọi API
+    """
+    await AuthorizationService.revoke_token(token)
+    return {
+        "success": True,
+        "message": "Đăng xuất thành công",
+        "data": None
+    }
+
+
+@router.post("/logout-all", summary="Đăng xuất khỏi tất cả thiết bị")
+async def logout_all(
+        current_user=Depends(get_current_user),
+):
+    """
+    Thu hồi toàn bộ phiên đăng nhập của user hiện tại trên mọi thiết bị
+    """
+    await AuthorizationService.revoke_user_sessions(current_user.uid)
+    return {
+        "success": True,
+        "message": "Đã đăng xuất khỏi tất cả thiết bị",
+        "data": None
+    }
@@ -11,9 +11,14 @@ import jwt
 import datetime
 from datetime import timedelta
 from app.config import settings
-from app.api.deps import get_token_key
-
-REDIS_EXPIRE = 2592000
+from app.api.deps import (
+    get_token_key,
+    get_legacy_token_key,
+    get_user_session_key,
+    TOKEN_SESSION_EXPIRE,
+)
+
+REDIS_EXPIRE = TOKEN_SESSION_EXPIRE
 OTP_EXPIRE = 180  # 3 phút
 OTP_REDIS_PREFIX = "otp:"
 OTP_RATE_LIMIT_PREFIX = "otp_rate_limit:"
@@ -38,13 +43,34 @@ class AuthorizationService:
         # Tạo JWT token
         token = jwt.encode(payload, settings.TOKEN_PREFIX, algorithm="HS256")
 
-        # Lưu vào Redis
-        redis_key = get_token_key(token)
-        await redis_client_instance.set(redis_key, f"login:{user['login']}")
-        await redis_client_instance.expire(redis_key, REDIS_EXPIRE)
+        # Lưu phiên vào Redis theo digest của token, SET kèm TTL trong một lệnh
+        generation = await redis_client_instance.get(get_user_session_key(user["uid"]))
+        session = {
+            'login': user['login'],
+            'gen': int(generation or 0),
+        }
+        await redis_client_instance.set(get_token_key(token), session, expiry=REDIS_EXPIRE)
 
         return token
 
+    @classmethod
+    async def revoke_token(cls, token: str):
+        """
+        Thu hồi một phiên đăng nhập (xóa cả key digest và key kiểu cũ nếu còn)
+        """
+        await redis_client_instance.delete(get_token_key(token), get_legacy_token_key(token))
+        return True
+
+    @classmethod
+    async def revoke_user_sessions(cls, uid: int):
+        """
+        Thu hồi toàn bộ phiên của user trong O(1) bằng cách tăng thế hệ phiên.
+        Key thế hệ không đặt TTL để luôn sống lâu hơn mọi phiên đang còn hạn.
+        """
+        generation = await redis_client_instance.incr(get_user_session_key(uid))
+        logger.info(f"Revoked all sessions of user {uid}, generation={generation}")
+        return generation
+
 
     @classmethod
     async def register_user_portal(cls, data: dict):
@@ -177,11 +203,17 @@ class AuthorizationService:
         - 1 số điện thoại: tối đa 3 lần / 5 phút, tối đa 5-6 lần / 24 giờ
         - 1 IP: tối đa 10-20 request / phút
         """
-        # Check rate limit cho phone: 3 lần / 5 phút
         phone_5min_key = f"{OTP_RATE_LIMIT_PREFIX}phone:{phone}:5min"
-        phone_5min_count = await redis_client_instance.get(phone_5min_key)
-        phone_5min_count = int(phone_5min_count) if phone_5min_count else 0
-        
+        phone_24h_key = f"{OTP_RATE_LIMIT_PREFIX}phone:{phone}:24h"
+        ip_1min_key = f"{OTP_RATE_LIMIT_PREFIX}ip:{client_ip}:1min" if client_ip else None
+
+        # Đọc tất cả counter trong một round trip
+        counters = await redis_client_instance.mget(
+            [phone_5min_key, phone_24h_key] + ([ip_1min_key] if ip_1min_key else [])
+        )
+        phone_5min_count, phone_24h_count = (int(count) if count else 0 for count in counters[:2])
+
+        # Check rate limit cho phone: 3 lần / 5 phút
         if phone_5min_count >= 3:
             raise HTTPException(
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
@@ -189,10 +221,6 @@ class AuthorizationService:
             )
         
         # Check rate limit cho phone: 5-6 lần / 24 giờ
-        phone_24h_key = f"{OTP_RATE_LIMIT_PREFIX}phone:{phone}:24h"
-        phone_24h_count = await redis_client_instance.get(phone_24h_key)
-        phone_24h_count = int(phone_24h_count) if phone_24h_count else 0
-        
         if phone_24h_count >= 6:
             raise HTTPException(
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
@@ -200,10 +228,8 @@ class AuthorizationService:
             )
         
         # Check rate limit cho IP: 15 request / phút (chọn giữa 10-20)
-        if client_ip:
-            ip_1min_key = f"{OTP_RATE_LIMIT_PREFIX}ip:{client_ip}:1min"
-            ip_1min_count = await redis_client_instance.get(ip_1min_key)
-            ip_1min_count = int(ip_1min_count) if ip_1min_count else 0
+        if ip_1min_key:
+            ip_1min_count = int(counters[2]) if counters[2] else 0
             
             if ip_1min_count >= 15:
                 raise HTTPException(
@@ -211,12 +237,12 @@ class AuthorizationService:
                     detail="Quá nhiều yêu cầu từ IP này. Vui lòng đợi 1 phút trước khi thử lại."
                 )
         
-        # Tăng counter (chỉ set expiry lần đầu khi key mới được tạo)
-        await redis_client_instance.incr(phone_5min_key, expiry=300)  # 5 phút
-        await redis_client_instance.incr(phone_24h_key, expiry=86400)  # 24 giờ
-        
-        if client_ip:
-            await redis_client_instance.incr(ip_1min_key, expiry=60)  # 1 phút
+        # Tăng counter (chỉ set expiry lần đầu khi key mới được tạo), tất cả trong một round trip
+        async with redis_client_instance.pipeline() as pipe:
+            pipe.incr(phone_5min_key, expiry=300)  # 5 phút
+            pipe.incr(phone_24h_key, expiry=86400)  # 24 giờ
+            if ip_1min_key:
+                pipe.incr(ip_1min_key, expiry=60)  # 1 phút
         
         return True
 
@@ -295,6 +321,27 @@ class AuthorizationService:
                 detail=f"Lỗi hệ thống: {str(e)}"
             )
 
+    @classmethod
+    async def consume_otp(cls, phone: str, otp_code: str):
+        """
+        So sánh và xóa OTP nguyên tử trong Redis: chỉ xóa khi mã đúng, mã sai thì OTP giữ nguyên
+        để user nhập lại (không ghi đè OTP mới được gửi trong lúc kiểm tra).
+        """
+        redis_key = f"{OTP_REDIS_PREFIX}{phone}"
+        matched = await redis_client_instance.delete_if_equals(redis_key, str(otp_code).strip())
+
+        if matched is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Mã OTP không tồn tại hoặc đã hết hạn. Vui lòng yêu cầu mã mới."
+            )
+        if not matched:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Mã OTP không chính xác"
+            )
+        return True
+
     @classmethod
     async def verify_otp(cls, data: dict):
         """
@@ -311,29 +358,8 @@ class AuthorizationService:
                     detail="Số điện thoại và mã OTP không được để trống"
                 )
             
-            # Lấy OTP từ Redis
-            redis_key = f"{OTP_REDIS_PREFIX}{phone}"
-            stored_otp = await redis_client_instance.get(redis_key)
-            
-            if not stored_otp:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Mã OTP không tồn tại hoặc đã hết hạn. Vui lòng yêu cầu mã mới."
-                )
-            
-            # Đảm bảo stored_otp và otp_code đều là string để so sánh
-            stored_otp = str(stored_otp).strip()
-            otp_code = str(otp_code).strip()
-            
-            # So sánh OTP
-            if stored_otp != otp_code:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Mã OTP không chính xác"
-                )
-            
-            # Xóa OTP sau khi xác thực thành công
-            await redis_client_instance.delete(redis_key)
+            # Lấy và xóa OTP khỏi Redis
+            await cls.consume_otp(phone, otp_code)
             
             logger.info(f"Xác thực OTP thành công cho số điện thoại: {phone}")
             
@@ -1,15 +1,25 @@
-from fastapi import APIRouter, HTTPException, Query, Path,Depends,Header
+from fastapi import APIRouter, HTTPException, Query, Path,Depends,Header, Request, Response
 from typing import Optional
 import logging
 from app.api.deps import verify_signature
 from .blog_service import BlogService
 from typing import List, Optional, Dict, Any, Annotated
 from app.schemas.common_schema import CommonHeaderPortal
+from app.utils.conditional import check_not_modified, conditional_get
+from .blog_rankings import RANKING_VERSION_KEY
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Lượt xem không đổi write_date nên bản 304 có thể mang số lượt xem cũ, chấp nhận được
+# (nếu đưa lượt xem vào ETag thì cứ mỗi lô ghi lượt xem toàn bộ cache phía client mất hiệu lực)
+BLOG_TABLES = ("blog_post", "blog_blog")
+blog_conditional = conditional_get(*BLOG_TABLES)
+# Xếp hạng/thống kê đổi theo lượt xem: thêm version của bảng xếp hạng (đổi khi dựng lại và mỗi lô
+# lượt xem được ghi). Bảng xếp hạng chưa sẵn sàng thì không có version và luôn trả bản mới.
+ranking_conditional = conditional_get(*BLOG_TABLES, version_keys=[RANKING_VERSION_KEY])
+
 
 @router.get("/posts", summary="Lấy danh sách bài viết blog")
 async def get_blog_posts(
@@ -18,13 +28,14 @@ async def get_blog_posts(
         limit: int = 10,
         page: int = 1,
         _=Depends(verify_signature),
+        _conditional=Depends(blog_conditional),
 ):
     """
     Lấy danh sách bài viết blog từ Odoo
 
     - **page**: Trang hiện tại (mặc định: 1)
     - **limit**: Số bài viết mỗi trang (mặc định: 10, tối đa: 100)
-    - **search**: Từ khóa tìm kiếm (tùy chọn)
+    - **search**: Từ khóa tìm kiếm (tùy chọn), không phân biệt dấu; kết quả xếp theo độ liên quan
 
     Returns:
         - success: Trạng thái thành công
@@ -33,6 +44,7 @@ async def get_blog_posts(
         - limit: Số bài viết mỗi trang
         - total: Tổng số bài viết
         - total_pages: Tổng số trang
+        - search_mode: "fulltext" hoặc "trigram" (chỉ khi có search), mỗi bài có thêm rank và headline
     """
     try:
         result = await BlogService.get_blog_posts(
@@ -47,7 +59,7 @@ async def get_blog_posts(
                 detail=result["error"]
             )
 
-        return {
+        response = {
             "success": True,
             "message": "Lấy danh sách bài viết thành công",
             "data": result["data"],
@@ -56,6 +68,9 @@ async def get_blog_posts(
             "total": result["total"],
             "total_pages": result["total_pages"]
         }
+        if "search_mode" in result:
+            response["search_mode"] = result["search_mode"]
+        return response
 
     except HTTPException:
         raise
@@ -67,8 +82,85 @@ async def get_blog_posts(
         )
 
 
+# Khai báo trước /posts/{post_id}, nếu không "popular"/"trending" bị hiểu là post_id
+@router.get("/posts/popular", summary="Lấy bài viết phổ biến")
+async def get_popular_posts(
+    limit: int = Query(10, ge=1, le=50, description="Số bài viết phổ biến (tối đa 50)"),
+    _conditional=Depends(ranking_conditional),
+):
+    """
+    Lấy danh sách bài viết phổ biến (theo lượt xem)
+    
+    - **limit**: Số bài viết phổ biến cần lấy (mặc định: 10, tối đa: 50)
+    
+    Returns:
+        - success: Trạng thái thành công
+        - data: Danh sách bài viết phổ biến
+        - total: Tổng số bài viết
+        - limit: Số bài viết được lấy
+    """
+    try:
+        posts = await BlogService.get_popular_posts(limit=limit)
+        
+        return {
+            "success": True,
+            "message": "Lấy bài viết phổ biến thành công",
+            "data": posts,
+            "total": len(posts),
+            "limit": limit
+        }
+        
+    except Exception as e:
+        logger.error(f"Error in get_popular_posts: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail="Có lỗi xảy ra khi lấy bài viết phổ biến"
+        )
+
+
+@router.get("/posts/trending", summary="Lấy bài viết trending")
+async def get_trending_posts(
+    days: int = Query(7, ge=1, le=30, description="Số ngày gần đây (tối đa 30)"),
+    limit: int = Query(10, ge=1, le=50, description="Số bài viết (tối đa 50)"),
+    _conditional=Depends(ranking_conditional),
+):
+    """
+    Lấy bài viết trending trong X ngày gần đây
+    
+    - **days**: Số ngày gần đây (mặc định: 7, tối đa: 30)
+    - **limit**: Số bài viết (mặc định: 10, tối đa: 50)
+    
+    Returns:
+        - success: Trạng thái thành công
+        - data: Danh sách bài viết trending
+        - total: Tổng số bài viết
+        - days: Số ngày đã lọc
+        - limit: Số bài viết được lấy
+    """
+    try:
+        posts = await BlogService.get_trending_posts(days=days, limit=limit)
+        
+        return {
+            "success": True,
+            "message": f"Lấy bài viết trending {days} ngày gần đây thành công",
+            "data": posts,
+            "total": len(posts),
+            "days": days,
+            "limit": limit
+        }
+        
+    except Exception as e:
+        logger.error(f"Error in get_trending_posts: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail="Có lỗi xảy ra khi lấy bài viết trending"
+        )
+
+
 @router.get("/posts/{post_id}", summary="Lấy chi tiết bài viết blog")
 async def get_blog_post_detail(
+    request: Request,
+    response: Response,
     post_id: int = Path(..., gt=0, description="ID của bài viết")
 ):
     """
@@ -82,6 +174,12 @@ async def get_blog_post_detail(
         - related_posts: Danh sách bài viết liên quan (nếu có)
     """
     try:
+        # Client dùng bản đang giữ (304) nhưng vẫn tính lượt xem
+        await check_not_modified(
+            request, response, BLOG_TABLES,
+            on_not_modified=lambda: BlogService._increment_visits(post_id),
+        )
+
         # Lấy chi tiết bài viết
         result = await BlogService.get_blog_post_detail(post_id)
         
@@ -125,45 +223,12 @@ async def get_blog_post_detail(
         )
 
 
-@router.get("/posts/popular", summary="Lấy bài viết phổ biến")
-async def get_popular_posts(
-    limit: int = Query(10, ge=1, le=50, description="Số bài viết phổ biến (tối đa 50)")
-):
-    """
-    Lấy danh sách bài viết phổ biến (theo lượt xem)
-    
-    - **limit**: Số bài viết phổ biến cần lấy (mặc định: 10, tối đa: 50)
-    
-    Returns:
-        - success: Trạng thái thành công
-        - data: Danh sách bài viết phổ biến
-        - total: Tổng số bài viết
-        - limit: Số bài viết được lấy
-    """
-    try:
-        posts = await BlogService.get_popular_posts(limit=limit)
-        
-        return {
-            "success": True,
-            "message": "Lấy bài viết phổ biến thành công",
-            "data": posts,
-            "total": len(posts),
-            "limit": limit
-        }
-        
-    except Exception as e:
-        logger.error(f"Error in get_popular_posts: {str(e)}")
-        raise HTTPException(
-            status_code=500,
-            detail="Có lỗi xảy ra khi lấy bài viết phổ biến"
-        )
-
-
 @router.get("/category/{category_id}/posts", summary="Lấy bài viết theo category")
 async def get_posts_by_category(
     category_id: int = Path(..., gt=0, description="ID của category"),
     page: int = Query(1, ge=1, description="Số trang"),
-    limit: int = Query(10, ge=1, le=100, description="Số bài viết mỗi trang")
+    limit: int = Query(10, ge=1, le=100, description="Số bài viết mỗi trang"),
+    _conditional=Depends(blog_conditional),
 ):
     """
     Lấy bài viết theo category
@@ -217,46 +282,10 @@ async def get_posts_by_category(
         )
 
 
-@router.get("/posts/trending", summary="Lấy bài viết trending")
-async def get_trending_posts(
-    days: int = Query(7, ge=1, le=30, description="Số ngày gần đây (tối đa 30)"),
-    limit: int = Query(10, ge=1, le=50, description="Số bài viết (tối đa 50)")
-):
-    """
-    Lấy bài viết trending trong X ngày gần đây
-    
-    - **days**: Số ngày gần đây (mặc định: 7, tối đa: 30)
-    - **limit**: Số bài viết (mặc định: 10, tối đa: 50)
-    
-    Returns:
-        - success: Trạng thái thành công
-        - data: Danh sách bài viết trending
-        - total: Tổng số bài viết
-        - days: Số ngày đã lọc
-        - limit: Số bài viết được lấy
-    """
-    try:
-        posts = await BlogService.get_trending_posts(days=days, limit=limit)
-        
-        return {
-            "success": True,
-            "message": f"Lấy bài viết trending {days} ngày gần đây thành công",
-            "data": posts,
-            "total": len(posts),
-            "days": days,
-            "limit": limit
-        }
-        
-    except Exception as e:
-        logger.error(f"Error in get_trending_posts: {str(e)}")
-        raise HTTPException(
-            status_code=500,
-            detail="Có lỗi xảy ra khi lấy bài viết trending"
-        )
-
-
 @router.get("/stats/categories", summary="Thống kê theo category")
-async def get_category_stats():
+async def get_category_stats(
+    _conditional=Depends(ranking_conditional),
+):
     """
     Lấy thống kê bài viết theo category
     
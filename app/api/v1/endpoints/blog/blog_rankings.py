@@ -0,0 +1,271 @@
+import logging
+import math
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from redis.exceptions import RedisError
+
+from app.utils.background import background_tasks
+from app.utils.erp_db import PostgresDB
+from app.utils.redis_client import redis_client
+from .blog_visits import (
+    BLOG_VISITS_FLUSH_LOCK_KEY, BLOG_VISITS_FLUSH_LOCK_TTL, acquire_lock, flush_listeners, release_lock,
+)
+
+logger = logging.getLogger(__name__)
+
+# Cùng hash tag để RENAME/ZUNIONSTORE chạy được ở chế độ cluster
+POPULAR_KEY = "{blog_rank}:popular"
+POPULAR_TMP_KEY = "{blog_rank}:popular:tmp"
+TRENDING_KEY = "{blog_rank}:trending"
+TRENDING_EPOCH_KEY = "{blog_rank}:trending_epoch"
+CATEGORY_STATS_KEY = "{blog_rank}:category_stats"
+REFRESHED_AT_KEY = "{blog_rank}:refreshed_at"
+REFRESH_LOCK_KEY = "{blog_rank}:refresh_lock"
+# Đổi sau mỗi lần dựng lại hoặc cộng lô lượt xem, dùng trong ETag của các endpoint xếp hạng
+RANKING_VERSION_KEY = "{blog_rank}:version"
+
+RANKING_REFRESH_INTERVAL = 300  # giây
+RANKING_STALE_AFTER = 3 * RANKING_REFRESH_INTERVAL  # quá hạn thì endpoint quay về query trực tiếp
+RANKING_KEY_TTL = 7 * 86400
+TRENDING_HALF_LIFE = 86400  # giây, lượt xem cũ một ngày chỉ còn nửa trọng số
+TRENDING_REBASE_AFTER = 7 * 86400  # giây, điểm lưu tăng 2^7 rồi mới đưa về mốc mới
+TRENDING_MAX_DAYS = 30  # days tối đa của endpoint trending
+
+PUBLISHED_POSTS_QUERY = '''
+    SELECT bp.id, COALESCE(bp.visits, 0) AS visits, bp.published_date
+    FROM blog_post bp
+    WHERE bp.website_published = true
+'''
+
+CATEGORY_STATS_QUERY = '''
+    SELECT
+        bt.name ->> 'vi_VN' as category_name,
+        COUNT(*) as total_posts,
+        SUM(bp.visits) as total_views,
+        AVG(bp.visits) as avg_views_per_post
+    FROM blog_post bp
+    LEFT JOIN blog_blog bt ON bp.blog_id = bt.id
+    WHERE bp.website_published = true
+    GROUP BY bt.id, bt.name
+    ORDER BY total_posts DESC
+'''
+
+POPULAR_ROWS_QUERY = '''
+    SELECT
+        bp.id,
+        bp.name ->> 'vi_VN' as title,
+        bp.subtitle ->> 'vi_VN' as subtitle,
+        bp.content ->> 'vi_VN' as content,
+        TO_CHAR(bp.published_date, 'DD/MM/YYYY HH24:MI') as published_date,
+        TO_CHAR(bp.create_date, 'DD/MM/YYYY HH24:MI') as create_date,
+        TO_CHAR(bp.write_date, 'DD/MM/YYYY HH24:MI') as write_date,
+        bp.visits,
+        bt.name ->> 'vi_VN' as blog_name,
+        bt.id as blog_id,
+        bp.image_url
+    FROM blog_post bp
+    LEFT JOIN blog_blog bt ON bp.blog_id = bt.id
+    WHERE bp.id = ANY($1::int[])
+      AND bp.website_published = true
+'''
+
+TRENDING_ROWS_QUERY = '''
+    SELECT
+        bp.id,
+        bp.name ->> 'vi_VN' as title,
+        bp.subtitle ->> 'vi_VN' as subtitle,
+        bp.teaser ->> 'vi_VN' as teaser,
+        TO_CHAR(bp.published_date, 'DD/MM/YYYY HH24:MI') as published_date,
+        bp.visits,
+        bp.cover_properties,
+        bt.name ->> 'vi_VN' as blog_name
+    FROM blog_post bp
+    LEFT JOIN blog_blog bt ON bp.blog_id = bt.id
+    WHERE bp.id = ANY($1::int[])
+      AND bp.website_published = true
+      AND bp.published_date >= NOW() - make_interval(days => $2)
+'''
+
+
+class BlogRankings:
+    """
+    Bảng xếp hạng bài viết tính sẵn trong Redis, endpoint chỉ đọc top-N (ZREVRANGE) rồi lấy
+    dữ liệu bài viết theo khóa chính.
+
+    - popular: ZSET điểm = tổng lượt xem, dựng lại từ blog_post mỗi RANKING_REFRESH_INTERVAL giây,
+      giữa hai lần được cộng theo các lô lượt xem vừa ghi.
+    - trending: điểm giảm dần theo thời gian, score(t) = Σ lượt xem · 2^(-(t - lúc xem) / TRENDING_HALF_LIFE).
+      Lưu dạng forward decay: mỗi lượt xem cộng 2^((lúc xem - epoch) / TRENDING_HALF_LIFE) nên thứ tự
+      không đổi theo thời gian và không cần cập nhật lại điểm của bài không có lượt xem mới. Định kỳ
+      nhân cả ZSET với 2^(-(now - epoch) / H) và dời epoch để điểm không tăng mãi.
+    - category_stats: kết quả thống kê theo danh mục.
+    """
+
+    @staticmethod
+    def _decay(seconds: float) -> float:
+        return math.pow(2.0, seconds / TRENDING_HALF_LIFE)
+
+    @staticmethod
+    async def _is_ready() -> bool:
+        refreshed_at = await redis_client.get(REFRESHED_AT_KEY)
+        return refreshed_at is not None and time.time() - float(refreshed_at) < RANKING_STALE_AFTER
+
+    @classmethod
+    async def _rebase_trending(cls, epoch: float, now: float):
+        async with redis_client.pipeline() as pipe:
+            pipe.zunionstore(TRENDING_KEY, {TRENDING_KEY: 1 / cls._decay(now - epoch)})
+            pipe.set(TRENDING_EPOCH_KEY, now, expiry=RANKING_KEY_TTL)
+            pipe.expire(TRENDING_KEY, RANKING_KEY_TTL)
+
+    @classmethod
+    async def _seed_trending(cls, posts: List[Dict[str, Any]], now: float):
+        """Chưa có lượt xem nào được ghi nhận: lấy tổng lượt xem giảm theo tuổi bài viết làm điểm ban đầu"""
+        cutoff = datetime.utcnow() - timedelta(days=TRENDING_MAX_DAYS)
+        mapping = {}
+        for post in posts:
+            if post['published_date'] and post['published_date'] >= cutoff and post['visits'] > 0:
+                age = now - (post['published_date'] - datetime(1970, 1, 1)).total_seconds()
+                mapping[str(post['id'])] = post['visits'] / cls._decay(max(age, 0))
+        async with redis_client.pipeline() as pipe:
+            pipe.delete(TRENDING_KEY)
+            if mapping:
+                pipe.zadd(TRENDING_KEY, mapping)
+                pipe.expire(TRENDING_KEY, RANKING_KEY_TTL)
+            pipe.set(TRENDING_EPOCH_KEY, now, expiry=RANKING_KEY_TTL)
+
+    @staticmethod
+    async def _bump_version():
+        await redis_client.set(RANKING_VERSION_KEY, time.time_ns(), expiry=RANKING_KEY_TTL)
+
+    @classmethod
+    async def _update_trending_epoch(cls, posts: List[Dict[str, Any]], now: float):
+        """
+        Seed/rebase chạy dưới khóa flush lượt xem: on_visits_flushed đọc epoch rồi ZINCRBY cũng dưới
+        khóa này, nếu epoch đổi giữa hai bước thì lô lượt xem được cộng theo trọng số của epoch cũ.
+        Đang flush thì để lần refresh sau.
+        """
+        token = await acquire_lock(BLOG_VISITS_FLUSH_LOCK_KEY, BLOG_VISITS_FLUSH_LOCK_TTL)
+        if token is None:
+            return
+        try:
+            epoch = await redis_client.get(TRENDING_EPOCH_KEY)
+            if epoch is None:
+                await cls._seed_trending(posts, now)
+            elif now - float(epoch) >= TRENDING_REBASE_AFTER:
+                await cls._rebase_trending(float(epoch), now)
+        finally:
+            await release_lock(BLOG_VISITS_FLUSH_LOCK_KEY, token)
+
+    @classmethod
+    async def refresh(cls):
+        token = await acquire_lock(REFRESH_LOCK_KEY, RANKING_REFRESH_INTERVAL)
+        if token is None:
+            return
+        try:
+            now = time.time()
+            posts = await PostgresDB.execute_query(PUBLISHED_POSTS_QUERY)
+            category_stats = await PostgresDB.execute_query(CATEGORY_STATS_QUERY)
+
+            popular = {str(post['id']): post['visits'] for post in posts if post['visits'] > 0}
+            async with redis_client.pipeline() as pipe:
+                pipe.delete(POPULAR_TMP_KEY)
+                if popular:
+                    pipe.zadd(POPULAR_TMP_KEY, popular)
+                    pipe.rename(POPULAR_TMP_KEY, POPULAR_KEY)
+                    pipe.expire(POPULAR_KEY, RANKING_KEY_TTL)
+                else:
+                    pipe.delete(POPULAR_KEY)
+                pipe.set(CATEGORY_STATS_KEY, category_stats, expiry=RANKING_KEY_TTL)
+
+            # Bỏ bài đã ẩn hoặc quá TRENDING_MAX_DAYS ngày
+            cutoff = datetime.utcnow() - timedelta(days=TRENDING_MAX_DAYS)
+            eligible = {
+                str(post['id']) for post in posts
+                if post['published_date'] and post['published_date'] >= cutoff
+            }
+            members = await redis_client.zrange(TRENDING_KEY)
+            await redis_client.zrem(TRENDING_KEY, *[member for member in members if member not in eligible])
+            await cls._update_trending_epoch(posts, now)
+
+            await redis_client.set(REFRESHED_AT_KEY, now, expiry=RANKING_KEY_TTL)
+            await cls._bump_version()
+        finally:
+            await release_lock(REFRESH_LOCK_KEY, token)
+
+    @classmethod
+    async def on_visits_flushed(cls, deltas: Dict[int, int]):
+        """Cộng lô lượt xem vừa ghi vào popular và trending (chạy dưới khóa flush lượt xem)"""
+        epoch = await redis_client.get(TRENDING_EPOCH_KEY)
+        if epoch is None:
+            # Chưa seed, lần refresh tới sẽ tính từ blog_post
+            return
+        weight = cls._decay(time.time() - float(epoch))
+        async with redis_client.pipeline() as pipe:
+            for post_id, count in deltas.items():
+                pipe.zincrby(POPULAR_KEY, count, str(post_id))
+                pipe.zincrby(TRENDING_KEY, count * weight, str(post_id))
+        await cls._bump_version()
+
+    @staticmethod
+    async def _rows_in_rank_order(query: str, ids: List[int], *params) -> List[Dict[str, Any]]:
+        rows = await PostgresDB.execute_query(query, [ids, *params])
+        by_id = {row['id']: row for row in rows}
+        return [by_id[post_id] for post_id in ids if post_id in by_id]
+
+    @classmethod
+    async def get_popular(cls, limit: int) -> Optional[List[Dict[str, Any]]]:
+        """None khi bảng xếp hạng chưa sẵn sàng (gọi query trực tiếp)"""
+        try:
+            if not await cls._is_ready():
+                return None
+            # Lấy dư để bù các bài vừa ẩn
+            ranked = await redis_client.zrevrange(POPULAR_KEY, 0, 2 * limit - 1)
+        except RedisError as e:
+            logger.warning(f"Cannot read popular ranking: {str(e)}")
+            return None
+        ids = [int(member) for member, _ in ranked]
+        return (await cls._rows_in_rank_order(POPULAR_ROWS_QUERY, ids))[:limit] if ids else []
+
+    @classmethod
+    async def get_trending(cls, days: int, limit: int) -> Optional[List[Dict[str, Any]]]:
+        try:
+            if not await cls._is_ready():
+                return None
+            epoch = await redis_client.get(TRENDING_EPOCH_KEY)
+            if epoch is None:
+                return None
+            # Bài đăng quá days ngày bị loại ở query, đọc tiếp từng đợt tới khi đủ limit
+            result = []
+            start = 0
+            batch_size = 3 * limit
+            now_factor = 1 / cls._decay(time.time() - float(epoch))
+            while len(result) < limit:
+                ranked = await redis_client.zrevrange(TRENDING_KEY, start, start + batch_size - 1)
+                if not ranked:
+                    break
+                scores = {int(member): score * now_factor for member, score in ranked}
+                rows = await cls._rows_in_rank_order(TRENDING_ROWS_QUERY, list(scores), days)
+                for row in rows:
+                    row['trending_score'] = round(scores[row['id']], 4)
+                result.extend(rows)
+                start += batch_size
+            return result[:limit]
+        except RedisError as e:
+            logger.warning(f"Cannot read trending ranking: {str(e)}")
+            return None
+
+    @classmethod
+    async def get_category_stats(cls) -> Optional[List[Dict[str, Any]]]:
+        try:
+            if not await cls._is_ready():
+                return None
+            return await redis_client.get(CATEGORY_STATS_KEY)
+        except RedisError as e:
+            logger.warning(f"Cannot read category stats: {str(e)}")
+            return None
+
+
+flush_listeners.append(BlogRankings.on_visits_flushed)
+background_tasks.add("blog_rankings_refresh", RANKING_REFRESH_INTERVAL, BlogRankings.refresh)
@@ -0,0 +1,162 @@
+import logging
+import re
+from typing import Any, Dict, Optional
+
+from app.utils.erp_db import PostgresDB
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CONFIG = "api_vi"
+HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxWords=35, MinWords=15, MaxFragments=2, FragmentDelimiter=\" … \""
+MAX_SEARCH_TERMS = 8
+
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+# Bảng api_blog_post_search do trigger trên blog_post cập nhật (migration f6b8d0e20006).
+# Headline chỉ tính cho các bài của trang hiện tại.
+FULLTEXT_QUERY = '''
+    WITH matches AS (
+        SELECT s.post_id, ts_rank_cd(s.document, q.query) AS rank
+        FROM api_blog_post_search s, to_tsquery('{config}', $1) q(query)
+        WHERE s.document @@ q.query
+    ),
+    page AS (
+        SELECT m.post_id, m.rank, COUNT(*) OVER () AS total
+        FROM matches m
+             JOIN blog_post bp ON bp.id = m.post_id
+        ORDER BY m.rank DESC, bp.published_date DESC NULLS LAST, bp.id DESC
+        LIMIT $2 OFFSET $3
+    )
+    SELECT
+        bp.id,
+        bp.name ->> 'vi_VN' as title,
+        bp.subtitle ->> 'vi_VN' as subtitle,
+        bp.subtitle ->> 'vi_VN' as content,
+        TO_CHAR(bp.published_date, 'DD/MM/YYYY HH24:MI') as published_date,
+        TO_CHAR(bp.create_date, 'DD/MM/YYYY HH24:MI') as create_date,
+        TO_CHAR(bp.write_date, 'DD/MM/YYYY HH24:MI') as write_date,
+        bp.visits,
+        bt.name ->> 'vi_VN' as blog_name,
+        bt.id as blog_id,
+        bp.image_url,
+        bp.website_url,
+        page.rank,
+        page.total,
+        ts_headline(
+            '{config}',
+            regexp_replace(COALESCE(bp.content ->> 'vi_VN', ''), '<[^>]*>', ' ', 'g'),
+            to_tsquery('{config}', $1),
+            '{options}'
+        ) as headline
+    FROM page
+         JOIN blog_post bp ON bp.id = page.post_id
+         LEFT JOIN blog_blog bt ON bp.blog_id = bt.id
+    ORDER BY page.rank DESC, bp.published_date DESC NULLS LAST, bp.id DESC
+'''.format(config=SEARCH_CONFIG, options=HEADLINE_OPTIONS)
+
+FULLTEXT_COUNT_QUERY = '''
+    SELECT COUNT(*) as total
+    FROM api_blog_post_search s
+    WHERE s.document @@ to_tsquery('{config}', $1)
+'''.format(config=SEARCH_CONFIG)
+
+# Dự phòng khi không có kết quả full-text (gõ sai chính tả): so khớp trigram trên tiêu đề + phụ đề
+# đã bỏ dấu, ngưỡng pg_trgm.word_similarity_threshold (mặc định 0.6)
+TRIGRAM_QUERY = '''
+    WITH page AS (
+        SELECT s.post_id, word_similarity(q.text, s.search_text) AS rank, COUNT(*) OVER () AS total
+        FROM api_blog_post_search s, unaccent($1) q(text)
+        WHERE q.text <% s.search_text
+        ORDER BY rank DESC, s.post_id DESC
+        LIMIT $2 OFFSET $3
+    )
+    SELECT
+        bp.id,
+        bp.name ->> 'vi_VN' as title,
+        bp.subtitle ->> 'vi_VN' as subtitle,
+        bp.subtitle ->> 'vi_VN' as content,
+        TO_CHAR(bp.published_date, 'DD/MM/YYYY HH24:MI') as published_date,
+        TO_CHAR(bp.create_date, 'DD/MM/YYYY HH24:MI') as create_date,
+        TO_CHAR(bp.write_date, 'DD/MM/YYYY HH24:MI') as write_date,
+        bp.visits,
+        bt.name ->> 'vi_VN' as blog_name,
+        bt.id as blog_id,
+        bp.image_url,
+        bp.website_url,
+        page.rank,
+        page.total,
+        NULL::text as headline
+    FROM page
+         JOIN blog_post bp ON bp.id = page.post_id
+         LEFT JOIN blog_blog bt ON bp.blog_id = bt.id
+    ORDER BY page.rank DESC, bp.id DESC
+'''
+
+TRIGRAM_COUNT_QUERY = '''
+    SELECT COUNT(*) as total
+    FROM api_blog_post_search s
+    WHERE unaccent($1) <% s.search_text
+'''
+
+
+def build_tsquery(search: str) -> Optional[str]:
+    """
+    Từ khóa người dùng -> chuỗi to_tsquery: các từ nối bằng &, từ cuối khớp tiền tố (đang gõ dở).
+    Chỉ giữ ký tự chữ/số nên không lọt toán tử tsquery. None nếu không còn từ nào.
+    """
+    terms = _TERM_RE.findall(search.lower())[:MAX_SEARCH_TERMS]
+    if not terms:
+        return None
+    terms[-1] += ':*'
+    return ' & '.join(terms)
+
+
+class BlogSearch:
+    """Tìm kiếm bài viết trên bảng api_blog_post_search (tsvector + trigram, bỏ dấu tiếng Việt)"""
+
+    @staticmethod
+    async def _run(query: str, count_query: str, term: str, page: int, limit: int,
+                   mode: str) -> Dict[str, Any]:
+        offset = (page - 1) * limit
+        rows = await PostgresDB.execute_query(query, [term, limit, offset])
+        if rows:
+            total = rows[0]['total']
+            for row in rows:
+                del row['total']
+        elif offset:
+            # Trang vượt quá số kết quả: không có dòng nào mang COUNT(*) OVER ()
+            total = (await PostgresDB.execute_query(count_query, [term]))[0]['total']
+        else:
+            total = 0
+        return {
+            "success": True,
+            "data": rows,
+            "current_page": page,
+            "limit": limit,
+            "total": total,
+            "total_pages": (total + limit - 1) // limit,
+            "search_mode": mode,
+        }
+
+    @classmethod
+    async def search(cls, search: str, page: int = 1, limit: int = 10) -> Dict[str, Any]:
+        """
+        Kết quả xếp theo ts_rank_cd (tiêu đề > phụ đề > nội dung), kèm headline đánh dấu <mark>.
+        Không có kết quả full-text thì dùng trigram (search_mode = "trigram", không có headline).
+        """
+        tsquery = build_tsquery(search)
+        if tsquery is None:
+            return {
+                "success": True,
+                "data": [],
+                "current_page": page,
+                "limit": limit,
+                "total": 0,
+                "total_pages": 0,
+                "search_mode": "fulltext",
+            }
+        result = await cls._run(FULLTEXT_QUERY, FULLTEXT_COUNT_QUERY, tsquery, page, limit, "fulltext")
+        if result['total']:
+            return result
+        text = ' '.join(_TERM_RE.findall(search.lower()))
+        return await cls._run(TRIGRAM_QUERY, TRIGRAM_COUNT_QUERY, text, page, limit, "trigram")
@@ -1,6 +1,9 @@
 import logging
 from typing import List, Optional, Dict, Any
 from app.utils.erp_db import PostgresDB
+from .blog_rankings import BlogRankings
+from .blog_search import BlogSearch
+from .blog_visits import BlogVisitCounter
 
 logger = logging.getLogger(__name__)
 
@@ -26,18 +29,16 @@ class BlogService:
             Dict chứa danh sách bài viết và metadata
         """
         try:
+            if search and search.strip():
+                # Tìm kiếm full-text có xếp hạng và headline (blog_search.py)
+                return await BlogSearch.search(search, page=page, limit=limit)
+
             # Tính offset
             offset = (page - 1) * limit
 
             # Build query điều kiện
             where_clause = "1=1"
 
-            if search:
-                search_escaped = search.replace("'", "''")  # Escape single quotes
-                where_clause += " AND (bp.name ->> 'vi_VN' ILIKE '%{}%' OR bp.subtitle ->> 'vi_VN' ILIKE '%{}%' OR bp.content ->> 'vi_VN' ILIKE '%{}%')".format(
-                    search_escaped, search_escaped, search_escaped
-                )
-
             # Query lấy danh sách bài viết
             posts_query = '''
                 SELECT 
@@ -135,8 +136,8 @@ class BlogService:
 
             post = result[0]
 
-            # Tăng lượt xem (optional)
-            await BlogService._increment_visits(post_id)
+            # Tăng lượt xem, cộng cả lượt xem chưa ghi vào blog_post
+            post["visits"] = (post["visits"] or 0) + await BlogService._increment_visits(post_id)
 
             return {
                 "success": True,
@@ -205,6 +206,11 @@ class BlogService:
             List bài viết phổ biến
         """
         try:
+            # Bảng xếp hạng tính sẵn (blog_rankings.py), chưa sẵn sàng thì query trực tiếp
+            ranked = await BlogRankings.get_popular(limit)
+            if ranked is not None:
+                return ranked
+
             query = '''
                 SELECT 
                     bp.id,
@@ -234,25 +240,22 @@ class BlogService:
             return []
 
     @staticmethod
-    async def _increment_visits(post_id: int) -> None:
+    async def _increment_visits(post_id: int) -> int:
         """
-        Tăng lượt xem bài viết
+        Tăng lượt xem bài viết (đếm trong Redis, ghi vào blog_post theo lô)
 
         Args:
             post_id: ID bài viết
+
+        Returns:
+            Số lượt xem chưa ghi vào blog_post
         """
         try:
-            update_query = '''
-                UPDATE blog_post 
-                SET visits = COALESCE(visits, 0) + 1,
-                    write_date = NOW()
-                WHERE id = {}
-            '''.format(post_id)
-
-            await PostgresDB.execute_query(update_query)
+            return await BlogVisitCounter.record_visit(post_id)
 
         except Exception as e:
             logger.error(f"Error incrementing visits for post {post_id}: {str(e)}")
+            return 0
 
     @staticmethod
     async def get_posts_by_category(
@@ -343,6 +346,10 @@ class BlogService:
             List bài viết trending
         """
         try:
+            ranked = await BlogRankings.get_trending(days=days, limit=limit)
+            if ranked is not None:
+                return ranked
+
             query = '''
                 SELECT 
                     bp.id,
@@ -378,6 +385,10 @@ class BlogService:
             List thống kê category
         """
         try:
+            stats = await BlogRankings.get_category_stats()
+            if stats is not None:
+                return stats
+
             query = '''
                 SELECT 
                     bt.name ->> 'vi_VN' as category_name,
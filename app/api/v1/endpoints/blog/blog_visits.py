@@ -0,0 +1,106 @@
+import logging
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from redis.exceptions import RedisError
+
+from app.utils.background import background_tasks
+from app.utils.erp_db import PostgresDB
+from app.utils.metrics import registry
+from app.utils.redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+# Cùng hash tag để RENAMENX chạy được ở chế độ cluster
+BLOG_VISITS_PENDING_KEY = "{blog_visits}:pending"
+BLOG_VISITS_FLUSHING_KEY = "{blog_visits}:flushing"
+BLOG_VISITS_FLUSH_LOCK_KEY = "{blog_visits}:flush_lock"
+BLOG_VISITS_FLUSH_INTERVAL = 30  # giây
+BLOG_VISITS_FLUSH_LOCK_TTL = 60  # giây, tự nhả khi worker giữ khóa bị dừng giữa chừng
+
+BULK_INCREMENT_QUERY = '''
+    UPDATE blog_post bp
+    SET visits = COALESCE(bp.visits, 0) + v.delta
+    FROM unnest($1::int[], $2::int[]) AS v(id, delta)
+    WHERE bp.id = v.id
+'''
+
+blog_visits_flushed = registry.counter(
+    "blog_visits_flushed_total", "Số lượt xem blog đã ghi từ Redis vào blog_post"
+)
+
+# Hàm nhận {post_id: số lượt xem} của mỗi lô vừa ghi, vd. cập nhật bảng xếp hạng
+flush_listeners: List[Callable[[Dict[int, int]], Awaitable[None]]] = []
+
+
+async def acquire_lock(key: str, ttl: int) -> Optional[str]:
+    """Giữ khóa (SET NX) với token ngẫu nhiên, trả None nếu đang có worker khác giữ"""
+    token = uuid.uuid4().hex
+    if not await redis_client.set(key, token, expiry=ttl, nx=True):
+        return None
+    return token
+
+
+async def release_lock(key: str, token: str):
+    """
+    Chỉ nhả khóa khi vẫn là token của mình: nếu xử lý lâu hơn TTL, khóa đã hết hạn và worker
+    khác đang giữ thì không được xóa khóa của worker đó
+    """
+    await redis_client.delete_if_equals(key, token)
+
+
+class BlogVisitCounter:
+    """
+    Đếm lượt xem bài viết trong hash Redis thay vì UPDATE blog_post mỗi lần đọc.
+
+    Tác vụ định kỳ đổi tên hash đang đếm sang key flushing (RENAMENX, nguyên tử nên lượt xem mới
+    vào hash mới), ghi cả lô bằng một câu UPDATE rồi xóa key flushing. Ghi lỗi thì key flushing
+    được giữ lại và ghi lại ở lần sau. Lượt xem chưa ghi vẫn được cộng vào khi trả chi tiết bài viết.
+    """
+
+    @staticmethod
+    async def record_visit(post_id: int) -> int:
+        """Tăng lượt xem, trả về số lượt xem chưa ghi vào Postgres (kể cả lượt này)"""
+        try:
+            async with redis_client.pipeline(transaction=False) as pipe:
+                pipe.hincrby(BLOG_VISITS_PENDING_KEY, str(post_id), 1)
+                pipe.hget(BLOG_VISITS_FLUSHING_KEY, str(post_id))
+            pending, flushing = pipe.results
+            return int(pending) + int(flushing or 0)
+        except RedisError as e:
+            # Redis lỗi: ghi thẳng như trước để không mất lượt xem
+            logger.warning(f"Cannot buffer visit for post {post_id}, updating directly: {str(e)}")
+            await PostgresDB.execute_query(BULK_INCREMENT_QUERY, [[post_id], [1]])
+            return 0
+
+    @staticmethod
+    async def _write(deltas: Dict[int, int]):
+        post_ids = sorted(deltas)
+        await PostgresDB.execute_query(BULK_INCREMENT_QUERY, [post_ids, [deltas[post_id] for post_id in post_ids]])
+        blog_visits_flushed.inc(sum(deltas.values()))
+        for listener in flush_listeners:
+            try:
+                await listener(deltas)
+            except Exception as e:
+                logger.error(f"Blog visit flush listener failed: {str(e)}")
+
+    @classmethod
+    async def flush(cls):
+        token = await acquire_lock(BLOG_VISITS_FLUSH_LOCK_KEY, BLOG_VISITS_FLUSH_LOCK_TTL)
+        if token is None:
+            return
+        try:
+            # Lô của lần trước chưa ghi được thì ghi lô đó trước
+            if not await redis_client.exists(BLOG_VISITS_FLUSHING_KEY):
+                if not await redis_client.renamenx(BLOG_VISITS_PENDING_KEY, BLOG_VISITS_FLUSHING_KEY):
+                    return
+            raw = await redis_client.hgetall(BLOG_VISITS_FLUSHING_KEY)
+            deltas = {int(post_id): int(count) for post_id, count in raw.items() if int(count) > 0}
+            if deltas:
+                await cls._write(deltas)
+            await redis_client.delete(BLOG_VISITS_FLUSHING_KEY)
+        finally:
+            await release_lock(BLOG_VISITS_FLUSH_LOCK_KEY, token)
+
+
+background_tasks.add("blog_visits_flush", BLOG_VISITS_FLUSH_INTERVAL, BlogVisitCounter.flush)
@@ -1,16 +1,23 @@
-from fastapi import APIRouter, HTTPException, Query, Path,Depends,Header, Body
+from fastapi import APIRouter, HTTPException, Query, Path,Depends,Header, Body, Request
+from fastapi.responses import StreamingResponse
 from typing import Optional
 import logging
 from typing import List, Optional, Dict, Any, Annotated
 from app.api.deps import get_current_user
+from app.utils.idempotency import get_idempotency_key, run_idempotent
 from .booking_service import BookingService
+from .booking_events import stream_partner_events
+from .booking_availability import MonthAvailability
+from app.services.availability_engine import AvailabilityUnavailable
 from datetime import datetime
 from app.config import BOOKING_HOURS, APPOINTMENT_DURATION, QUANTITY, TIME_OPTIONS, EMPLOYEE_QUANTITY
 from app.schemas.booking_schema import (
     BookingCalculateRequest,
     BookingCreateRequest, 
     BookingCancelRequest,
+    BookingBatchRequest,
     PeriodicPricingRequest,
+    PeriodicPricingBatchRequest,
     PeriodicBookingCreateRequest,
 )
 from app.api.v1.endpoints.payment.payment_service import PaymentService
@@ -59,9 +66,13 @@ async def get_booking(
 async def create_event_post(
         current_user=Depends(get_current_user),
         request: BookingCreateRequest =Body(...),
+        idempotency_key: Optional[str] = Depends(get_idempotency_key),
 ):
     try:
-        result = await BookingService.create_event(request.dict(), current_user)
+        result = await run_idempotent(
+            "booking_create", idempotency_key, current_user, request.dict(),
+            lambda: BookingService.create_event(request.dict(), current_user),
+        )
         return {
             "success": True,
             "message": "Đặt lịch thành công",
@@ -122,6 +133,66 @@ async def get_booking(
         )
 
 
+@router.get("/events/stream", summary="Nhận thay đổi trạng thái lịch hẹn/hợp đồng (Server-Sent Events)")
+async def stream_booking_events(
+        request: Request,
+        last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+        current_user=Depends(get_current_user),
+):
+    """
+    Luồng SSE các thay đổi cleaning_state/payment_status của lịch hẹn và state/payment_status
+    của hợp đồng thuộc user hiện tại. Khi kết nối lại, gửi header Last-Event-ID (id của sự kiện
+    cuối cùng đã nhận) để nhận lại các thay đổi bị lỡ; lỡ quá nhiều thay đổi thì nhận sự kiện
+    reset và cần tải lại danh sách.
+    """
+    return StreamingResponse(
+        stream_partner_events(request, int(current_user.partner_id), last_event_id),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # Tắt buffer của nginx để sự kiện tới client ngay
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
+@router.get("/availability/month", summary="Lấy khung giờ còn nhân viên trong tháng")
+async def get_month_availability(
+        categ_id: int = Query(..., description="ID danh mục dịch vụ"),
+        staff_qty: int = Query(1, ge=1, description="Số lượng nhân viên"),
+        duration: int = Query(..., ge=1, le=12, description="Thời gian dịch vụ (giờ)"),
+        month: Optional[str] = Query(None, pattern=r"^\d{4}-(0[1-9]|1[0-2])$", description="Tháng (YYYY-MM), mặc định tháng hiện tại"),
+        current_user=Depends(get_current_user),
+):
+    """
+    Với mỗi ngày trong tháng và mỗi giờ trong BOOKING_HOURS: số nhân viên rảnh và có đủ staff_qty
+    nhân viên hay không, để app tô màu lịch chọn ngày thay vì hỏi từng khung giờ.
+    """
+    try:
+        result = await MonthAvailability.get_month(categ_id, staff_qty, duration, month)
+        return {
+            "success": True,
+            "message": "Lấy khung giờ còn nhân viên trong tháng thành công",
+            "data": result,
+        }
+
+    except HTTPException:
+        raise
+    except AvailabilityUnavailable as e:
+        # Odoo không có API theo tháng để thay thế, báo tạm thời không khả dụng thay vì 500
+        logger.warning(f"Month availability unavailable: {str(e)}")
+        raise HTTPException(
+            status_code=503,
+            detail="Tạm thời chưa lấy được lịch nhân viên theo tháng, vui lòng chọn từng khung giờ"
+        )
+    except Exception as e:
+        logger.error(f"Unexpected error in get_month_availability: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail="Có lỗi xảy ra khi lấy khung giờ còn nhân viên"
+        )
+
+
 @router.get("/{booking_id}", summary="Lấy chi tiết lịch hẹn")
 async def get_blog_post_detail(
         booking_id: int = Path(..., gt=0, description="ID của lịch hẹn"),
@@ -159,13 +230,42 @@ async def get_blog_post_detail(
             detail="Có lỗi xảy ra khi lấy chi tiết lịch hẹn"
         )
 
+@router.post("/batch", summary="Lấy chi tiết nhiều lịch hẹn")
+async def get_booking_batch(
+        current_user=Depends(get_current_user),
+        request: BookingBatchRequest = Body(...),
+):
+    try:
+        result = await BookingService.get_booking_batch(request.ids, current_user)
+
+        if not result["success"]:
+            raise HTTPException(
+                status_code=500,
+                detail=result["error"]
+            )
+
+        return {
+            "success": True,
+            "message": "Lấy chi tiết lịch hẹn thành công",
+            "data": result["data"],
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error in get_booking_batch: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail="Có lỗi xảy ra khi lấy chi tiết lịch hẹn"
+        )
+
 @router.post("/cancel", summary="Hủy đặt lịch dọn dẹp")
 async def cancel_booking_post(
         current_user=Depends(get_current_user),
         request: BookingCancelRequest = Body(...),
 ):
     try:
-        result = await BookingService.cancel_booking(request.dict())
+        result = await BookingService.cancel_booking(request.dict(), current_user)
         return {
             "success": True,
             "message": "Hủy đặt lịch thành công",
@@ -207,6 +307,33 @@ async def calculate_periodic_pricing(
         )
 
 
+@router.post("/periodic/calculate-pricing/batch", summary="Tính giá nhiều phương án định kỳ")
+async def calculate_periodic_pricing_batch(
+        current_user=Depends(get_current_user),
+        request: PeriodicPricingBatchRequest = Body(...),
+):
+    """
+    Báo giá nhiều phương án (gói x thứ trong tuần x giờ bắt đầu) trong một request cho màn hình so sánh gói.
+    Phương án lỗi (gói không đủ số buổi, Odoo lỗi) trả success=false kèm error, không làm hỏng cả request.
+    """
+    try:
+        result = await BookingService.calculate_periodic_pricing_batch(request.dict(), current_user)
+        return {
+            "success": True,
+            "message": "Tính giá định kỳ thành công",
+            "data": result,
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error in calculate_periodic_pricing_batch: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail="Có lỗi xảy ra khi tính giá định kỳ"
+        )
+
+
 @router.post("/{booking_id}/payos/create-payment", summary="Tạo payment link từ PayOS cho booking")
 async def create_payos_payment_booking(
         booking_id: int = Path(..., description="ID booking"),
@@ -214,17 +341,26 @@ async def create_payos_payment_booking(
         return_url: Optional[str] = Body(None, description="URL redirect sau khi thanh toán thành công"),
         cancel_url: Optional[str] = Body(None, description="URL redirect khi hủy thanh toán"),
         current_user=Depends(get_current_user),
+        idempotency_key: Optional[str] = Depends(get_idempotency_key),
 ):
     """
     Tạo payment link từ PayOS cho booking (calendar.event)
     """
     try:
-        result = await PaymentService.create_payos_payment_link_booking(
-            booking_id=booking_id,
-            payment_method_id=payment_method_id,
-            current_user=current_user,
-            return_url=return_url,
-            cancel_url=cancel_url,
+        result = await run_idempotent(
+            "booking_payos_payment",
+            idempotency_key,
+            current_user,
+            {'booking_id': booking_id, 'payment_method_id': payment_method_id,
+             'return_url': return_url, 'cancel_url': cancel_url},
+            lambda: PaymentService.create_payos_payment_link_booking(
+                booking_id=booking_id,
+                payment_method_id=payment_method_id,
+                current_user=current_user,
+                return_url=return_url,
+                cancel_url=cancel_url,
+            ),
+            store_if=lambda result: bool(result.get('success')),
         )
         
         if not result.get('success'):
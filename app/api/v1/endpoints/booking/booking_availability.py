@@ -0,0 +1,213 @@
+import calendar
+import logging
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import numpy as np
+from redis.exceptions import RedisError
+
+from app.config import BOOKING_HOURS
+from app.services.availability_engine import (
+    CALENDAR_EVENT_STAFF_CHANNEL,
+    INACTIVE_CLEANING_STATES,
+    availability_engine,
+)
+from app.utils.cache import get_or_load
+from app.utils.datetime_vi import VN_OFFSET, to_vn_time
+from app.utils.erp_db import PostgresDB
+from app.utils.pg_listener import pg_listener
+from app.utils.redis_client import redis_client
+from .booking_cache import CALENDAR_EVENT_CHANNEL
+
+logger = logging.getLogger(__name__)
+
+AVAILABILITY_MONTH_PREFIX = "availability_month"
+AVAILABILITY_MONTH_TTL = 300  # giây
+AVAILABILITY_MONTH_VERSION_TTL = 86400
+SLOT_MINUTES = 30
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+BOOKING_HOUR_KEYS = [item['key'] for item in BOOKING_HOURS]
+
+MONTH_EVENTS_QUERY = '''
+    SELECT cesr.employee_id, ce.start, ce.stop
+    FROM calendar_event ce
+         JOIN calendar_event_staff_rel cesr ON cesr.event_id = ce.id
+    WHERE ce.active = true
+      AND COALESCE(ce.cleaning_state, '') <> ALL($1::varchar[])
+      AND ce.start < $3
+      AND ce.stop > $2
+      AND cesr.employee_id = ANY($4::int[])
+'''
+
+
+def compute_free_staff(employee_index: np.ndarray, start_slots: np.ndarray, stop_slots: np.ndarray,
+                       employee_count: int, day_count: int, hours: List[int], duration: int) -> np.ndarray:
+    """
+    Số nhân viên rảnh cho từng (ngày, giờ bắt đầu) trong một lượt tính trên ma trận.
+
+    Ma trận bận: nhân viên x ô 30 phút của cả tháng, đánh dấu bằng mảng hiệu (+1 ở ô bắt đầu,
+    -1 ở ô kết thúc) rồi cộng dồn. Cộng dồn thêm một lần theo ô để biết số ô bận trong bất kỳ
+    khung giờ nào bằng một phép trừ, áp dụng cho mọi khung giờ của tháng cùng lúc.
+    """
+    slot_count = day_count * SLOTS_PER_DAY
+    # Thêm ô cuối để khung giờ kéo qua nửa đêm ngày cuối tháng không vượt chỉ số
+    width = slot_count + SLOTS_PER_DAY
+    diff = np.zeros((employee_count, width + 1), dtype=np.int32)
+    np.add.at(diff, (employee_index, start_slots), 1)
+    np.add.at(diff, (employee_index, stop_slots), -1)
+    busy = np.cumsum(diff[:, :width], axis=1) > 0
+    busy_prefix = np.zeros((employee_count, width + 1), dtype=np.int32)
+    np.cumsum(busy, axis=1, out=busy_prefix[:, 1:])
+
+    slots_per_hour = 60 // SLOT_MINUTES
+    window_starts = (
+        np.arange(day_count)[:, None] * SLOTS_PER_DAY + np.array(hours)[None, :] * slots_per_hour
+    ).ravel()
+    window_stops = window_starts + duration * slots_per_hour
+    busy_in_window = busy_prefix[:, window_stops] - busy_prefix[:, window_starts] > 0
+    return (~busy_in_window).sum(axis=0).reshape(day_count, len(hours))
+
+
+class MonthAvailability:
+    """
+    Bảng nhân viên rảnh theo ngày/giờ của một tháng cho danh mục dịch vụ, dùng để tô màu lịch chọn ngày.
+    Cache theo (danh mục, tháng, thời lượng) với version của tháng, version đổi khi có lịch mới/thay đổi
+    trong tháng đó (lấy từ start/stop trong NOTIFY). Không biết thời gian của lịch thì đổi version chung
+    để làm mới mọi tháng.
+    """
+
+    @staticmethod
+    def _version_key(month_start: Optional[date] = None) -> str:
+        if month_start is None:
+            return f"{AVAILABILITY_MONTH_PREFIX}:version"
+        return f"{AVAILABILITY_MONTH_PREFIX}:version:{month_start:%Y-%m}"
+
+    @staticmethod
+    async def _load_free_staff(categ_id: int, month_start: date, duration: int) -> Dict[str, Any]:
+        day_count = calendar.monthrange(month_start.year, month_start.month)[1]
+        # Mốc 0 giờ (giờ Việt Nam) của ngày đầu tháng, đổi sang UTC như Odoo lưu
+        origin = datetime(month_start.year, month_start.month, 1) - VN_OFFSET
+        period_end = origin + timedelta(days=day_count + 1)
+
+        await availability_engine.ensure_loaded()
+        employee_ids = availability_engine.category_employee_ids(categ_id)
+        if employee_ids:
+            rows = await PostgresDB.execute_query(
+                MONTH_EVENTS_QUERY, [INACTIVE_CLEANING_STATES, origin, period_end, employee_ids]
+            )
+        else:
+            rows = []
+
+        positions = {employee_id: index for index, employee_id in enumerate(employee_ids)}
+        origin64 = np.datetime64(origin, 'm')
+        slot = np.timedelta64(SLOT_MINUTES, 'm')
+        max_slot = (day_count + 1) * SLOTS_PER_DAY
+        employee_index = np.array([positions[row['employee_id']] for row in rows], dtype=np.int64)
+        starts = np.array([row['start'] for row in rows], dtype='datetime64[m]')
+        stops = np.array([row['stop'] for row in rows], dtype='datetime64[m]')
+        start_slots = np.clip(np.floor((starts - origin64) / slot), 0, max_slot).astype(np.int64)
+        stop_slots = np.clip(np.ceil((stops - origin64) / slot), 0, max_slot).astype(np.int64)
+
+        free_staff = compute_free_staff(
+            employee_index, start_slots, stop_slots, len(employee_ids), day_count, BOOKING_HOUR_KEYS, duration
+        )
+        return {
+            'month': month_start.strftime('%Y-%m'),
+            'employee_count': len(employee_ids),
+            'free_staff': free_staff.tolist(),
+        }
+
+    @classmethod
+    async def get_free_staff(cls, categ_id: int, month_start: date, duration: int) -> Dict[str, Any]:
+        async def loader():
+            return await cls._load_free_staff(categ_id, month_start, duration)
+
+        try:
+            version, month_version = await redis_client.mget([cls._version_key(), cls._version_key(month_start)])
+        except RedisError as e:
+            logger.warning(f"Cannot read month availability version: {str(e)}")
+            return await loader()
+        return await get_or_load(
+            AVAILABILITY_MONTH_PREFIX,
+            f"{AVAILABILITY_MONTH_PREFIX}:v{version or 0}.{month_version or 0}:{categ_id}:{month_start:%Y-%m}:{duration}",
+            loader,
+            ttl=AVAILABILITY_MONTH_TTL,
+        )
+
+    @classmethod
+    async def get_month(cls, categ_id: int, staff_qty: int, duration: int,
+                        month: Optional[str] = None) -> Dict[str, Any]:
+        now_local = to_vn_time(datetime.utcnow())
+        if month:
+            month_start = datetime.strptime(month, '%Y-%m').date()
+        else:
+            month_start = now_local.date().replace(day=1)
+
+        data = await cls.get_free_staff(categ_id, month_start, duration)
+        days = []
+        for day_offset, free_counts in enumerate(data['free_staff']):
+            day = month_start + timedelta(days=day_offset)
+            slots = []
+            for hour, free_count in zip(BOOKING_HOUR_KEYS, free_counts):
+                slot_start = datetime(day.year, day.month, day.day, hour)
+                slots.append({
+                    'hour': hour,
+                    'free_staff': free_count,
+                    # Khung giờ đã qua luôn không đặt được (không lưu trong cache)
+                    'available': free_count >= staff_qty and slot_start > now_local,
+                })
+            days.append({
+                'date': day.isoformat(),
+                'available': any(slot['available'] for slot in slots),
+                'slots': slots,
+            })
+        return {
+            'month': data['month'],
+            'categ_id': categ_id,
+            'staff_qty': staff_qty,
+            'duration': duration,
+            'days': days,
+        }
+
+    @staticmethod
+    def affected_months(start: str, stop: str) -> Set[date]:
+        """
+        Các tháng (giờ Việt Nam) có cache chứa lịch [start, stop] (UTC như Odoo lưu). Cache của một tháng
+        tính cả ngày đầu tháng sau nên lịch bắt đầu ngày 1 cũng thuộc tháng trước.
+        """
+        first = (to_vn_time(datetime.fromisoformat(start)) - timedelta(days=1)).date().replace(day=1)
+        last = to_vn_time(datetime.fromisoformat(stop or start)).date().replace(day=1)
+        months = set()
+        while first <= last:
+            months.add(first)
+            first = (first + timedelta(days=32)).replace(day=1)
+        return months
+
+    @classmethod
+    async def invalidate(cls, months: Optional[Iterable[date]] = None):
+        """Đổi version của các tháng, months=None thì đổi version chung (mọi tháng)"""
+        keys = [cls._version_key()] if months is None else [cls._version_key(month) for month in months]
+        try:
+            await redis_client.mset({key: time.time_ns() for key in keys}, expiry=AVAILABILITY_MONTH_VERSION_TTL)
+        except RedisError as e:
+            logger.error(f"Cannot invalidate month availability cache: {str(e)}")
+
+    @classmethod
+    async def on_calendar_event_changed(cls, payload: Dict[str, Any]):
+        # old_start/old_stop: lịch được dời sang tháng khác thì tháng cũ cũng đổi
+        periods = [(payload.get('start'), payload.get('stop')), (payload.get('old_start'), payload.get('old_stop'))]
+        months = set()
+        try:
+            for start, stop in periods:
+                if start:
+                    months |= cls.affected_months(start, stop)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Invalid calendar event period in payload {payload}: {str(e)}")
+            months = set()
+        # Trigger cũ không gửi start hoặc lịch đã bị xóa: không biết tháng nào
+        await cls.invalidate(months or None)
+
+
+pg_listener.add_handler(CALENDAR_EVENT_CHANNEL, MonthAvailability.on_calendar_event_changed)
+pg_listener.add_handler(CALENDAR_EVENT_STAFF_CHANNEL, MonthAvailability.on_calendar_event_changed)
@@ -0,0 +1,75 @@
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from redis.exceptions import RedisError
+from app.utils.cache import get_or_load
+from app.utils.pg_listener import pg_listener
+from app.utils.redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+BOOKING_LIST_PREFIX = "booking_list"
+BOOKING_LIST_TTL = 300  # giây, giới hạn dữ liệu cũ nếu bỏ lỡ NOTIFY khi mất kết nối listener
+BOOKING_LIST_VERSION_TTL = 86400
+CALENDAR_EVENT_CHANNEL = "calendar_event_changed"
+
+
+class BookingListCache:
+    """
+    Cache các trang danh sách lịch hẹn theo partner.
+
+    Key trang: booking_list:{partner_id}:v{version}:{hash bộ lọc}. Mỗi lần dữ liệu của partner
+    thay đổi, version được đổi sang giá trị mới nên mọi trang cũ không còn được đọc tới.
+    Request đang chạy query với version cũ sẽ ghi kết quả vào key cũ (không ai đọc), vì vậy
+    không có trường hợp dữ liệu trước khi hủy/đặt lịch được ghi đè lên cache mới.
+    """
+
+    @staticmethod
+    def _version_key(partner_id: int) -> str:
+        return f"{BOOKING_LIST_PREFIX}:{partner_id}:version"
+
+    @staticmethod
+    def _page_key(partner_id: int, version: str, filters: Dict[str, Any]) -> str:
+        digest = hashlib.md5(
+            json.dumps(filters, sort_keys=True, default=str).encode()
+        ).hexdigest()
+        return f"{BOOKING_LIST_PREFIX}:{partner_id}:v{version}:{digest}"
+
+    @classmethod
+    async def get_page(cls, partner_id: int, filters: Dict[str, Any],
+                       loader: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            version = await redis_client.get(cls._version_key(partner_id)) or 0
+        except RedisError as e:
+            logger.warning(f"Cannot read booking list version: {str(e)}")
+            return await loader()
+        return await get_or_load(
+            BOOKING_LIST_PREFIX,
+            cls._page_key(partner_id, version, filters),
+            loader,
+            ttl=BOOKING_LIST_TTL,
+        )
+
+    @classmethod
+    async def invalidate(cls, partner_id: Optional[int]):
+        """Bỏ toàn bộ trang cache của partner (đổi version)"""
+        if not partner_id:
+            return
+        try:
+            # Version là thời điểm đổi (ns): không trùng lại version cũ kể cả khi key version đã hết hạn
+            await redis_client.set(cls._version_key(partner_id), time.time_ns(), expiry=BOOKING_LIST_VERSION_TTL)
+        except RedisError as e:
+            logger.error(f"Cannot invalidate booking list cache of partner {partner_id}: {str(e)}")
+
+    @classmethod
+    async def on_calendar_event_changed(cls, payload: Dict[str, Any]):
+        """Handler NOTIFY từ trigger calendar_event (kể cả thay đổi từ Odoo backend)"""
+        await cls.invalidate(payload.get('partner_id'))
+        if payload.get('old_partner_id') and payload.get('old_partner_id') != payload.get('partner_id'):
+            await cls.invalidate(payload.get('old_partner_id'))
+
+
+pg_listener.add_handler(CALENDAR_EVENT_CHANNEL, BookingListCache.on_calendar_event_changed)
@@ -0,0 +1,208 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from app.utils.erp_db import PostgresDB
+from app.utils.metrics import registry
+from app.utils.pg_listener import pg_listener
+from .booking_cache import CALENDAR_EVENT_CHANNEL
+
+logger = logging.getLogger(__name__)
+
+BOOKING_CONTRACT_CHANNEL = "booking_contract_changed"
+
+EVENT_BOOKING = "booking"
+EVENT_CONTRACT = "contract"
+# Bỏ lỡ quá CATCH_UP_LIMIT thay đổi: client phải tải lại toàn bộ danh sách
+EVENT_RESET = "reset"
+
+HEARTBEAT_INTERVAL = 15  # giây
+SUBSCRIBER_QUEUE_SIZE = 100
+CATCH_UP_LIMIT = 200
+RECONNECT_DELAY_MS = 5000
+
+
+class BookingEventBroker:
+    """
+    Chia sẻ thay đổi lịch hẹn/hợp đồng từ NOTIFY (một listener cho mỗi worker) tới các
+    kết nối SSE của đúng partner. Mỗi kết nối có queue riêng, đầy thì bỏ sự kiện cũ nhất.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = defaultdict(set)
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    @asynccontextmanager
+    async def subscribe(self, partner_id: int) -> AsyncIterator[asyncio.Queue]:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers[partner_id].add(queue)
+        try:
+            yield queue
+        finally:
+            queues = self._subscribers.get(partner_id)
+            if queues is not None:
+                queues.discard(queue)
+                if not queues:
+                    del self._subscribers[partner_id]
+
+    def publish(self, partner_id: Optional[int], event: Dict[str, Any]):
+        for queue in list(self._subscribers.get(partner_id, ())):
+            if queue.full():
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    pass
+            queue.put_nowait(event)
+
+    async def on_calendar_event_changed(self, payload: Dict[str, Any]):
+        if payload.get('op') == 'DELETE':
+            return
+        self.publish(payload.get('partner_id'), {
+            'type': EVENT_BOOKING,
+            'id': payload.get('id'),
+            'cleaning_state': payload.get('cleaning_state'),
+            'payment_status': payload.get('payment_status'),
+            'write_date': payload.get('write_date'),
+        })
+
+    async def on_booking_contract_changed(self, payload: Dict[str, Any]):
+        if payload.get('op') == 'DELETE':
+            return
+        self.publish(payload.get('partner_id'), {
+            'type': EVENT_CONTRACT,
+            'id': payload.get('id'),
+            'state': payload.get('state'),
+            'payment_status': payload.get('payment_status'),
+            'write_date': payload.get('write_date'),
+        })
+
+
+booking_event_broker = BookingEventBroker()
+registry.gauge("booking_event_subscribers", "Số kết nối SSE đang mở trên worker",
+               callback=lambda: [({}, booking_event_broker.subscriber_count)])
+pg_listener.add_handler(CALENDAR_EVENT_CHANNEL, booking_event_broker.on_calendar_event_changed)
+pg_listener.add_handler(BOOKING_CONTRACT_CHANNEL, booking_event_broker.on_booking_contract_changed)
+
+
+def _event_id(event: Dict[str, Any]) -> Optional[str]:
+    """
+    Id SSE là (write_date, loại, id): nhiều bản ghi có thể cùng write_date (cùng transaction Odoo)
+    nên chỉ write_date thì khi nối lại sẽ lỡ các bản ghi còn lại.
+    """
+    if not event.get('write_date'):
+        return None
+    return f"{event['write_date']}|{event['type']}|{event['id']}"
+
+
+def _parse_event_id(last_event_id: Optional[str]) -> Optional[Tuple[datetime, str, int]]:
+    """Last-Event-ID -> (write_date UTC, loại, id) của sự kiện cuối cùng client đã nhận"""
+    if not last_event_id:
+        return None
+    parts = last_event_id.strip().split("|")
+    try:
+        write_date = datetime.fromisoformat(parts[0]).replace(tzinfo=None)
+        if len(parts) == 3:
+            return write_date, parts[1], int(parts[2])
+    except ValueError:
+        return None
+    # Id cũ chỉ có write_date: gửi lại cả các bản ghi cùng write_date
+    return write_date, '', 0
+
+
+async def _get_missed_events(partner_id: int, since: Tuple[datetime, str, int]) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Các thay đổi sau cursor since (so sánh theo bộ (write_date, loại, id)), dùng khi client kết nối
+    lại với Last-Event-ID. Trả kèm True nếu còn quá CATCH_UP_LIMIT thay đổi.
+    """
+    query = '''
+        SELECT * FROM (
+            SELECT 'booking' AS type, ce.id, ce.cleaning_state, NULL::varchar AS state,
+                   ce.payment_status, ce.write_date
+            FROM calendar_event ce
+            WHERE ce.partner_id = $1 AND ce.write_date >= $2
+            UNION ALL
+            SELECT 'contract' AS type, bc.id, NULL::varchar AS cleaning_state, bc.state,
+                   bc.payment_status, bc.write_date
+            FROM booking_contract bc
+            WHERE bc.partner_id = $1 AND bc.write_date >= $2
+        ) changes
+        WHERE (write_date, type, id) > ($2, $3::text, $4::int)
+        ORDER BY write_date, type, id
+        LIMIT {}
+    '''.format(CATCH_UP_LIMIT + 1)
+    rows = await PostgresDB.execute_query(query, [partner_id, *since])
+    truncated = len(rows) > CATCH_UP_LIMIT
+    events = []
+    for row in rows[:CATCH_UP_LIMIT]:
+        event = {
+            'type': row.get('type'),
+            'id': row.get('id'),
+            'payment_status': row.get('payment_status'),
+            'write_date': row.get('write_date').isoformat() if row.get('write_date') else None,
+        }
+        if row.get('type') == EVENT_BOOKING:
+            event['cleaning_state'] = row.get('cleaning_state')
+        else:
+            event['state'] = row.get('state')
+        events.append(event)
+    return events, truncated
+
+
+def _format_sse(event: Dict[str, Any]) -> str:
+    lines = []
+    event_id = _event_id(event)
+    if event_id:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event['type']}")
+    lines.append(f"data: {json.dumps(event, ensure_ascii=False)}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def stream_partner_events(request, partner_id: int, last_event_id: Optional[str] = None) -> AsyncIterator[str]:
+    """
+    Sinh luồng SSE cho partner: gửi lại thay đổi bị lỡ (nếu có Last-Event-ID), sau đó
+    đẩy thay đổi mới, heartbeat mỗi HEARTBEAT_INTERVAL giây để giữ kết nối qua proxy.
+    Chỉ gửi khi trạng thái của lịch/hợp đồng khác với lần gửi trước trên cùng kết nối.
+    """
+    last_sent: Dict[Any, tuple] = {}
+
+    def should_send(event: Dict[str, Any]) -> bool:
+        key = (event.get('type'), event.get('id'))
+        state = (event.get('cleaning_state'), event.get('state'), event.get('payment_status'))
+        if last_sent.get(key) == state:
+            return False
+        last_sent[key] = state
+        return True
+
+    # Đăng ký trước khi query bù để không lỡ thay đổi xảy ra giữa hai bước
+    async with booking_event_broker.subscribe(partner_id) as queue:
+        yield f"retry: {RECONNECT_DELAY_MS}\n\n"
+
+        since = _parse_event_id(last_event_id)
+        if since is not None:
+            events, truncated = await _get_missed_events(partner_id, since)
+            if truncated:
+                # Lỡ quá nhiều thay đổi: không gửi từng cái, client tải lại danh sách rồi nhận tiếp từ đây
+                yield _format_sse({'type': EVENT_RESET})
+            else:
+                for event in events:
+                    if should_send(event):
+                        yield _format_sse(event)
+
+        while True:
+            if await request.is_disconnected():
+                break
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            if should_send(event):
+                yield _format_sse(event)
@@ -1,14 +1,30 @@
+import asyncio
 import logging
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Set
 from app.utils.erp_db import PostgresDB
 from app.schemas.user import UserObject
 from app.config import settings, odoo
-from datetime import datetime
+from fastapi import HTTPException
+from datetime import date, datetime, timedelta
 from app.api.deps import get_value_fields_selection
-import locale
+from app.services.company_profile import CompanyProfileService
+from app.services.pricing_engine import (
+    PRICING_MODE_SHADOW,
+    QUOTE_COMPARE_FIELDS,
+    PricingEngine,
+    pricing_shadow,
+)
+from app.services.pricing_quote_cache import PricingQuoteCache
+from app.services.cleaning_dates import PeriodicPackageCache, generate_cleaning_dates
+from app.utils.datetime_vi import format_event_times, format_event_times_page, vn_to_utc
+from .booking_cache import BookingListCache
+from .booking_availability import MonthAvailability
 
 logger = logging.getLogger(__name__)
 
+PERIODIC_PRICING_BATCH_CONCURRENCY = 4
+PERIODIC_PRICING_BATCH_METHOD = 'calculate_periodic_booking_price_batch_api'
+
 
 class BookingService:
 
@@ -22,154 +38,19 @@ class BookingService:
             cleaning_state: str = None,
     ) -> Dict[str, Any]:
         try:
-            # Tính offset
-            offset = (page - 1) * limit
-
-            # Build query điều kiện
-            where_clause = "1=1"
-
-            where_clause += " and ce.partner_id = {} ".format(int(current_user.partner_id))
-
-
-
-
-            if from_date and to_date:
-                where_clause += " and ce.start between '{}' and '{}' ".format(from_date, to_date)
-
-            if cleaning_state:
-                where_clause += " and ce.cleaning_state = '{}' ".format(cleaning_state)
-
-            query = '''
-                    SELECT
-                        ce.id,
-                        ce.code,
-                        ce.cleaning_state,
-                        ce.amount_subtotal,
-                        ce.amount_tax,
-                        ce.amount_total,
-                        pp.id as product_id,
-                        
-                        COALESCE(pt.name ->> 'vi_VN', pt.name ->> 'en_US') AS product_name,
-                        STRING_AGG(
-                            CASE
-                                WHEN he.birthday IS NOT NULL THEN he.name || ' (' || EXTRACT(YEAR FROM he.birthday)::text || ')'
-                                ELSE he.name
-                            END,
-                            ', ' ORDER BY he.name
-                        ) AS employees,
-                        TO_CHAR(ce.start + interval '7 hours', 'DD-MM-YYYY HH24:MI') as start,
-                        TO_CHAR(ce.stop + interval '7 hours', 'DD-MM-YYYY HH24:MI') as stop,
-                        ce.description as description,
-                        rpc.id as contact_id,
-                        rcw2.id as contact_ward_id,
-                        rcs2.id as contact_state_id,
-                        rpc.phone as contact_phone,
-                        rpc.name as contact_name,
-                        CONCAT_WS(', ', rpc.street, rcw2.name, rcs2.name) AS contact_address,
-                        coalesce((select rp.phone from res_company rc join res_partner rp on rc.partner_id = rp.id limit 1), '') as company_phone,
-                        ce.estimated_total
-                    FROM calendar_event ce
-                         JOIN product_product pp ON ce.service_product_id = pp.id
-                         JOIN product_template pt ON pp.product_tmpl_id = pt.id
-                         left join calendar_event_staff_rel cesr ON ce.id = cesr.event_id
-                         left join  hr_employee he ON cesr.employee_id = he.id
-                         left join res_country_ward rcw on ce.ward_id = rcw.id
-                         left join res_country_state rcs on rcs.id = ce.state_id
-                         left join res_company rc on ce.company_id = ce.id
-                         left join res_partner rpc on ce.contact_id = rpc.id
-                         left join res_country_ward rcw2 on rpc.ward_id = rcw2.id
-                         left join res_country_state rcs2 on rcs2.id = rpc.state_id 
-                    where  {}
-                    GROUP BY ce.id, ce.code, ce.cleaning_state, ce.amount_subtotal, pt.name, rcw.name, rcs.name, rc.phone, 
-                    pp.id, rpc.id, rcw2.id, rcs2.id, rpc.phone, rpc.name, rpc.street, rcw2.name, rcs2.name,ce.estimated_total
-                    LIMIT {} OFFSET {}
-                '''.format(where_clause, limit, offset)
-
-            # Query đếm tổng số bài viết
-            count_query = '''
-                    SELECT COUNT(ce.id) as total
-                    FROM calendar_event ce
-                         JOIN product_product pp ON ce.service_product_id = pp.id
-                         JOIN product_template pt ON pp.product_tmpl_id = pt.id
-                         left join calendar_event_staff_rel cesr ON ce.id = cesr.event_id
-                         left join  hr_employee he ON cesr.employee_id = he.id
-                         left join res_country_ward rcw on ce.ward_id = rcw.id
-                         left join res_country_state rcs on rcs.id = ce.state_id
-                         left join res_company rc on ce.company_id = ce.id
-                         left join res_partner rpc on ce.contact_id = rpc.id
-                         left join res_country_ward rcw2 on rpc.ward_id = rcw2.id
-                         left join res_country_state rcs2 on rcs2.id = rpc.state_id 
-                    where {}
-                    GROUP BY ce.id, ce.cleaning_state, ce.amount_subtotal, pt.name, rcw.name, rcs.name, rc.phone, 
-                    pp.id, rpc.id, rcw2.id, rcs2.id, rpc.phone, rpc.name, rpc.street, rcw2.name, rcs2.name
-                '''.format(where_clause)
-
-            # Thực hiện queries
-            posts_result = await PostgresDB.execute_query(query)
-            data = []
-
-            ## get select state
-            leaning_state = await get_value_fields_selection('calendar.event', 'cleaning_state')
-
-            try:
-                locale.setlocale(locale.LC_TIME, 'vi_VN.UTF-8')
-            except locale.Error:
-                # Nếu không có locale tiếng Việt, dùng English fallback
-                locale.setlocale(locale.LC_TIME, 'C')
-
-            for item in posts_result:
-                start_dt = datetime.strptime(item.get('start'), '%d-%m-%Y %H:%M')
-                stop_dt = datetime.strptime(item.get('stop'), '%d-%m-%Y %H:%M')
-                date_to_string = start_dt.strftime("%A, %d tháng %m, %Y").replace(" 0", " ")
-                time_to_string = f"{start_dt.strftime('%H:%M')} - {stop_dt.strftime('%H:%M')}"
-                vals = {
-
-                    'id': item.get('id'),
-                    'code': item.get('code'),
-                    'cleaning_state': {
-                        'key': item.get('cleaning_state'),
-                        'value': leaning_state.get(item.get('cleaning_state'), ''),
-                    },
-                    'amount_subtotal': item.get('amount_subtotal'),
-                    'amount_tax': item.get('amount_tax'),
-                    'amount_total': item.get('amount_total') if item.get('amount_total') else item.get('estimated_total'),
-                    'product_service':{
-                        'id': item.get('product_id'),
-                        'name': item.get('product_name'),
-                    },
-                    'employee': item.get('employees'),
-                    'date_start': item.get('start'),
-                    'date_end': item.get('stop'),
-                    'description': item.get('description'),
-                    'company_phone': item.get('company_phone'),
-                    'date_to_string': date_to_string,
-                    'time_to_string': time_to_string,
-                    'contact': {
-                        'id': item.get('contact_id'),
-                        'name': item.get('contact_name'),
-                        'phone': item.get('contact_phone'),
-                        'ward_id': item.get('contact_ward_id'),
-                        'state_id': item.get('contact_state_id'),
-                        'address': item.get('contact_address'),
-                    },
-                    'phone_company': item.get('phone_company'),
-                }
-                data.append(vals)
-
-
-            count_result = await PostgresDB.execute_query(count_query)
-
-            total = count_result[0]["total"] if count_result else 0
-            total_pages = (total + limit - 1) // limit
-
-            return {
-                "success": True,
-                "data": data,
-                "current_page": page,
-                "limit": limit,
-                "total": total,
-                "total_pages": total_pages,
+            partner_id = int(current_user.partner_id)
+            filters = {
+                'page': page,
+                'limit': limit,
+                'from_date': from_date,
+                'to_date': to_date,
+                'cleaning_state': cleaning_state,
             }
+            return await BookingListCache.get_page(
+                partner_id,
+                filters,
+                lambda: BookingService._load_booking_page(partner_id, **filters),
+            )
 
         except Exception as e:
             logger.error(f"Error getting calendar event: {str(e)}")
@@ -180,124 +61,104 @@ class BookingService:
             }
 
     @staticmethod
-    async def get_booking_detail(booking_id: int) -> Dict[str, Any]:
-        try:
-            # Query lấy chi tiết bài viết
-            detail_query = '''
+    async def _load_booking_page(
+            partner_id: int,
+            page: int = 1,
+            limit: int = 10,
+            from_date: Optional[datetime] = None,
+            to_date: Optional[datetime] = None,
+            cleaning_state: str = None,
+    ) -> Dict[str, Any]:
+        """Query một trang danh sách lịch hẹn của partner (không cache)"""
+        # Tính offset
+        offset = (page - 1) * limit
+
+        # Build query điều kiện, chỉ lọc trên calendar_event để dùng index (partner_id, start)
+        conditions = ["ce.partner_id = $1", "ce.service_product_id IS NOT NULL"]
+        params: List[Any] = [int(partner_id)]
+
+        if from_date and to_date:
+            # Cột start là timestamp không timezone: bỏ tzinfo như khi so sánh chuỗi trước đây
+            params.extend([from_date.replace(tzinfo=None), to_date.replace(tzinfo=None)])
+            conditions.append("ce.start BETWEEN ${} AND ${}".format(len(params) - 1, len(params)))
+
+        if cleaning_state:
+            params.append(cleaning_state)
+            conditions.append("ce.cleaning_state = ${}".format(len(params)))
+
+        where_clause = " AND ".join(conditions)
+
+        # Lấy id của trang trước, sau đó mới join các bảng để lấy thông tin cho đúng các dòng trong trang
+        query = '''
+                WITH page AS (
+                    SELECT ce.id
+                    FROM calendar_event ce
+                    WHERE {}
+                    ORDER BY ce.start DESC, ce.id DESC
+                    LIMIT ${} OFFSET ${}
+                )
                 SELECT
-                        ce.id,
-                        ce.code,
-                        ce.cleaning_state,
-                        ce.payment_status,
-                        ce.payment_method_id,
-                        ce.price_per_hour,
-                        ce.amount_before_discount,
-                        ce.amount_subtotal,
-                        ce.amount_tax,
-                        ce.amount_total,
-                        ce.estimated_price,
-                        ce.estimated_tax,
-                        ce.estimated_total,
-                        ce.discount_amount,
-                        ce.discount_percent,
-                        ce.estimated_amount_before_discount,
-                        ce.estimated_discount_amount,
-                        ce.estimated_discount_percent,
-                        ce.appointment_duration,
-                        pp.id as product_id,
-                        pm.id as pm_id,
-                        pm.name as payment_method_name,
-                        pm.code as payment_method_code,
-                        COALESCE(pt.name ->> 'vi_VN', pt.name ->> 'en_US') AS product_name,
-                        STRING_AGG(
+                    ce.id,
+                    ce.code,
+                    ce.cleaning_state,
+                    ce.amount_subtotal,
+                    ce.amount_tax,
+                    ce.amount_total,
+                    pp.id as product_id,
+                    COALESCE(pt.name ->> 'vi_VN', pt.name ->> 'en_US') AS product_name,
+                    emp.employees,
+                    ce.start,
+                    ce.stop,
+                    ce.description as description,
+                    rpc.id as contact_id,
+                    rcw2.id as contact_ward_id,
+                    rcs2.id as contact_state_id,
+                    rpc.phone as contact_phone,
+                    rpc.name as contact_name,
+                    CONCAT_WS(', ', rpc.street, rcw2.name, rcs2.name) AS contact_address,
+                    ce.estimated_total
+                FROM page
+                     JOIN calendar_event ce ON ce.id = page.id
+                     JOIN product_product pp ON ce.service_product_id = pp.id
+                     JOIN product_template pt ON pp.product_tmpl_id = pt.id
+                     left join res_partner rpc on ce.contact_id = rpc.id
+                     left join res_country_ward rcw2 on rpc.ward_id = rcw2.id
+                     left join res_country_state rcs2 on rcs2.id = rpc.state_id
+                     left join lateral (
+                        SELECT STRING_AGG(
                             CASE
                                 WHEN he.birthday IS NOT NULL THEN he.name || ' (' || EXTRACT(YEAR FROM he.birthday)::text || ')'
                                 ELSE he.name
                             END,
                             ', ' ORDER BY he.name
-                        ) AS employees,
-                        TO_CHAR(ce.start + interval '7 hours', 'DD-MM-YYYY HH24:MI') as start,
-                        TO_CHAR(ce.stop + interval '7 hours', 'DD-MM-YYYY HH24:MI') as stop,
-                        CONCAT_WS(', ', ce.street, rcw.name, rcs.name) AS address,
-                        ce.description as description,
-                        rpc.id as contact_id,
-                        rcw2.id as contact_ward_id,
-                        rcs2.id as contact_state_id,
-                        rpc.phone as contact_phone,
-                        rpc.name as contact_name,
-                        CONCAT_WS(', ', rpc.street, rcw2.name, rcs2.name) AS contact_address,
-                        coalesce((select rp.phone from res_company rc join res_partner rp on rc.partner_id = rp.id limit 1), '') as company_phone
-                    FROM calendar_event ce
-                         JOIN product_product pp ON ce.service_product_id = pp.id
-                         JOIN product_template pt ON pp.product_tmpl_id = pt.id
-                         left join calendar_event_staff_rel cesr ON ce.id = cesr.event_id
-                         left join  hr_employee he ON cesr.employee_id = he.id
-                         left join res_country_ward rcw on ce.ward_id = rcw.id
-                         left join res_country_state rcs on rcs.id = ce.state_id
-                         left join res_company rc on ce.company_id = ce.id
-                         left join res_partner rpc on ce.contact_id = rpc.id
-                         left join res_country_ward rcw2 on rpc.ward_id = rcw2.id
-                         left join res_country_state rcs2 on rcs2.id = rpc.state_id
-                         left join payment_method pm on ce.payment_method_id = pm.id
-                    where  ce.id = {}
-                    GROUP BY ce.id, ce.code, ce.cleaning_state, ce.payment_status, ce.payment_method_id, ce.amount_subtotal, pt.name, rcw.name, rcs.name, rc.phone, 
-                    pp.id, rpc.id, rcw2.id, rcs2.id, rpc.phone, rpc.name, rpc.street, rcw2.name, rcs2.name, ce.price_per_hour,ce.estimated_price, ce.estimated_tax,ce.estimated_total, ce.discount_amount, ce.discount_percent, ce.estimated_discount_amount, ce.estimated_discount_percent, ce.amount_before_discount, ce.estimated_amount_before_discount, pm.id, pm.name, pm.code
-            '''.format(booking_id)
-
-            result = await PostgresDB.execute_query(detail_query)
-            
-            logger.info(f"📦 Query result count: {len(result) if result else 0}")
-            if result:
-                logger.info(f"✅ Found booking with ID: {result[0].get('id')}")
-
-            if not result:
-                logger.warning(f"⚠️ No booking found for ID: {booking_id}")
-                return {
-                    "success": False,
-                    "error": "Không tìm thấy bài viết",
-                    "data": None
-                }
-
-            item = result[0]
-            logger.info(f"📋 Returning booking data - ID: {item.get('id')}, Code: {item.get('code')}")
+                        ) AS employees
+                        FROM calendar_event_staff_rel cesr
+                             JOIN hr_employee he ON cesr.employee_id = he.id
+                        WHERE cesr.event_id = ce.id
+                     ) emp ON TRUE
+                ORDER BY ce.start DESC, ce.id DESC
+            '''.format(where_clause, len(params) + 1, len(params) + 2)
+
+        # Query đếm tổng số lịch
+        count_query = '''
+                SELECT COUNT(*) as total
+                FROM calendar_event ce
+                WHERE {}
+            '''.format(where_clause)
+
+        # Thực hiện queries
+        posts_result = await PostgresDB.execute_query(query, params + [limit, offset])
+        company_phone = await CompanyProfileService.get_company_phone()
+        data = []
+
+        ## get select state
+        leaning_state = await get_value_fields_selection('calendar.event', 'cleaning_state')
 
-            ## get select state
-            leaning_state = await get_value_fields_selection('calendar.event', 'cleaning_state')
-            try:
-                locale.setlocale(locale.LC_TIME, 'vi_VN.UTF-8')
-            except locale.Error:
-                # Nếu không có locale tiếng Việt, dùng English fallback
-                locale.setlocale(locale.LC_TIME, 'C')
-
-            start_dt = datetime.strptime(item.get('start'), '%d-%m-%Y %H:%M')
-            stop_dt = datetime.strptime(item.get('stop'), '%d-%m-%Y %H:%M')
-            date_to_string = start_dt.strftime("%A, %d tháng %m, %Y").replace(" 0", " ")
-            time_to_string = f"{start_dt.strftime('%H:%M')} - {stop_dt.strftime('%H:%M')}"
-
-            # Lấy discount: ưu tiên discount_amount, nếu không có thì dùng estimated_discount_amount
-            discount_amount = item.get('discount_amount')
-            discount_percent = item.get('discount_percent')
-            estimated_discount_amount = item.get('estimated_discount_amount')
-            estimated_discount_percent = item.get('estimated_discount_percent')
-            
-            # Xác định discount cuối cùng (ưu tiên không estimate)
-            final_discount_amount = discount_amount if (discount_amount is not None and discount_amount > 0) else (estimated_discount_amount if (estimated_discount_amount is not None and estimated_discount_amount > 0) else 0)
-            final_discount_percent = discount_percent if (discount_percent is not None and discount_percent > 0) else (estimated_discount_percent if (estimated_discount_percent is not None and estimated_discount_percent > 0) else 0)
-            
-            # Tính tiền trước discount: tiền sau discount + discount
-            # Lấy amount_subtotal hoặc estimated_price (tiền sau discount)
-            amount_before_discount = item.get('amount_before_discount') if item.get('amount_before_discount') else item.get('estimated_amount_before_discount')
-
-            # Payment method info
-            payment_method = None
-            if item.get('pm_id'):
-                payment_method = {
-                    'id': item.get('pm_id'),
-                    'name': item.get('payment_method_name'),
-                    'code': item.get('payment_method_code'),
-                }
+        # Ngày giờ (giờ Việt Nam) của cả trang
+        page_times = format_event_times_page(posts_result)
 
-            data = {
+        for item, times in zip(posts_result, page_times):
+            vals = {
 
                 'id': item.get('id'),
                 'code': item.get('code'),
@@ -305,34 +166,20 @@ class BookingService:
                     'key': item.get('cleaning_state'),
                     'value': leaning_state.get(item.get('cleaning_state'), ''),
                 },
-                'payment_status': item.get('payment_status', 'pending'),
-                'payment_method': payment_method,
-                'price_per_hour': item.get('price_per_hour'),
-                'appointment_duration': item.get('appointment_duration'),
                 'amount_subtotal': item.get('amount_subtotal'),
                 'amount_tax': item.get('amount_tax'),
-                'amount_total': item.get('amount_total'),
-                'estimated_price': item.get('estimated_price'),
-                'estimated_tax': item.get('estimated_tax'),
-                'estimated_total': item.get('estimated_total'),
-                'discount_amount': discount_amount,
-                'discount_percent': discount_percent,
-                'estimated_discount_amount': estimated_discount_amount,
-                'estimated_discount_percent': int(estimated_discount_percent),
-                'final_discount_amount': final_discount_amount,
-                'final_discount_percent': int(final_discount_percent),
-                'amount_before_discount': amount_before_discount,
-                'product_service': {
+                'amount_total': item.get('amount_total') if item.get('amount_total') else item.get('estimated_total'),
+                'product_service':{
                     'id': item.get('product_id'),
                     'name': item.get('product_name'),
                 },
                 'employee': item.get('employees'),
-                'date_start': item.get('start'),
-                'date_end': item.get('stop'),
+                'date_start': times['date_start'],
+                'date_end': times['date_end'],
                 'description': item.get('description'),
-                'company_phone': item.get('company_phone'),
-                'date_to_string': date_to_string,
-                'time_to_string': time_to_string,
+                'company_phone': company_phone,
+                'date_to_string': times['date_to_string'],
+                'time_to_string': times['time_to_string'],
                 'contact': {
                     'id': item.get('contact_id'),
                     'name': item.get('contact_name'),
@@ -341,9 +188,188 @@ class BookingService:
                     'state_id': item.get('contact_state_id'),
                     'address': item.get('contact_address'),
                 },
+                'phone_company': company_phone,
             }
+            data.append(vals)
 
 
+        count_result = await PostgresDB.execute_query(count_query, params)
+
+        total = count_result[0]["total"] if count_result else 0
+        total_pages = (total + limit - 1) // limit
+
+        return {
+            "success": True,
+            "data": data,
+            "current_page": page,
+            "limit": limit,
+            "total": total,
+            "total_pages": total_pages,
+        }
+
+    # Các cột chi tiết lịch hẹn dùng chung cho API chi tiết và API lấy nhiều lịch
+    DETAIL_QUERY = '''
+        SELECT
+                ce.id,
+                ce.code,
+                ce.cleaning_state,
+                ce.payment_status,
+                ce.payment_method_id,
+                ce.price_per_hour,
+                ce.amount_before_discount,
+                ce.amount_subtotal,
+                ce.amount_tax,
+                ce.amount_total,
+                ce.estimated_price,
+                ce.estimated_tax,
+                ce.estimated_total,
+                ce.discount_amount,
+                ce.discount_percent,
+                ce.estimated_amount_before_discount,
+                ce.estimated_discount_amount,
+                ce.estimated_discount_percent,
+                ce.appointment_duration,
+                pp.id as product_id,
+                pm.id as pm_id,
+                pm.name as payment_method_name,
+                pm.code as payment_method_code,
+                COALESCE(pt.name ->> 'vi_VN', pt.name ->> 'en_US') AS product_name,
+                emp.employees,
+                ce.start,
+                ce.stop,
+                CONCAT_WS(', ', ce.street, rcw.name, rcs.name) AS address,
+                ce.description as description,
+                rpc.id as contact_id,
+                rcw2.id as contact_ward_id,
+                rcs2.id as contact_state_id,
+                rpc.phone as contact_phone,
+                rpc.name as contact_name,
+                CONCAT_WS(', ', rpc.street, rcw2.name, rcs2.name) AS contact_address
+            FROM calendar_event ce
+                 JOIN product_product pp ON ce.service_product_id = pp.id
+                 JOIN product_template pt ON pp.product_tmpl_id = pt.id
+                 left join res_country_ward rcw on ce.ward_id = rcw.id
+                 left join res_country_state rcs on rcs.id = ce.state_id
+                 left join res_partner rpc on ce.contact_id = rpc.id
+                 left join res_country_ward rcw2 on rpc.ward_id = rcw2.id
+                 left join res_country_state rcs2 on rcs2.id = rpc.state_id
+                 left join payment_method pm on ce.payment_method_id = pm.id
+                 left join lateral (
+                    SELECT STRING_AGG(
+                        CASE
+                            WHEN he.birthday IS NOT NULL THEN he.name || ' (' || EXTRACT(YEAR FROM he.birthday)::text || ')'
+                            ELSE he.name
+                        END,
+                        ', ' ORDER BY he.name
+                    ) AS employees
+                    FROM calendar_event_staff_rel cesr
+                         JOIN hr_employee he ON cesr.employee_id = he.id
+                    WHERE cesr.event_id = ce.id
+                 ) emp ON TRUE
+            WHERE {}
+    '''
+
+    @staticmethod
+    def _build_booking_detail(item: Dict[str, Any], leaning_state: Dict[str, Any], company_phone: str) -> Dict[str, Any]:
+        """Dựng dữ liệu chi tiết lịch hẹn từ một dòng của DETAIL_QUERY"""
+        times = format_event_times(item.get('start'), item.get('stop'))
+
+        # Lấy discount: ưu tiên discount_amount, nếu không có thì dùng estimated_discount_amount
+        discount_amount = item.get('discount_amount')
+        discount_percent = item.get('discount_percent')
+        estimated_discount_amount = item.get('estimated_discount_amount')
+        estimated_discount_percent = item.get('estimated_discount_percent')
+
+        # Xác định discount cuối cùng (ưu tiên không estimate)
+        final_discount_amount = discount_amount if (discount_amount is not None and discount_amount > 0) else (estimated_discount_amount if (estimated_discount_amount is not None and estimated_discount_amount > 0) else 0)
+        final_discount_percent = discount_percent if (discount_percent is not None and discount_percent > 0) else (estimated_discount_percent if (estimated_discount_percent is not None and estimated_discount_percent > 0) else 0)
+
+        # Tính tiền trước discount: tiền sau discount + discount
+        # Lấy amount_subtotal hoặc estimated_price (tiền sau discount)
+        amount_before_discount = item.get('amount_before_discount') if item.get('amount_before_discount') else item.get('estimated_amount_before_discount')
+
+        # Payment method info
+        payment_method = None
+        if item.get('pm_id'):
+            payment_method = {
+                'id': item.get('pm_id'),
+                'name': item.get('payment_method_name'),
+                'code': item.get('payment_method_code'),
+            }
+
+        return {
+
+            'id': item.get('id'),
+            'code': item.get('code'),
+            'cleaning_state': {
+                'key': item.get('cleaning_state'),
+                'value': leaning_state.get(item.get('cleaning_state'), ''),
+            },
+            'payment_status': item.get('payment_status', 'pending'),
+            'payment_method': payment_method,
+            'price_per_hour': item.get('price_per_hour'),
+            'appointment_duration': item.get('appointment_duration'),
+            'amount_subtotal': item.get('amount_subtotal'),
+            'amount_tax': item.get('amount_tax'),
+            'amount_total': item.get('amount_total'),
+            'estimated_price': item.get('estimated_price'),
+            'estimated_tax': item.get('estimated_tax'),
+            'estimated_total': item.get('estimated_total'),
+            'discount_amount': discount_amount,
+            'discount_percent': discount_percent,
+            'estimated_discount_amount': estimated_discount_amount,
+            'estimated_discount_percent': int(estimated_discount_percent or 0),
+            'final_discount_amount': final_discount_amount,
+            'final_discount_percent': int(final_discount_percent),
+            'amount_before_discount': amount_before_discount,
+            'product_service': {
+                'id': item.get('product_id'),
+                'name': item.get('product_name'),
+            },
+            'employee': item.get('employees'),
+            'date_start': times['date_start'],
+            'date_end': times['date_end'],
+            'description': item.get('description'),
+            'company_phone': company_phone,
+            'date_to_string': times['date_to_string'],
+            'time_to_string': times['time_to_string'],
+            'contact': {
+                'id': item.get('contact_id'),
+                'name': item.get('contact_name'),
+                'phone': item.get('contact_phone'),
+                'ward_id': item.get('contact_ward_id'),
+                'state_id': item.get('contact_state_id'),
+                'address': item.get('contact_address'),
+            },
+        }
+
+    @classmethod
+    async def get_booking_detail(cls, booking_id: int) -> Dict[str, Any]:
+        try:
+            # Query lấy chi tiết lịch hẹn
+            result = await PostgresDB.execute_query(
+                cls.DETAIL_QUERY.format("ce.id = $1"), [int(booking_id)]
+            )
+            
+            logger.info(f"📦 Query result count: {len(result) if result else 0}")
+            if result:
+                logger.info(f"✅ Found booking with ID: {result[0].get('id')}")
+
+            if not result:
+                logger.warning(f"⚠️ No booking found for ID: {booking_id}")
+                return {
+                    "success": False,
+                    "error": "Không tìm thấy bài viết",
+                    "data": None
+                }
+
+            item = result[0]
+            logger.info(f"📋 Returning booking data - ID: {item.get('id')}, Code: {item.get('code')}")
+
+            ## get select state
+            leaning_state = await get_value_fields_selection('calendar.event', 'cleaning_state')
+            company_phone = await CompanyProfileService.get_company_phone()
+            data = cls._build_booking_detail(item, leaning_state, company_phone)
 
             return {
                 "success": True,
@@ -358,17 +384,62 @@ class BookingService:
                 "data": None
             }
 
+    @classmethod
+    async def get_booking_batch(cls, booking_ids: List[int], current_user: UserObject) -> Dict[str, Any]:
+        """
+        Lấy chi tiết nhiều lịch hẹn trong một query, chỉ trả về lịch thuộc về user hiện tại.
+        Kết quả là map id -> chi tiết, id không tồn tại hoặc không thuộc user có giá trị None.
+        """
+        try:
+            booking_ids = list(dict.fromkeys(int(booking_id) for booking_id in booking_ids))
+            result = await PostgresDB.execute_query(
+                cls.DETAIL_QUERY.format("ce.id = ANY($1::int[]) AND ce.partner_id = $2"),
+                [booking_ids, int(current_user.partner_id)],
+            )
+
+            data: Dict[str, Any] = {str(booking_id): None for booking_id in booking_ids}
+            if result:
+                leaning_state = await get_value_fields_selection('calendar.event', 'cleaning_state')
+                company_phone = await CompanyProfileService.get_company_phone()
+                for item in result:
+                    data[str(item.get('id'))] = cls._build_booking_detail(item, leaning_state, company_phone)
+
+            return {
+                "success": True,
+                "data": data
+            }
+
+        except Exception as e:
+            logger.error(f"Error getting booking batch: {str(e)}")
+            return {
+                "success": False,
+                "error": f"Lỗi khi lấy danh sách chi tiết lịch hẹn: {str(e)}",
+                "data": None
+            }
+
     @classmethod
     async def get_pricing_calculate(cls, data: dict, current_user: UserObject):
         data.update({
             'partner_id': current_user.partner_id
         })
-        result = await odoo.call_method_not_record(
-            model='calendar.event',
-            method='get_calculate_booking',
-            token=settings.ODOO_TOKEN,
-            kwargs=data,
+        result = await PricingQuoteCache.get_or_quote(
+            'get_calculate_booking',
+            data,
+            lambda: odoo.call_method_not_record(
+                model='calendar.event',
+                method='get_calculate_booking',
+                token=settings.ODOO_TOKEN,
+                kwargs=data,
+            ),
         )
+
+        if PricingEngine.mode() == PRICING_MODE_SHADOW and isinstance(result, dict):
+            pricing_shadow.compare_in_background(
+                {**result, 'missing_keys': [], 'extra_keys': []},
+                lambda: PricingEngine.shadow_summary(data, result),
+                QUOTE_COMPARE_FIELDS,
+                context={'request': data},
+            )
         return result
 
     @classmethod
@@ -382,21 +453,55 @@ class BookingService:
             token=settings.ODOO_TOKEN,
             kwargs=data,
         )
+        await BookingListCache.invalidate(current_user.partner_id)
+        months = cls._booking_months(data)
+        if months:
+            await MonthAvailability.invalidate(months)
         return result
 
+    @staticmethod
+    def _booking_months(data: dict) -> Optional[Set[date]]:
+        """
+        Các tháng của lịch vừa tạo (start là ngày/giờ Việt Nam), None nếu không xác định được
+        (lịch lặp lại, start sai định dạng): khi đó để NOTIFY calendar_event_changed làm mới theo tháng.
+        """
+        if data.get('is_recurring_service'):
+            return None
+        try:
+            start = datetime.fromisoformat(str(data['start']))
+            if len(str(data['start'])) <= 10:
+                start += timedelta(hours=int(data.get('start_hours') or 0))
+        except (KeyError, TypeError, ValueError):
+            return None
+        start = vn_to_utc(start)
+        stop = start + timedelta(hours=int(data.get('appointment_duration') or 0))
+        return MonthAvailability.affected_months(start.isoformat(), stop.isoformat())
+
     @classmethod
     async def get_value_state(cls):
         leaning_state = await get_value_fields_selection('calendar.event', 'cleaning_state')
         return leaning_state
 
     @classmethod
-    async def cancel_booking(cls, data: dict):
+    async def cancel_booking(cls, data: dict, current_user: UserObject):
         result = await odoo.call_method_not_record(
             model='calendar.event',
             method='cancel_event_api',
             token=settings.ODOO_TOKEN,
             kwargs=data,
         )
+        await BookingListCache.invalidate(current_user.partner_id)
+        try:
+            rows = await PostgresDB.execute_query(
+                "SELECT start, stop FROM calendar_event WHERE id = $1", [int(data.get('booking_id'))]
+            )
+            if rows and rows[0]['start']:
+                await MonthAvailability.invalidate(MonthAvailability.affected_months(
+                    rows[0]['start'].isoformat(), rows[0]['stop'].isoformat() if rows[0]['stop'] else None
+                ))
+        except Exception as e:
+            # Lịch đã hủy, NOTIFY calendar_event_changed vẫn làm mới tháng của lịch
+            logger.error(f"Cannot invalidate month availability after cancelling booking {data.get('booking_id')}: {str(e)}")
         return {
             'id': data.get('booking_id'),
         }
@@ -405,98 +510,51 @@ class BookingService:
     async def calculate_cleaning_dates(
             weekdays: List[int],
             package_id: int,
-            start_date: Optional[str] = None
+            start_date: Optional[str] = None,
+            exclude_holidays: bool = False,
     ) -> Dict[str, Any]:
         """Tính các ngày dọn dẹp dựa trên danh sách thứ trong tuần và gói"""
         try:
-            from datetime import datetime, timedelta
-            from dateutil.relativedelta import relativedelta
-            
             # Validate weekdays
             if not weekdays or len(weekdays) == 0:
                 return {
                     "success": False,
                     "error": "Vui lòng chọn ít nhất một thứ trong tuần"
                 }
-            
-            # Lấy thông tin gói từ database
-            package_query = '''
-                SELECT id, name, duration_months, min_booking_count
-                FROM periodic_package
-                WHERE id = {} AND active = true
-            '''.format(package_id)
-            package_result = await PostgresDB.execute_query(package_query)
-            
-            if not package_result:
+
+            # Lấy thông tin gói (cache trong bộ nhớ)
+            package = await PeriodicPackageCache.get(package_id)
+
+            if not package:
                 return {
                     "success": False,
                     "error": "Không tìm thấy gói định kỳ"
                 }
-            
-            package = package_result[0]
+
             duration_months = package['duration_months']
             min_booking_count = package['min_booking_count']
-            
+
             # Parse ngày bắt đầu
             if start_date:
                 try:
                     start_date_obj = datetime.strptime(start_date, '%Y-%m-%d').date()
-                except:
+                except ValueError:
                     start_date_obj = datetime.now().date()
             else:
                 start_date_obj = datetime.now().date()
-            
-            # Tính ngày kết thúc (start_date + duration_months tháng)
-            end_date = start_date_obj + relativedelta(months=duration_months)
-            
-            # Lấy tất cả các ngày có thứ trùng với bất kỳ weekday nào trong danh sách
-            cleaning_dates = []
-            weekday_names = ['Thứ 2', 'Thứ 3', 'Thứ 4', 'Thứ 5', 'Thứ 6', 'Thứ 7', 'Chủ nhật']
-            
-            # Chuyển đổi weekdays: 0=Thứ 2 -> 0 (Monday), 6=CN -> 6 (Sunday)
-            python_weekdays = []
-            for wd in weekdays:
-                python_weekday = wd if wd < 6 else 6
-                if python_weekday not in python_weekdays:
-                    python_weekdays.append(python_weekday)
-            
-            # Tìm ngày đầu tiên cho mỗi weekday
-            first_dates = {}
-            for python_weekday in python_weekdays:
-                current_weekday = start_date_obj.weekday()  # 0=Monday, 6=Sunday
-                days_ahead = python_weekday - current_weekday
-                if days_ahead < 0:  # Ngày đã qua trong tuần này
-                    days_ahead += 7
-                first_dates[python_weekday] = start_date_obj + timedelta(days=days_ahead)
-            
-            # Lấy tất cả các ngày có thứ trùng với bất kỳ weekday nào trong khoảng thời gian
-            all_dates_set = set()  # Dùng set để tránh trùng lặp
-            
-            for python_weekday in python_weekdays:
-                first_cleaning_date = first_dates[python_weekday]
-                current_cleaning_date = first_cleaning_date
-                
-                while current_cleaning_date <= end_date:
-                    date_str = current_cleaning_date.strftime('%Y-%m-%d')
-                    if date_str not in all_dates_set:
-                        all_dates_set.add(date_str)
-                        cleaning_dates.append({
-                            'date': date_str,
-                            'weekday': current_cleaning_date.weekday(),
-                            'weekday_name': weekday_names[current_cleaning_date.weekday()]
-                        })
-                    current_cleaning_date += timedelta(days=7)  # Tuần sau
-            
-            # Sắp xếp theo ngày
-            cleaning_dates.sort(key=lambda x: x['date'])
-            
+
+            # Các ngày trùng thứ đã chọn trong [start_date, start_date + duration_months tháng]
+            cleaning_dates = generate_cleaning_dates(
+                weekdays, start_date_obj, duration_months, exclude_holidays=exclude_holidays
+            )
+
             # Kiểm tra số lượng tối thiểu
             if len(cleaning_dates) < min_booking_count:
                 return {
                     'success': False,
                     'error': f'Gói {package["name"]} yêu cầu ít nhất {min_booking_count} lần đặt, nhưng chỉ có {len(cleaning_dates)} ngày'
                 }
-            
+
             return {
                 'success': True,
                 'data': cleaning_dates,
@@ -517,10 +575,124 @@ class BookingService:
         data.update({
             'partner_id': current_user.partner_id
         })
-        result = await odoo.call_method_not_record(
-            model='calendar.event',
-            method='calculate_periodic_booking_price_api',
-            token=settings.ODOO_TOKEN,
-            kwargs=data,
+        result = await PricingQuoteCache.get_or_quote(
+            'calculate_periodic_booking_price_api',
+            data,
+            lambda: odoo.call_method_not_record(
+                model='calendar.event',
+                method='calculate_periodic_booking_price_api',
+                token=settings.ODOO_TOKEN,
+                kwargs=data,
+            ),
         )
-        return result
\ No newline at end of file
+        return result
+
+    @classmethod
+    async def _price_periodic_batch_odoo(cls, items: List[Dict[str, Any]]) -> List[Any]:
+        """
+        Một lời gọi Odoo cho mọi phương án chưa có trong cache: calculate_periodic_booking_price_batch_api
+        nhận items (mỗi phần tử là kwargs của calculate_periodic_booking_price_api) và trả list kết quả
+        cùng thứ tự. Odoo chưa có method này (hoặc trả sai định dạng) thì gọi từng phương án,
+        tối đa PERIODIC_PRICING_BATCH_CONCURRENCY lời gọi cùng lúc.
+        """
+        try:
+            response = await odoo.call_method_not_record(
+                model='calendar.event',
+                method=PERIODIC_PRICING_BATCH_METHOD,
+                token=settings.ODOO_TOKEN,
+                kwargs={'items': items},
+            )
+            if isinstance(response, dict) and isinstance(response.get('data'), list):
+                response = response['data']
+            if not isinstance(response, list) or len(response) != len(items):
+                raise ValueError(f"unexpected response {type(response).__name__}")
+            return response
+        except Exception as e:
+            logger.warning(f"Odoo {PERIODIC_PRICING_BATCH_METHOD} unavailable, pricing {len(items)} "
+                           f"candidates one by one: {str(e)}")
+
+        semaphore = asyncio.Semaphore(PERIODIC_PRICING_BATCH_CONCURRENCY)
+
+        async def price(item: Dict[str, Any]):
+            async with semaphore:
+                try:
+                    return await odoo.call_method_not_record(
+                        model='calendar.event',
+                        method='calculate_periodic_booking_price_api',
+                        token=settings.ODOO_TOKEN,
+                        kwargs=item,
+                    )
+                except HTTPException as e:
+                    return {'success': False, 'error': e.detail}
+
+        return await asyncio.gather(*(price(item) for item in items))
+
+    @classmethod
+    async def calculate_periodic_pricing_batch(cls, data: dict, current_user: UserObject):
+        """
+        Báo giá nhiều phương án định kỳ (gói x thứ trong tuần x giờ bắt đầu) trong một request.
+        Ngày dọn dẹp tính local; các phương án trùng ngày/giờ gộp làm một, phương án đã có trong cache
+        báo giá (cùng key với calculate_periodic_pricing) không gọi lại Odoo, còn lại báo giá bằng
+        một lời gọi Odoo (_price_periodic_batch_odoo).
+        """
+        common = {
+            key: data.get(key)
+            for key in ('appointment_duration', 'categ_id', 'contact_id', 'employee_quantity',
+                        'program_id', 'card_id', 'extra_data')
+        }
+        common['partner_id'] = current_user.partner_id
+        candidates = data['candidates']
+        dates_results = await asyncio.gather(*(
+            cls.calculate_cleaning_dates(
+                candidate['weekdays'], candidate['package_id'], data.get('start_date'),
+                exclude_holidays=data.get('exclude_holidays', False),
+            )
+            for candidate in candidates
+        ))
+
+        positions: Dict[Any, int] = {}
+        items: List[Dict[str, Any]] = []
+        for candidate, dates_result in zip(candidates, dates_results):
+            if not dates_result.get('success'):
+                continue
+            dates = [row['date'] for row in dates_result['data']]
+            key = (tuple(dates), candidate['start_hours'])
+            if key not in positions:
+                positions[key] = len(items)
+                items.append(dict(common, dates=dates, start_hours=candidate['start_hours']))
+
+        try:
+            pricings = await PricingQuoteCache.get_or_quote_many(
+                'calculate_periodic_booking_price_api', items, cls._price_periodic_batch_odoo
+            )
+            error = None
+        except Exception as e:
+            logger.error(f"Error pricing periodic candidates: {str(e)}")
+            pricings, error = [], "Có lỗi xảy ra khi tính giá định kỳ"
+
+        result = []
+        for candidate, dates_result in zip(candidates, dates_results):
+            item = {
+                'package_id': candidate['package_id'],
+                'weekdays': candidate['weekdays'],
+                'start_hours': candidate['start_hours'],
+            }
+            result.append(item)
+            if not dates_result.get('success'):
+                item.update({'success': False, 'error': dates_result.get('error')})
+                continue
+            if error is not None:
+                item.update({'success': False, 'error': error})
+                continue
+
+            dates = [row['date'] for row in dates_result['data']]
+            pricing = pricings[positions[(tuple(dates), candidate['start_hours'])]]
+            item.update({
+                'success': bool(pricing.get('success')) if isinstance(pricing, dict) else True,
+                'package_name': dates_result.get('package_name'),
+                'duration_months': dates_result.get('duration_months'),
+                'dates': dates,
+                'total_dates': len(dates),
+                'pricing': pricing,
+            })
+        return result
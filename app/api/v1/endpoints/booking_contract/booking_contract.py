@@ -1,16 +1,19 @@
-from fastapi import APIRouter, HTTPException, Depends, Body, Path, Query
+from fastapi import APIRouter, HTTPException, Depends, Body, Path, Query, Response
 from typing import Optional
 import logging
 from datetime import datetime
 from app.api.deps import get_current_user
-from .booking_contract_service import BookingContractService
+from app.utils.idempotency import get_idempotency_key, run_idempotent
+from app.config import settings
+from .booking_contract_service import BookingContractService, CONTRACT_DETAIL_MESSAGE
 from app.api.v1.endpoints.payment.payment_service import PaymentService
 from app.api.v1.endpoints.booking.booking_service import BookingService
 from app.schemas.booking_contract_schema import CreatePayOSPaymentRequest
 from app.schemas.booking_contract_schema import (
     BookingContractCreateRequest, 
     BookingContractScheduleUpdateRequest, 
-    BookingContractCheckPriceRequest
+    BookingContractCheckPriceRequest,
+    BookingContractBulkRescheduleRequest,
 )
 from app.schemas.booking_schema import CalculateCleaningDatesRequest
 
@@ -26,11 +29,12 @@ async def get_booking_contracts(
         state: Optional[str] = None,
         from_date: Optional[datetime] = None,
         to_date: Optional[datetime] = None,
+        cursor: Optional[str] = Query(None, description="next_cursor của trang trước (phân trang keyset, chỉ khi BOOKING_CONTRACT_LIST_MODE=local)"),
         current_user=Depends(get_current_user),
 ):
     try:
         result = await BookingContractService.get_booking_contracts(
-            current_user, page, limit, from_date, to_date, state
+            current_user, page, limit, from_date, to_date, state, cursor
         )
         return {
             "success": True,
@@ -50,22 +54,32 @@ async def get_booking_contracts(
 @router.get("/{contract_id}", summary="Lấy chi tiết hợp đồng định kỳ")
 async def get_booking_contract_detail(
         contract_id: int = Path(..., description="ID hợp đồng"),
+        schedule_window: Optional[int] = Query(
+            None, ge=1, le=100, description="Chỉ trả N buổi sắp tới kèm schedule_summary, bỏ trống để trả toàn bộ buổi"
+        ),
         current_user=Depends(get_current_user),
 ):
     try:
-        result = await BookingContractService.get_booking_contract_detail(contract_id, current_user)
+        if settings.BOOKING_CONTRACT_DETAIL_SQL_JSON and not schedule_window:
+            document = await BookingContractService.get_booking_contract_detail_json(contract_id, current_user)
+            if document is not None:
+                return Response(content=document, media_type="application/json")
+
+        result = await BookingContractService.get_booking_contract_detail(
+            contract_id, current_user, schedule_window
+        )
         
         # Odoo trả về {success: true, data: {...}}, extract data để tránh nested
         if isinstance(result, dict) and result.get("success") and result.get("data"):
             return {
                 "success": True,
-                "message": "Lấy chi tiết hợp đồng định kỳ thành công",
+                "message": CONTRACT_DETAIL_MESSAGE,
                 "data": result.get("data"),
             }
         else:
             return {
                 "success": True,
-                "message": "Lấy chi tiết hợp đồng định kỳ thành công",
+                "message": CONTRACT_DETAIL_MESSAGE,
                 "data": result,
             }
     except HTTPException:
@@ -78,6 +92,38 @@ async def get_booking_contract_detail(
         )
 
 
+@router.get("/{contract_id}/schedules", summary="Lấy danh sách buổi dọn của hợp đồng")
+async def get_contract_schedules(
+        contract_id: int = Path(..., description="ID hợp đồng"),
+        limit: int = Query(20, ge=1, le=100),
+        cursor: Optional[str] = Query(None, description="next_cursor của trang trước"),
+        upcoming: bool = Query(False, description="Chỉ lấy các buổi từ hôm nay"),
+        current_user=Depends(get_current_user),
+):
+    try:
+        result = await BookingContractService.get_contract_schedules(
+            contract_id, current_user, limit, cursor, upcoming
+        )
+        if result is None:
+            raise HTTPException(
+                status_code=404,
+                detail="Không tìm thấy hợp đồng hoặc bạn không có quyền truy cập"
+            )
+        return {
+            "success": True,
+            "message": "Lấy danh sách buổi dọn thành công",
+            "data": result,
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error in get_contract_schedules: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail="Có lỗi xảy ra khi lấy danh sách buổi dọn"
+        )
+
+
 @router.post("/check-price", summary="Kiểm tra giá khi đổi lịch")
 async def check_schedule_price(
         request: BookingContractCheckPriceRequest = Body(...),
@@ -128,13 +174,59 @@ async def update_schedule_date(
         )
 
 
+@router.post("/{contract_id}/schedules/reschedule", summary="Đổi lịch nhiều buổi")
+async def bulk_reschedule(
+        contract_id: int = Path(..., description="ID hợp đồng"),
+        request: BookingContractBulkRescheduleRequest = Body(...),
+        current_user=Depends(get_current_user),
+        idempotency_key: Optional[str] = Depends(get_idempotency_key),
+):
+    """
+    Kiểm tra và báo giá tất cả các buổi trước, chỉ đổi khi mọi buổi hợp lệ (dry_run=true để chỉ báo giá).
+    Nếu Odoo lỗi giữa chừng, các buổi đã đổi được đưa về ngày cũ (xem rolled_back/rollback_failed).
+    """
+    try:
+        payload = request.dict()
+        result = await run_idempotent(
+            "contract_bulk_reschedule", idempotency_key, current_user, dict(payload, contract_id=contract_id),
+            lambda: BookingContractService.bulk_reschedule(
+                contract_id, payload['moves'], current_user, dry_run=payload['dry_run']
+            ),
+            store_if=lambda result: bool(result and result.get('applied')),
+        )
+        if result is None:
+            raise HTTPException(
+                status_code=404,
+                detail="Không tìm thấy hợp đồng hoặc bạn không có quyền truy cập"
+            )
+        return {
+            "success": result['success'],
+            "message": "Đổi lịch thành công" if result['applied'] else (
+                "Kiểm tra giá thành công" if result['success'] else "Không thể đổi lịch"
+            ),
+            "data": result,
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error in bulk_reschedule: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail="Có lỗi xảy ra khi đổi lịch"
+        )
+
+
 @router.post("/", summary="Tạo hợp đồng dọn dẹp định kỳ")
 async def create_booking_contract_post(
         current_user=Depends(get_current_user),
         request: BookingContractCreateRequest = Body(...),
+        idempotency_key: Optional[str] = Depends(get_idempotency_key),
 ):
     try:
-        result = await BookingContractService.create_booking_contract(request.dict(), current_user)
+        result = await run_idempotent(
+            "booking_contract_create", idempotency_key, current_user, request.dict(),
+            lambda: BookingContractService.create_booking_contract(request.dict(), current_user),
+        )
         return {
             "success": True,
             "message": "Tạo hợp đồng định kỳ thành công",
@@ -157,17 +249,26 @@ async def create_payos_payment(
         return_url: Optional[str] = Body(None, description="URL redirect sau khi thanh toán thành công"),
         cancel_url: Optional[str] = Body(None, description="URL redirect khi hủy thanh toán"),
         current_user=Depends(get_current_user),
+        idempotency_key: Optional[str] = Depends(get_idempotency_key),
 ):
     """
     Tạo payment link từ PayOS cho hợp đồng
     """
     try:
-        result = await PaymentService.create_payos_payment_contract_link(
-            contract_id=contract_id,
-            payment_method_id=payment_method_id,
-            current_user=current_user,
-            return_url=return_url,
-            cancel_url=cancel_url,
+        result = await run_idempotent(
+            "contract_payos_payment",
+            idempotency_key,
+            current_user,
+            {'contract_id': contract_id, 'payment_method_id': payment_method_id,
+             'return_url': return_url, 'cancel_url': cancel_url},
+            lambda: PaymentService.create_payos_payment_contract_link(
+                contract_id=contract_id,
+                payment_method_id=payment_method_id,
+                current_user=current_user,
+                return_url=return_url,
+                cancel_url=cancel_url,
+            ),
+            store_if=lambda result: bool(result.get('success')),
         )
         
         if not result.get('success'):
@@ -229,7 +330,8 @@ async def calculate_cleaning_dates(
         result = await BookingService.calculate_cleaning_dates(
             weekdays=request.weekdays,
             package_id=request.package_id,
-            start_date=request.start_date
+            start_date=request.start_date,
+            exclude_holidays=request.exclude_holidays,
         )
         
         if not result.get("success"):
@@ -1,15 +1,221 @@
+import asyncio
+import base64
+import json
 import logging
-from typing import Dict, Any, Optional
-from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import date, datetime
+from fastapi import HTTPException
 from app.utils.erp_db import PostgresDB
+from app.utils.shadow import ShadowComparator
+from app.utils.datetime_vi import to_vn_time
 from app.schemas.user import UserObject
 from app.config import settings, odoo
 
 logger = logging.getLogger(__name__)
 
+CONTRACT_LIST_MODE_ODOO = "odoo"
+CONTRACT_LIST_MODE_SHADOW = "shadow"
+CONTRACT_LIST_MODE_LOCAL = "local"
+
+SCHEDULE_DONE_STATES = ['done']
+BULK_RESCHEDULE_CONCURRENCY = 4
+
+CONTRACT_LIST_TOTAL_KEYS = ('total', 'total_count', 'count')
+CONTRACT_LIST_ITEMS_KEYS = ('items', 'contracts', 'records', 'data')
+# missing_*: khóa của response/item Odoo mà bản Postgres chưa có, phải rỗng trước khi chuyển sang local
+CONTRACT_LIST_COMPARE_FIELDS = {
+    'total': ('total',),
+    'ids': ('ids',),
+    'missing_keys': ('missing_keys',),
+    'missing_item_keys': ('missing_item_keys',),
+}
+
+contract_list_shadow = ShadowComparator("booking_contract_list")
+
+SCHEDULES_QUERY = '''
+    SELECT
+        sbc.id,
+        sbc.date_cleaning AS date_cleaning_value,
+        TO_CHAR(sbc.date_cleaning, 'YYYY-MM-DD') as date_cleaning,
+        sbc.time_cleaning,
+        sbc.hours,
+        sbc.base_amount,
+        sbc.amount,
+        sbc.state,
+        sbc.actual_event_id,
+        ce.id as event_id,
+        ce.name as event_name,
+        TO_CHAR(ce.start, 'YYYY-MM-DD HH24:MI:SS') as event_start,
+        ce.cleaning_state
+    FROM schedule_booking_calendar sbc
+    LEFT JOIN calendar_event ce ON sbc.actual_event_id = ce.id
+    WHERE {}
+    ORDER BY sbc.date_cleaning ASC{}
+    {}
+'''
+
+CONTRACT_DETAIL_MESSAGE = "Lấy chi tiết hợp đồng định kỳ thành công"
+
+# Cùng cấu trúc với response của get_booking_contract_detail + endpoint, nhưng Postgres dựng cả document
+CONTRACT_DETAIL_JSON_QUERY = '''
+    SELECT json_build_object(
+        'success', true,
+        'message', $3::text,
+        'data', json_build_object(
+            'id', bc.id,
+            'code', bc.code,
+            'name', bc.name,
+            'partner_id', bc.partner_id,
+            'partner_name', rp.name,
+            'contact_id', bc.contact_id,
+            'contact_name', ca.name,
+            'contact_address', COALESCE(CONCAT_WS(', ', ca.street, rcw.name, rcs.name), ''),
+            'package_id', bc.package_id,
+            'package_name', COALESCE(pp.name, ''),
+            'package_duration_months', COALESCE(pp.duration_months, 0),
+            'categ_id', bc.categ_id,
+            'categ_name', COALESCE(
+                CASE
+                    WHEN pg_typeof(pc.name) = 'jsonb'::regtype
+                    THEN COALESCE(pc.name::jsonb ->> 'vi_VN', pc.name::jsonb ->> 'en_US')
+                    ELSE pc.name::text
+                END, ''),
+            'start_date', TO_CHAR(bc.start_date, 'YYYY-MM-DD'),
+            'end_date', TO_CHAR(bc.end_date, 'YYYY-MM-DD'),
+            'start_hours', bc.start_hours,
+            'appointment_duration', bc.appointment_duration,
+            'total_hours', bc.total_hours,
+            'required_staff_qty', bc.required_staff_qty,
+            'state', bc.state,
+            'payment_status', bc.payment_status,
+            'payment_method', CASE WHEN pm.id IS NOT NULL THEN json_build_object(
+                'id', pm.id,
+                'name', pm.name,
+                'code', pm.code
+            ) END,
+            'price_unit', bc.price_unit,
+            'base_price', bc.base_price,
+            'extra_total', bc.extra_total,
+            'amount_before_discount', bc.amount_before_discount,
+            'discount_amount', bc.discount_amount,
+            'discount_percent', bc.discount_percent,
+            'amount_subtotal', bc.amount_subtotal,
+            'amount_tax', bc.amount_tax,
+            'amount_total', bc.amount_total,
+            'program_id', bc.program_id,
+            'program_name', COALESCE(lp.name, ''),
+            'description', COALESCE(bc.description, ''),
+            'schedules', COALESCE((
+                SELECT json_agg(json_build_object(
+                    'id', sbc.id,
+                    'date_cleaning', TO_CHAR(sbc.date_cleaning, 'YYYY-MM-DD'),
+                    'time_cleaning', sbc.time_cleaning,
+                    'hours', sbc.hours,
+                    'base_amount', sbc.base_amount,
+                    'amount', sbc.amount,
+                    'state', sbc.state,
+                    'actual_event_id', sbc.actual_event_id,
+                    'actual_event', CASE WHEN ce.id IS NOT NULL THEN json_build_object(
+                        'id', ce.id,
+                        'name', ce.name,
+                        'start', TO_CHAR(ce.start, 'YYYY-MM-DD HH24:MI:SS'),
+                        'cleaning_state', ce.cleaning_state
+                    ) END
+                ) ORDER BY sbc.date_cleaning ASC)
+                FROM schedule_booking_calendar sbc
+                LEFT JOIN calendar_event ce ON sbc.actual_event_id = ce.id
+                WHERE sbc.contract_id = bc.id
+            ), '[]'::json),
+            'extra_services', COALESCE((
+                SELECT json_agg(json_build_object(
+                    'id', es.id,
+                    'product_id', es.product_id,
+                    'product_name', CASE
+                        WHEN pg_typeof(pt.name) = 'jsonb'::regtype
+                        THEN COALESCE(pt.name::jsonb ->> 'vi_VN', pt.name::jsonb ->> 'en_US')
+                        ELSE pt.name::text
+                    END,
+                    'quantity', es.quantity,
+                    'price_unit', es.price_unit
+                ))
+                FROM extra_service es
+                LEFT JOIN product_product epp ON es.product_id = epp.id
+                LEFT JOIN product_template pt ON epp.product_tmpl_id = pt.id
+                WHERE es.contract_id = bc.id
+            ), '[]'::json),
+            'is_periodic', true
+        )
+    )::text
+    FROM booking_contract bc
+    LEFT JOIN res_partner rp ON bc.partner_id = rp.id
+    LEFT JOIN customer_address ca ON bc.contact_id = ca.id
+    LEFT JOIN res_country_ward rcw ON ca.ward_id = rcw.id
+    LEFT JOIN res_country_state rcs ON ca.state_id = rcs.id
+    LEFT JOIN periodic_package pp ON bc.package_id = pp.id
+    LEFT JOIN product_category pc ON bc.categ_id = pc.id
+    LEFT JOIN loyalty_program lp ON bc.program_id = lp.id
+    LEFT JOIN payment_method pm ON bc.payment_method_id = pm.id
+    WHERE bc.id = $1 AND bc.partner_id = $2
+'''
+
+
+def encode_keyset_cursor(value: date, record_id: int) -> str:
+    """Cursor phân trang keyset theo (ngày, id) của dòng cuối trang"""
+    raw = json.dumps([value.isoformat(), record_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_keyset_cursor(cursor: str) -> Tuple[date, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value, record_id = json.loads(raw)
+        return date.fromisoformat(value), int(record_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor không hợp lệ")
+
+
+def _odoo_list_summary(result: Any) -> Dict[str, Any]:
+    """
+    Tổng số, danh sách id và tập khóa (của response, của item) từ kết quả get_booking_contracts_api.
+    Không tìm thấy tổng số/danh sách thì để None: so sánh báo lệch thay vì bỏ qua.
+    """
+    payload = result
+    if isinstance(payload, dict) and isinstance(payload.get('data'), (dict, list)):
+        payload = payload['data']
+    summary: Dict[str, Any] = {'total': None, 'ids': None, 'keys': [], 'item_keys': []}
+    items = payload
+    if isinstance(payload, dict):
+        summary['keys'] = sorted(payload)
+        summary['total'] = next((payload[key] for key in CONTRACT_LIST_TOTAL_KEYS if key in payload), None)
+        items = next(
+            (payload[key] for key in CONTRACT_LIST_ITEMS_KEYS if isinstance(payload.get(key), list)),
+            None,
+        )
+    if isinstance(items, list):
+        items = [item for item in items if isinstance(item, dict)]
+        summary['ids'] = [item.get('id') for item in items]
+        summary['item_keys'] = sorted({key for item in items for key in item})
+    return summary
+
+
+def _local_list_summary(local: Dict[str, Any], expected: Dict[str, Any]) -> Dict[str, Any]:
+    """Kết quả Postgres ở dạng so sánh được với _odoo_list_summary"""
+    item_keys = {key for item in local['items'] for key in item}
+    return {
+        'total': local['total'],
+        'ids': [item['id'] for item in local['items']],
+        'missing_keys': [key for key in expected['keys'] if key not in local],
+        # Trang rỗng thì không biết item có những khóa nào
+        'missing_item_keys': [key for key in expected['item_keys'] if key not in item_keys] if local['items'] else [],
+    }
+
 
 class BookingContractService:
 
+    @staticmethod
+    def list_mode() -> str:
+        return (settings.BOOKING_CONTRACT_LIST_MODE or CONTRACT_LIST_MODE_ODOO).lower()
+
     @classmethod
     async def get_booking_contracts(
         cls,
@@ -19,8 +225,17 @@ class BookingContractService:
         from_date: Optional[datetime] = None,
         to_date: Optional[datetime] = None,
         state: Optional[str] = None,
+        cursor: Optional[str] = None,
     ) -> Dict[str, Any]:
         """Lấy danh sách hợp đồng định kỳ"""
+        mode = cls.list_mode()
+        if mode == CONTRACT_LIST_MODE_LOCAL:
+            return await cls.get_booking_contracts_local(
+                current_user, page, limit, from_date, to_date, state, cursor
+            )
+        if cursor:
+            # Phân trang theo cursor chỉ có ở Postgres, chưa chuyển sang local thì không trả dạng khác Odoo
+            raise HTTPException(status_code=400, detail="Phân trang theo cursor chưa được hỗ trợ")
         try:
             result = await odoo.call_method_not_record(
                 model='booking.contract',
@@ -35,18 +250,233 @@ class BookingContractService:
                     'state': state,
                 },
             )
-            return result
         except Exception as e:
             logger.error(f"Error getting booking contracts: {str(e)}")
             raise
 
+        if mode == CONTRACT_LIST_MODE_SHADOW:
+            expected = _odoo_list_summary(result)
+
+            async def compute_local():
+                local = await cls.get_booking_contracts_local(current_user, page, limit, from_date, to_date, state)
+                return _local_list_summary(local, expected)
+
+            contract_list_shadow.compare_in_background(
+                {**expected, 'missing_keys': [], 'missing_item_keys': []},
+                compute_local,
+                CONTRACT_LIST_COMPARE_FIELDS,
+                context={'partner_id': current_user.partner_id, 'page': page, 'limit': limit, 'state': state,
+                         'from_date': str(from_date) if from_date else None,
+                         'to_date': str(to_date) if to_date else None},
+            )
+        return result
+
+    @staticmethod
+    async def get_booking_contracts_local(
+        current_user: UserObject,
+        page: int = 1,
+        limit: int = 10,
+        from_date: Optional[datetime] = None,
+        to_date: Optional[datetime] = None,
+        state: Optional[str] = None,
+        cursor: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Danh sách hợp đồng đọc trực tiếp từ Postgres, mới nhất trước theo (start_date, id).
+        Có cursor thì phân trang keyset (không OFFSET), không có thì theo page như Odoo.
+        Tiến độ (số buổi đã xong/tổng số buổi) và số hợp đồng theo trạng thái tính trong SQL.
+        """
+        params: List[Any] = [int(current_user.partner_id)]
+        conditions = ["bc.partner_id = $1"]
+        if from_date:
+            params.append(from_date.date() if isinstance(from_date, datetime) else from_date)
+            conditions.append("bc.start_date >= ${}".format(len(params)))
+        if to_date:
+            params.append(to_date.date() if isinstance(to_date, datetime) else to_date)
+            conditions.append("bc.start_date <= ${}".format(len(params)))
+        # Số hợp đồng theo trạng thái: tính trước khi lọc theo state để app hiện số trên các tab
+        counts_where = " AND ".join(conditions)
+        counts_params = list(params)
+
+        if state:
+            params.append(state)
+            conditions.append("bc.state = ${}".format(len(params)))
+        offset = 0
+        if cursor:
+            cursor_date, cursor_id = decode_keyset_cursor(cursor)
+            params.extend([cursor_date, cursor_id])
+            conditions.append("(bc.start_date, bc.id) < (${}, ${})".format(len(params) - 1, len(params)))
+        else:
+            offset = (max(page, 1) - 1) * limit
+
+        params.append(SCHEDULE_DONE_STATES)
+        done_states_param = len(params)
+        params.extend([limit + 1, offset])
+        query = '''
+            WITH page AS (
+                SELECT bc.id
+                FROM booking_contract bc
+                WHERE {}
+                ORDER BY bc.start_date DESC, bc.id DESC
+                LIMIT ${} OFFSET ${}
+            )
+            SELECT
+                bc.id,
+                bc.code,
+                bc.name,
+                bc.partner_id,
+                rp.name as partner_name,
+                bc.contact_id,
+                ca.name as contact_name,
+                COALESCE(
+                    CONCAT_WS(', ', ca.street, rcw.name, rcs.name),
+                    ''
+                ) as contact_address,
+                bc.package_id,
+                pp.name as package_name,
+                pp.duration_months as package_duration_months,
+                bc.categ_id,
+                CASE
+                    WHEN pg_typeof(pc.name) = 'jsonb'::regtype
+                    THEN COALESCE(pc.name::jsonb ->> 'vi_VN', pc.name::jsonb ->> 'en_US')
+                    ELSE pc.name::text
+                END as categ_name,
+                bc.start_date as start_date_value,
+                TO_CHAR(bc.start_date, 'YYYY-MM-DD') as start_date,
+                TO_CHAR(bc.end_date, 'YYYY-MM-DD') as end_date,
+                bc.start_hours,
+                bc.appointment_duration,
+                bc.total_hours,
+                bc.required_staff_qty,
+                bc.state,
+                bc.payment_status,
+                bc.price_unit,
+                bc.base_price,
+                bc.extra_total,
+                bc.amount_before_discount,
+                bc.discount_amount,
+                bc.discount_percent,
+                bc.amount_subtotal,
+                bc.amount_tax,
+                bc.amount_total,
+                bc.program_id,
+                lp.name as program_name,
+                bc.description,
+                pm.id as pm_id,
+                pm.name as payment_method_name,
+                pm.code as payment_method_code,
+                progress.schedule_count,
+                progress.done_count
+            FROM page
+                 JOIN booking_contract bc ON bc.id = page.id
+                 LEFT JOIN res_partner rp ON bc.partner_id = rp.id
+                 LEFT JOIN customer_address ca ON bc.contact_id = ca.id
+                 LEFT JOIN res_country_ward rcw ON ca.ward_id = rcw.id
+                 LEFT JOIN res_country_state rcs ON ca.state_id = rcs.id
+                 LEFT JOIN periodic_package pp ON bc.package_id = pp.id
+                 LEFT JOIN product_category pc ON bc.categ_id = pc.id
+                 LEFT JOIN loyalty_program lp ON bc.program_id = lp.id
+                 LEFT JOIN payment_method pm ON bc.payment_method_id = pm.id
+                 LEFT JOIN LATERAL (
+                    SELECT
+                        COUNT(*) AS schedule_count,
+                        COUNT(*) FILTER (WHERE sbc.state = ANY(${}::varchar[])) AS done_count
+                    FROM schedule_booking_calendar sbc
+                    WHERE sbc.contract_id = bc.id
+                 ) progress ON TRUE
+            ORDER BY bc.start_date DESC, bc.id DESC
+        '''.format(" AND ".join(conditions), len(params) - 1, len(params), done_states_param)
+
+        counts_query = '''
+            SELECT bc.state, COUNT(*) AS total
+            FROM booking_contract bc
+            WHERE {}
+            GROUP BY bc.state
+        '''.format(counts_where)
+
+        rows = await PostgresDB.execute_query(query, params)
+        count_rows = await PostgresDB.execute_query(counts_query, counts_params)
+
+        state_counts = {row['state']: row['total'] for row in count_rows}
+        total = state_counts.get(state, 0) if state else sum(state_counts.values())
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        items = []
+        for row in rows:
+            schedule_count = row.get('schedule_count') or 0
+            done_count = row.get('done_count') or 0
+            # Cùng tên và định dạng trường với chi tiết hợp đồng (trừ schedules/extra_services)
+            items.append({
+                'id': row.get('id'),
+                'code': row.get('code'),
+                'name': row.get('name'),
+                'partner_id': row.get('partner_id'),
+                'partner_name': row.get('partner_name'),
+                'contact_id': row.get('contact_id'),
+                'contact_name': row.get('contact_name'),
+                'contact_address': row.get('contact_address') or '',
+                'package_id': row.get('package_id'),
+                'package_name': row.get('package_name') or '',
+                'package_duration_months': row.get('package_duration_months') or 0,
+                'categ_id': row.get('categ_id'),
+                'categ_name': row.get('categ_name') or '',
+                'start_date': row.get('start_date'),
+                'end_date': row.get('end_date'),
+                'start_hours': row.get('start_hours'),
+                'appointment_duration': row.get('appointment_duration'),
+                'total_hours': row.get('total_hours'),
+                'required_staff_qty': row.get('required_staff_qty'),
+                'state': row.get('state'),
+                'payment_status': row.get('payment_status'),
+                'payment_method': {
+                    'id': row.get('pm_id'),
+                    'name': row.get('payment_method_name'),
+                    'code': row.get('payment_method_code'),
+                } if row.get('pm_id') else None,
+                'price_unit': row.get('price_unit'),
+                'base_price': row.get('base_price'),
+                'extra_total': row.get('extra_total'),
+                'amount_before_discount': row.get('amount_before_discount'),
+                'discount_amount': row.get('discount_amount'),
+                'discount_percent': row.get('discount_percent'),
+                'amount_subtotal': row.get('amount_subtotal'),
+                'amount_tax': row.get('amount_tax'),
+                'amount_total': row.get('amount_total'),
+                'program_id': row.get('program_id'),
+                'program_name': row.get('program_name') or '',
+                'description': row.get('description') or '',
+                'is_periodic': True,
+                'progress': {
+                    'done': done_count,
+                    'total': schedule_count,
+                    'percent': round(done_count * 100 / schedule_count) if schedule_count else 0,
+                },
+            })
+
+        next_cursor = None
+        if has_more and rows and rows[-1].get('start_date_value'):
+            next_cursor = encode_keyset_cursor(rows[-1]['start_date_value'], rows[-1]['id'])
+        return {
+            'items': items,
+            'total': total,
+            'state_counts': state_counts,
+            'page': page if not cursor else None,
+            'limit': limit,
+            'next_cursor': next_cursor,
+        }
+
     @classmethod
     async def get_booking_contract_detail(
         cls,
         contract_id: int,
         current_user: UserObject,
+        schedule_window: Optional[int] = None,
     ) -> Dict[str, Any]:
-        """Lấy chi tiết hợp đồng định kỳ - Query trực tiếp từ database"""
+        """
+        Lấy chi tiết hợp đồng định kỳ - Query trực tiếp từ database.
+        schedule_window: chỉ trả schedule_window buổi sắp tới và schedule_summary thay vì toàn bộ buổi.
+        """
         try:
             # Query thông tin contract chính
             contract_query = '''
@@ -119,54 +549,17 @@ class BookingContractService:
             contract = contract_result[0]
             
             # Query schedules
-            schedules_query = '''
-                SELECT 
-                    sbc.id,
-                    TO_CHAR(sbc.date_cleaning, 'YYYY-MM-DD') as date_cleaning,
-                    sbc.time_cleaning,
-                    sbc.hours,
-                    sbc.base_amount,
-                    sbc.amount,
-                    sbc.state,
-                    sbc.actual_event_id,
-                    ce.id as event_id,
-                    ce.name as event_name,
-                    TO_CHAR(ce.start, 'YYYY-MM-DD HH24:MI:SS') as event_start,
-                    ce.cleaning_state
-                FROM schedule_booking_calendar sbc
-                LEFT JOIN calendar_event ce ON sbc.actual_event_id = ce.id
-                WHERE sbc.contract_id = {}
-                ORDER BY sbc.date_cleaning ASC
-            '''.format(contract_id)
-            
-            schedules_result = await PostgresDB.execute_query(schedules_query)
-            
-            schedules = []
-            for schedule in schedules_result:
-                schedule_data = {
-                    'id': schedule.get('id'),
-                    'date_cleaning': schedule.get('date_cleaning'),
-                    'time_cleaning': schedule.get('time_cleaning'),
-                    'hours': schedule.get('hours'),
-                    'base_amount': schedule.get('base_amount'),
-                    'amount': schedule.get('amount'),
-                    'state': schedule.get('state'),
-                    'actual_event_id': schedule.get('actual_event_id'),
-                }
-                
-                # Thêm actual_event nếu có
-                if schedule.get('event_id'):
-                    schedule_data['actual_event'] = {
-                        'id': schedule.get('event_id'),
-                        'name': schedule.get('event_name'),
-                        'start': schedule.get('event_start'),
-                        'cleaning_state': schedule.get('cleaning_state'),
-                    }
-                else:
-                    schedule_data['actual_event'] = None
-                
-                schedules.append(schedule_data)
-            
+            if schedule_window:
+                # Chỉ trả các buổi sắp tới kèm số liệu tổng hợp, phần còn lại lấy qua /{contract_id}/schedules
+                schedule_summary, schedules, schedules_next_cursor = await cls._get_schedule_window(
+                    contract_id, schedule_window
+                )
+            else:
+                schedules_result = await PostgresDB.execute_query(SCHEDULES_QUERY.format(
+                    "sbc.contract_id = $1", "", ""
+                ), [int(contract_id)])
+                schedules = [cls._build_schedule(schedule) for schedule in schedules_result]
+
             # Query extra services
             extra_services_query = '''
                 SELECT 
@@ -246,6 +639,9 @@ class BookingContractService:
                 'extra_services': extra_services,
                 'is_periodic': True,
             }
+            if schedule_window:
+                data['schedule_summary'] = schedule_summary
+                data['schedules_next_cursor'] = schedules_next_cursor
             
             return {
                 'success': True,
@@ -259,6 +655,114 @@ class BookingContractService:
                 'data': None
             }
 
+    @staticmethod
+    async def get_booking_contract_detail_json(contract_id: int, current_user: UserObject) -> Optional[bytes]:
+        """
+        Response chi tiết hợp đồng (đã gồm success/message) do Postgres dựng trong một câu lệnh,
+        trả về bytes JSON để endpoint gửi thẳng, không decode/encode lại trong Python.
+        None nếu không tìm thấy hợp đồng của partner.
+        """
+        document = await PostgresDB.fetchval(
+            CONTRACT_DETAIL_JSON_QUERY,
+            [int(contract_id), int(current_user.partner_id), CONTRACT_DETAIL_MESSAGE],
+        )
+        return document.encode() if document is not None else None
+
+    @staticmethod
+    def _build_schedule(schedule: Dict[str, Any]) -> Dict[str, Any]:
+        schedule_data = {
+            'id': schedule.get('id'),
+            'date_cleaning': schedule.get('date_cleaning'),
+            'time_cleaning': schedule.get('time_cleaning'),
+            'hours': schedule.get('hours'),
+            'base_amount': schedule.get('base_amount'),
+            'amount': schedule.get('amount'),
+            'state': schedule.get('state'),
+            'actual_event_id': schedule.get('actual_event_id'),
+        }
+
+        # Thêm actual_event nếu có
+        if schedule.get('event_id'):
+            schedule_data['actual_event'] = {
+                'id': schedule.get('event_id'),
+                'name': schedule.get('event_name'),
+                'start': schedule.get('event_start'),
+                'cleaning_state': schedule.get('cleaning_state'),
+            }
+        else:
+            schedule_data['actual_event'] = None
+        return schedule_data
+
+    @classmethod
+    async def _get_schedules_page(cls, contract_id: int, limit: int, from_date: Optional[date] = None,
+                                  cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Trang buổi dọn theo (date_cleaning, id) tăng dần, dùng index (contract_id, date_cleaning)"""
+        params: List[Any] = [int(contract_id)]
+        conditions = ["sbc.contract_id = $1"]
+        if from_date:
+            params.append(from_date)
+            conditions.append("sbc.date_cleaning >= ${}".format(len(params)))
+        if cursor:
+            cursor_date, cursor_id = decode_keyset_cursor(cursor)
+            params.extend([cursor_date, cursor_id])
+            conditions.append("(sbc.date_cleaning, sbc.id) > (${}, ${})".format(len(params) - 1, len(params)))
+        params.append(limit + 1)
+        rows = await PostgresDB.execute_query(SCHEDULES_QUERY.format(
+            " AND ".join(conditions), ", sbc.id ASC", "LIMIT ${}".format(len(params))
+        ), params)
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_keyset_cursor(rows[-1]['date_cleaning_value'], rows[-1]['id'])
+        return [cls._build_schedule(row) for row in rows], next_cursor
+
+    @classmethod
+    async def _get_schedule_window(cls, contract_id: int, window: int):
+        today = to_vn_time(datetime.utcnow()).date()
+        summary_rows = await PostgresDB.execute_query('''
+            SELECT
+                COUNT(*) AS total,
+                COUNT(*) FILTER (WHERE sbc.state = ANY($2::varchar[])) AS done,
+                COUNT(*) FILTER (WHERE sbc.date_cleaning >= $3) AS upcoming,
+                TO_CHAR(MIN(sbc.date_cleaning) FILTER (WHERE sbc.date_cleaning >= $3), 'YYYY-MM-DD') AS next_date
+            FROM schedule_booking_calendar sbc
+            WHERE sbc.contract_id = $1
+        ''', [int(contract_id), SCHEDULE_DONE_STATES, today])
+        summary = summary_rows[0] if summary_rows else {}
+        schedules, next_cursor = await cls._get_schedules_page(contract_id, window, from_date=today)
+        schedule_summary = {
+            'total': summary.get('total') or 0,
+            'done': summary.get('done') or 0,
+            'upcoming': summary.get('upcoming') or 0,
+            'next_date': summary.get('next_date'),
+        }
+        return schedule_summary, schedules, next_cursor
+
+    @classmethod
+    async def get_contract_schedules(
+        cls,
+        contract_id: int,
+        current_user: UserObject,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        upcoming: bool = False,
+    ) -> Optional[Dict[str, Any]]:
+        """Danh sách buổi dọn của hợp đồng phân trang theo cursor, None nếu hợp đồng không thuộc user"""
+        owner = await PostgresDB.execute_query(
+            "SELECT id FROM booking_contract WHERE id = $1 AND partner_id = $2",
+            [int(contract_id), int(current_user.partner_id)],
+        )
+        if not owner:
+            return None
+        from_date = to_vn_time(datetime.utcnow()).date() if upcoming else None
+        schedules, next_cursor = await cls._get_schedules_page(contract_id, limit, from_date, cursor)
+        return {
+            'items': schedules,
+            'limit': limit,
+            'next_cursor': next_cursor,
+        }
+
     @classmethod
     async def check_schedule_price(
         cls,
@@ -311,6 +815,138 @@ class BookingContractService:
             logger.error(f"Error updating schedule date: {str(e)}")
             raise
 
+    @classmethod
+    async def bulk_reschedule(
+        cls,
+        contract_id: int,
+        moves: List[Dict[str, Any]],
+        current_user: UserObject,
+        dry_run: bool = False,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Đổi lịch nhiều buổi trong một request.
+
+        1. Kiểm tra buổi thuộc hợp đồng của user, ngày hợp lệ, không trùng buổi/ngày.
+        2. Báo giá song song (tối đa BULK_RESCHEDULE_CONCURRENCY lời gọi Odoo cùng lúc).
+        3. Có lỗi hoặc dry_run: dừng, chưa đổi buổi nào.
+        4. Đổi lần lượt; một buổi lỗi thì đổi các buổi đã đổi về ngày cũ (Odoo không có API đổi
+           nhiều buổi trong một transaction nên dùng bù trừ thay cho commit nguyên khối).
+
+        None nếu hợp đồng không thuộc user.
+        """
+        rows = await PostgresDB.execute_query('''
+            SELECT sbc.id, TO_CHAR(sbc.date_cleaning, 'YYYY-MM-DD') AS date_cleaning
+            FROM booking_contract bc
+                 LEFT JOIN schedule_booking_calendar sbc ON sbc.contract_id = bc.id
+            WHERE bc.id = $1 AND bc.partner_id = $2
+        ''', [int(contract_id), int(current_user.partner_id)])
+        if not rows:
+            return None
+        current_dates = {row['id']: row['date_cleaning'] for row in rows if row['id'] is not None}
+        today = to_vn_time(datetime.utcnow()).date()
+
+        items = []
+        seen_schedules = set()
+        seen_dates = set()
+        for move in moves:
+            item = {
+                'schedule_id': move['schedule_id'],
+                'old_date': current_dates.get(move['schedule_id']),
+                'new_date': move['new_date'],
+                'error': None,
+            }
+            try:
+                new_date = date.fromisoformat(move['new_date'])
+            except ValueError:
+                new_date = None
+            if move['schedule_id'] not in current_dates:
+                item['error'] = "Buổi dọn không thuộc hợp đồng"
+            elif move['schedule_id'] in seen_schedules:
+                item['error'] = "Buổi dọn bị đổi nhiều lần trong cùng yêu cầu"
+            elif item['old_date'] is None or date.fromisoformat(item['old_date']) < today:
+                # Buổi đã qua không đổi được và cũng không đổi về được khi phải bù trừ
+                item['error'] = "Không thể đổi buổi dọn đã qua"
+            elif new_date is None:
+                item['error'] = "Ngày mới không hợp lệ (YYYY-MM-DD)"
+            elif new_date < today:
+                item['error'] = "Không thể đổi sang ngày đã qua"
+            elif move['new_date'] in seen_dates:
+                item['error'] = "Nhiều buổi được đổi sang cùng một ngày"
+            seen_schedules.add(move['schedule_id'])
+            seen_dates.add(move['new_date'])
+            items.append(item)
+
+        if not any(item['error'] for item in items):
+            semaphore = asyncio.Semaphore(BULK_RESCHEDULE_CONCURRENCY)
+
+            async def check_price(item):
+                async with semaphore:
+                    try:
+                        item['price'] = await cls.check_schedule_price(
+                            contract_id, item['schedule_id'], item['new_date'], current_user
+                        )
+                    except HTTPException as e:
+                        item['error'] = e.detail
+                    except Exception as e:
+                        item['error'] = f"Lỗi khi kiểm tra giá: {str(e)}"
+                    else:
+                        if isinstance(item['price'], dict) and item['price'].get('success') is False:
+                            item['error'] = item['price'].get('error') or "Không thể đổi sang ngày này"
+
+            await asyncio.gather(*(check_price(item) for item in items))
+
+        result = {
+            'dry_run': dry_run,
+            'applied': False,
+            'moves': items,
+            'rolled_back': [],
+            'rollback_failed': [],
+        }
+        if dry_run or any(item['error'] for item in items):
+            result['success'] = not any(item['error'] for item in items)
+            return result
+
+        applied = []
+        failed = None
+        for item in items:
+            try:
+                update = await cls.update_schedule_date(
+                    contract_id, item['schedule_id'], {'new_date': item['new_date']}, current_user
+                )
+                if isinstance(update, dict) and update.get('success') is False:
+                    raise ValueError(update.get('error') or "Odoo từ chối đổi lịch")
+            except Exception as e:
+                item['error'] = e.detail if isinstance(e, HTTPException) else str(e)
+                failed = item
+                break
+            applied.append(item)
+
+        if failed is None:
+            result.update({'success': True, 'applied': True})
+            return result
+
+        # Bù trừ: đưa các buổi đã đổi về ngày cũ, theo thứ tự ngược
+        logger.warning(f"Bulk reschedule of contract {contract_id} failed at schedule {failed['schedule_id']}, rolling back")
+        today = to_vn_time(datetime.utcnow()).date()
+        for item in reversed(applied):
+            if date.fromisoformat(item['old_date']) < today:
+                # Ngày cũ đã qua trong lúc đang đổi, Odoo sẽ từ chối
+                logger.error(f"Rollback of schedule {item['schedule_id']} skipped: {item['old_date']} is in the past")
+                result['rollback_failed'].append(item['schedule_id'])
+                continue
+            try:
+                update = await cls.update_schedule_date(
+                    contract_id, item['schedule_id'], {'new_date': item['old_date']}, current_user
+                )
+                if isinstance(update, dict) and update.get('success') is False:
+                    raise ValueError(update.get('error') or "Odoo từ chối đổi lịch")
+                result['rolled_back'].append(item['schedule_id'])
+            except Exception as e:
+                logger.error(f"Rollback of schedule {item['schedule_id']} failed: {str(e)}")
+                result['rollback_failed'].append(item['schedule_id'])
+        result['success'] = False
+        return result
+
     @classmethod
     async def create_booking_contract(cls, data: dict, current_user: UserObject):
         """Tạo hợp đồng dọn dẹp định kỳ"""
@@ -4,6 +4,7 @@ import logging
 from typing import List, Optional, Dict, Any, Annotated
 from app.api.deps import verify_signature
 from app.schemas.common_schema import CommonHeaderPortal
+from app.utils.conditional import conditional_get
 from .category_service import CategoryService
 
 logger = logging.getLogger(__name__)
@@ -18,6 +19,7 @@ async def get_category(
         limit: int = 10,
         page: int = 1,
         _=Depends(verify_signature),
+        _conditional=Depends(conditional_get("product_category")),
 ):
     try:
         result = await CategoryService.get_category_service(
@@ -57,6 +59,7 @@ async def get_product_extra(
         headers: Annotated[CommonHeaderPortal, Header()],
         category_id: int = Query(..., description="ID của category"),
         _=Depends(verify_signature),
+        _conditional=Depends(conditional_get("product_category_product_product_extra_rel", "product_product", "product_template")),
 ):
     try:
         result = await CategoryService.get_product_extra_service(
@@ -90,6 +93,7 @@ async def get_cleaning_script(
         headers: Annotated[CommonHeaderPortal, Header()],
         category_id: int = Query(..., description="ID của category"),
         _=Depends(verify_signature),
+        _conditional=Depends(conditional_get("product_category", "cleaning_script_template")),
 ):
     try:
         result = await CategoryService.get_cleaning_script_service(
@@ -123,6 +127,7 @@ async def get_employee_configs(
         headers: Annotated[CommonHeaderPortal, Header()],
         category_id: int = Query(..., description="ID của category"),
         _=Depends(verify_signature),
+        _conditional=Depends(conditional_get("product_category_employee_config")),
 ):
     try:
         result = await CategoryService.get_employee_configs_service(
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException, Query, Path,Depends,Header
 from typing import Optional
 import logging
+from datetime import datetime
 from typing import List, Optional, Dict, Any, Annotated
 from app.api.deps import get_current_user
 from .employee_service import EmployeeService
@@ -13,10 +14,15 @@ router = APIRouter()
 @router.get("/available", summary="Lấy danh sách nhân viên có sẵn")
 async def get_employee_available(
         categ_id: int,
+        start: Optional[datetime] = Query(None, description="Thời gian bắt đầu (giờ Việt Nam), bỏ trống để lấy theo Odoo"),
+        appointment_duration: Optional[int] = Query(None, ge=1, description="Thời gian dịch vụ (giờ)"),
+        employee_quantity: int = Query(1, ge=1, description="Số lượng nhân viên cần"),
         current_user=Depends(get_current_user),
 ):
     try:
-        result = await EmployeeService.get_employee_available(categ_id, current_user)
+        result = await EmployeeService.get_employee_available(
+            categ_id, current_user, start, appointment_duration, employee_quantity
+        )
 
         if not result["success"]:
             raise HTTPException(
@@ -1,7 +1,10 @@
 import logging
+from datetime import datetime, timedelta
 from typing import List, Optional, Dict, Any
 from app.utils.erp_db import PostgresDB
+from app.utils.datetime_vi import vn_to_utc
 from app.schemas.user import UserObject
+from app.services.availability_engine import AvailabilityUnavailable, availability_engine
 from app.config import settings, odoo
 logger = logging.getLogger(__name__)
 
@@ -9,7 +12,19 @@ logger = logging.getLogger(__name__)
 class EmployeeService:
 
     @classmethod
-    async def get_employee_available(cls, category_id : int, current_user: UserObject):
+    async def get_employee_available(cls, category_id : int, current_user: UserObject,
+                                     start: Optional[datetime] = None,
+                                     appointment_duration: Optional[int] = None,
+                                     employee_quantity: int = 1):
+        if start is not None and appointment_duration:
+            try:
+                return await cls.get_employee_available_local(
+                    category_id, start, appointment_duration, employee_quantity
+                )
+            except AvailabilityUnavailable as e:
+                # Chỉ mục cục bộ chưa dựng được thì hỏi Odoo như trước
+                logger.warning(f"Local availability unavailable, falling back to Odoo: {str(e)}")
+
         response = await odoo.call_method_not_record(
             model='hr.employee',
             method='get_available_employee_api',
@@ -23,4 +38,22 @@ class EmployeeService:
             'data': response
         }
 
-        return result
\ No newline at end of file
+        return result
+
+    @staticmethod
+    async def get_employee_available_local(category_id: int, start: datetime,
+                                           appointment_duration: int, employee_quantity: int = 1):
+        """Nhân viên rảnh trong khung giờ, tính từ chỉ mục lịch bận trong bộ nhớ (start theo giờ Việt Nam)"""
+        await availability_engine.ensure_loaded()
+        start_utc = vn_to_utc(start)
+        employees = availability_engine.available_employees(
+            category_id, start_utc, start_utc + timedelta(hours=appointment_duration)
+        )
+        return {
+            'success': True,
+            'data': {
+                'employees': employees,
+                'employee_quantity': employee_quantity,
+                'is_available': len(employees) >= employee_quantity,
+            }
+        }
@@ -8,6 +8,7 @@ from app.api.deps import verify_signature
 from app.schemas.common_schema import CommonHeaderPortal
 from app.config import BOOKING_HOURS, APPOINTMENT_DURATION, QUANTITY, TIME_OPTIONS, EMPLOYEE_QUANTITY, WEEKDAYS
 from app.api.deps import get_current_user
+from app.utils.conditional import conditional_get
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +23,7 @@ async def get_booking(
         state_id: int = None,
         search: Optional[str] = None,
         _=Depends(verify_signature),
+        _conditional=Depends(conditional_get("res_country_ward")),
 ):
     try:
         result = await MasterdatasService.get_ward(page, limit, search,state_id)
@@ -50,6 +52,7 @@ async def get_state(
         page: int = 1,
         search: Optional[str] = None,
         _=Depends(verify_signature),
+        _conditional=Depends(conditional_get("res_country_state", "res_country")),
 ):
     try:
         logger.info(f"Getting states with params: page={page}, limit={limit}, search={search}")
@@ -197,6 +200,7 @@ async def get_employee_quantity(
 @router.get("/periodic-packages", summary="Lấy danh sách gói định kỳ")
 async def get_periodic_packages(
         current_user=Depends(get_current_user),
+        _conditional=Depends(conditional_get("periodic_package")),
 ):
     try:
         result = await MasterdatasService.get_periodic_packages()
@@ -242,6 +246,7 @@ async def get_weekdays(
 async def get_payment_methods(
         is_periodic: bool = Query(False, description="Là gói định kỳ (chỉ trả về chuyển khoản). Giá trị: true hoặc false"),
         current_user=Depends(get_current_user),
+        _conditional=Depends(conditional_get("payment_method")),
 ):
     try:
         # FastAPI tự động convert query string sang boolean
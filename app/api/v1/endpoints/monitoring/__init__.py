@@ -0,0 +1,3 @@
+from .monitoring import router
+
+__all__ = ["router"]
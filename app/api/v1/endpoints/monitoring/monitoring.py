@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Depends, Header, Query
+from fastapi.responses import JSONResponse, Response
+import logging
+from typing import Annotated
+from .monitoring_service import MonitoringService
+from app.api.deps import verify_signature
+from app.schemas.common_schema import CommonHeaderPortal
+from app.utils.metrics import PROMETHEUS_CONTENT_TYPE
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+@router.get("/health", summary="Kiểm tra tình trạng Redis và PostgreSQL")
+async def get_health():
+    result = await MonitoringService.get_health()
+    return JSONResponse(status_code=200 if result["success"] else 503, content=result)
+
+
+@router.get("/metrics", summary="Metrics theo định dạng Prometheus")
+async def get_metrics():
+    return Response(content=MonitoringService.get_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@router.get("/cache/top-keys", summary="Các cache key lớn nhất và được truy cập nhiều nhất (theo worker)")
+async def get_cache_top_keys(
+        headers: Annotated[CommonHeaderPortal, Header()],
+        limit: int = Query(20, ge=1, le=200),
+        _=Depends(verify_signature),
+):
+    return MonitoringService.get_cache_top_keys(limit)
+
+
+@router.get("/shadow", summary="Kết quả so sánh shadow (theo worker)")
+async def get_shadow_reports(
+        headers: Annotated[CommonHeaderPortal, Header()],
+        _=Depends(verify_signature),
+):
+    return MonitoringService.get_shadow_reports()
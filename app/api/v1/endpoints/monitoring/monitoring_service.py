@@ -0,0 +1,77 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict
+
+from app.utils.cache import cache_key_stats
+from app.utils.erp_db import PostgresDB
+from app.utils.metrics import registry
+from app.utils.redis_client import redis_client
+from app.utils.shadow import ShadowComparator
+
+logger = logging.getLogger(__name__)
+
+HEALTH_CHECK_TIMEOUT = 2  # giây
+
+
+class MonitoringService:
+
+    @staticmethod
+    async def _check(name: str, coro) -> Dict[str, Any]:
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(coro, timeout=HEALTH_CHECK_TIMEOUT)
+            status = "up"
+            error = None
+        except Exception as e:
+            logger.error(f"Health check {name} failed: {str(e)}")
+            status = "down"
+            error = str(e) or type(e).__name__
+        result = {
+            "status": status,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+        }
+        if error:
+            result["error"] = error
+        return result
+
+    @classmethod
+    async def get_health(cls) -> Dict[str, Any]:
+        """Kiểm tra Redis (PING) và PostgreSQL (SELECT 1), kèm số liệu pool Redis"""
+        redis_status, postgres_status = await asyncio.gather(
+            cls._check("redis", redis_client.ping()),
+            cls._check("postgres", PostgresDB.execute_query("SELECT 1")),
+        )
+        redis_status["pool"] = redis_client.pool_stats()
+        healthy = redis_status["status"] == "up" and postgres_status["status"] == "up"
+        return {
+            "success": healthy,
+            "message": "Hệ thống hoạt động bình thường" if healthy else "Có dịch vụ không khả dụng",
+            "data": {
+                "redis": redis_status,
+                "postgres": postgres_status,
+            }
+        }
+
+    @staticmethod
+    def get_metrics() -> str:
+        return registry.render()
+
+    @staticmethod
+    def get_cache_top_keys(limit: int = 20) -> Dict[str, Any]:
+        return {
+            "success": True,
+            "message": "Lấy thống kê cache key thành công",
+            "data": {
+                "by_size": cache_key_stats.top(limit, by="size"),
+                "by_requests": cache_key_stats.top(limit, by="requests"),
+            }
+        }
+
+    @staticmethod
+    def get_shadow_reports() -> Dict[str, Any]:
+        return {
+            "success": True,
+            "message": "Lấy kết quả so sánh shadow thành công",
+            "data": [comparator.summary() for comparator in ShadowComparator.all()],
+        }
@@ -70,10 +70,36 @@ class PaymentService:
                     'signature': signature,
                 },
             )
+            # Bỏ cache danh sách lịch ngay, không chờ NOTIFY calendar_event_changed (đường thứ hai,
+            # trễ nếu pg_listener mất kết nối)
+            await cls._invalidate_booking_list(result)
             return result
         except Exception as e:
             logger.error(f"Error handling PayOS webhook: {str(e)}")
             raise
+
+    @staticmethod
+    async def _invalidate_booking_list(result: Any):
+        """
+        Bỏ cache danh sách lịch của partner có booking vừa thanh toán. Webhook đã được Odoo xử lý
+        nên lỗi ở đây chỉ ghi log, không được làm webhook lỗi (PayOS sẽ gửi lại).
+        """
+        try:
+            payload = result.get('data') if isinstance(result, dict) and isinstance(result.get('data'), dict) else result
+            if not isinstance(payload, dict):
+                return
+            partner_id = payload.get('partner_id')
+            if not partner_id and payload.get('booking_id'):
+                rows = await PostgresDB.execute_query(
+                    "SELECT partner_id FROM calendar_event WHERE id = $1", [int(payload['booking_id'])]
+                )
+                partner_id = rows[0]['partner_id'] if rows else None
+            if partner_id:
+                # Import trong hàm: package booking import ngược PaymentService
+                from app.api.v1.endpoints.booking.booking_cache import BookingListCache
+                await BookingListCache.invalidate(int(partner_id))
+        except Exception as e:
+            logger.error(f"Cannot invalidate booking list cache after PayOS webhook: {str(e)}")
     
     @classmethod
     async def get_payment_status(
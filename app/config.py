@@ -1,7 +1,12 @@
+import logging
+from datetime import date
+from pydantic import field_validator
 from pydantic_settings import BaseSettings
 from enum import Enum
 from app.utils.odoo import Odoo
 
+logger = logging.getLogger(__name__)
+
 
 class Settings(BaseSettings):
     ROOT_DIR: str = '/'.join(__file__.split('/')[:-2])
@@ -22,6 +27,20 @@ class Settings(BaseSettings):
     # Redis configuration
     REDIS_URL: str = ""
     REDIS_DEFAULT_EXPIRY: int = 3600  # 1 hour in seconds
+    REDIS_SERIALIZER: str = "msgpack"  # msgpack | json
+    REDIS_COMPRESS_THRESHOLD: int = 1024  # bytes, nén zlib giá trị lớn hơn ngưỡng, 0 để tắt
+    REDIS_MODE: str = "standalone"  # standalone | sentinel | cluster
+    REDIS_MAX_CONNECTIONS: int = 50  # mỗi worker (cluster: mỗi node)
+    REDIS_POOL_TIMEOUT: float = 5  # giây chờ kết nối rảnh khi pool đã đầy
+    REDIS_SOCKET_TIMEOUT: float = 5
+    REDIS_SOCKET_CONNECT_TIMEOUT: float = 3
+    REDIS_SOCKET_KEEPALIVE: bool = True
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30  # giây, PING kết nối rảnh lâu hơn khoảng này trước khi dùng lại
+    REDIS_RETRY_ON_TIMEOUT: bool = True
+    REDIS_RETRY_ATTEMPTS: int = 3
+    REDIS_SENTINELS: str = ""  # host1:26379,host2:26379
+    REDIS_SENTINEL_MASTER: str = "mymaster"
+    REDIS_SENTINEL_PASSWORD: str = ""
 
     # Sentry configuration
     SENTRY_DSN: str = ""
@@ -30,9 +49,39 @@ class Settings(BaseSettings):
 
     PORTAL_KEY: str
 
+    # Tính giá lịch hẹn: odoo (gọi Odoo), shadow (trả kết quả Odoo, so sánh với local ở nền).
+    # local chưa hỗ trợ (chạy như shadow) cho tới khi tính giá từ bảng quy tắc giá của Odoo
+    PRICING_ENGINE_MODE: str = "odoo"
+    PRICING_SNAPSHOT_TTL: int = 300  # giây, chu kỳ nạp lại dữ liệu tính giá
+    PRICING_SNAPSHOT_LOOKBACK_DAYS: int = 90  # đơn giá lấy từ lịch Odoo đã tính giá trong khoảng này
+
+    # Danh sách hợp đồng định kỳ: odoo (gọi Odoo), shadow (trả kết quả Odoo, so sánh với Postgres ở nền), local
+    BOOKING_CONTRACT_LIST_MODE: str = "odoo"
+    # Chi tiết hợp đồng: Postgres dựng sẵn toàn bộ JSON response (json_build_object), API trả thẳng bytes
+    BOOKING_CONTRACT_DETAIL_SQL_JSON: bool = False
+
+    # Ngày nghỉ thêm (YYYY-MM-DD, cách nhau dấu phẩy) bỏ khỏi lịch định kỳ khi chọn bỏ ngày lễ,
+    # vd. Giỗ Tổ Hùng Vương, ngày nghỉ bù
+    CLEANING_EXCLUDED_DATES: str = ""
+
     # Zalo Mini App: secret key để gọi Zalo Open API đổi token (getPhoneNumber) → số điện thoại
     ZALO_APP_SECRET_KEY: str = ""
 
+    @field_validator("CLEANING_EXCLUDED_DATES")
+    @classmethod
+    def _clean_excluded_dates(cls, value: str) -> str:
+        """Bỏ các ngày sai định dạng (ghi cảnh báo) thay vì lỗi ở mỗi request tạo lịch"""
+        dates = []
+        for item in value.split(","):
+            item = item.strip()
+            if not item:
+                continue
+            try:
+                dates.append(date.fromisoformat(item).isoformat())
+            except ValueError:
+                logger.warning(f"CLEANING_EXCLUDED_DATES: bỏ qua ngày không hợp lệ '{item}'")
+        return ",".join(dates)
+
     @property
     def DATABASE_URL(self) -> str:
         return self.POSTGRES_DATABASE_URL
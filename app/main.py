@@ -1,6 +1,6 @@
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi.exceptions import RequestValidationError
 
 from pydantic import ValidationError
@@ -16,8 +16,11 @@ from .api.v1.endpoints.masterdatas import router as masterdata_router
 from .api.v1.endpoints.payment import router as payment_router
 from .api.v1.endpoints.pricelist import router as pricelist_router
 from .api.v1.endpoints.loyalty import router as loyalty_router
+from .api.v1.endpoints.monitoring import router as monitoring_router
 from .config import settings
 from .utils.redis_client import redis_client
+from .utils.pg_listener import pg_listener
+from .utils.background import background_tasks
 from .exceptions.handlers import validation_exception_handler
 from app.utils.sentry import init_sentry
 
@@ -58,9 +61,13 @@ app.include_router(pricelist_router, prefix="/pricelist", tags=["pricelist"])
 app.include_router(masterdata_router, prefix="/masterdatas", tags=["masterdatas"])
 app.include_router(loyalty_router, prefix="/loyalty", tags=["loyalty"])
 app.include_router(payment_router, prefix="/payment", tags=["payment"])
+app.include_router(monitoring_router, prefix="/monitoring", tags=["monitoring"])
 
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
+    # 304 của conditional GET: không có body, giữ ETag/Last-Modified/Cache-Control
+    if exc.status_code == 304:
+        return Response(status_code=304, headers=exc.headers)
     return JSONResponse(
         status_code=exc.status_code,
         content={"message": exc.detail}
@@ -79,6 +86,12 @@ async def startup_event():
         await redis_client.connect()
         logger.info("Redis connection initialized successfully")
 
+        # Nhận NOTIFY từ trigger database để làm mới cache
+        await pg_listener.start()
+
+        # Tác vụ định kỳ của các module (nạp lại dữ liệu trong bộ nhớ, ...)
+        await background_tasks.start()
+
         # Khởi tạo Sentry nếu DSN được cung cấp
         if settings.SENTRY_DSN:
             try:
@@ -99,6 +112,9 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("Application shutting down")
+
+    await background_tasks.stop()
+    await pg_listener.stop()
     
     # Close Redis connection
     await redis_client.close()
@@ -34,6 +34,21 @@ class BookingContractCheckPriceRequest(BaseModel):
     new_date: str = Field(..., description="Ngày mới (YYYY-MM-DD)")
 
 
+BULK_RESCHEDULE_MAX_MOVES = 20
+
+
+class ScheduleMoveItem(BaseModel):
+    schedule_id: int = Field(..., description="ID schedule")
+    new_date: str = Field(..., description="Ngày mới (YYYY-MM-DD)")
+
+
+class BookingContractBulkRescheduleRequest(BaseModel):
+    moves: List[ScheduleMoveItem] = Field(
+        ..., min_length=1, max_length=BULK_RESCHEDULE_MAX_MOVES, description="Các buổi cần đổi lịch"
+    )
+    dry_run: bool = Field(False, description="Chỉ kiểm tra và báo giá, không đổi lịch")
+
+
 class CreatePayOSPaymentRequest(BaseModel):
     contract_id: int = Field(..., description="ID hợp đồng")
     payment_method_id: int = Field(..., description="ID phương thức thanh toán")
@@ -44,10 +44,18 @@ class BookingCancelRequest(BaseModel):
     booking_id: int
 
 
+BOOKING_BATCH_MAX_IDS = 50
+
+
+class BookingBatchRequest(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=BOOKING_BATCH_MAX_IDS, description="Danh sách ID lịch hẹn")
+
+
 class CalculateCleaningDatesRequest(BaseModel):
     weekdays: List[int] = Field(..., description="Danh sách thứ trong tuần (0=Thứ 2, 1=Thứ 3, ..., 5=Thứ 7, 6=CN)")
     package_id: int = Field(..., description="ID của gói định kỳ")
     start_date: Optional[str] = Field(None, description="Ngày bắt đầu (YYYY-MM-DD), mặc định là hôm nay")
+    exclude_holidays: bool = Field(False, description="Bỏ các ngày Tết và ngày lễ")
 
 
 class PeriodicPricingRequest(BaseModel):
@@ -62,6 +70,30 @@ class PeriodicPricingRequest(BaseModel):
     extra_data: Optional[List[ExtraProductItem]] = None
 
 
+PERIODIC_PRICING_BATCH_MAX_CANDIDATES = 20
+
+
+class PeriodicPricingCandidate(BaseModel):
+    package_id: int = Field(..., description="ID của gói định kỳ")
+    weekdays: List[int] = Field(..., min_length=1, description="Danh sách thứ trong tuần (0=Thứ 2, ..., 6=CN)")
+    start_hours: int = Field(..., description="Giờ bắt đầu")
+
+
+class PeriodicPricingBatchRequest(BaseModel):
+    candidates: List[PeriodicPricingCandidate] = Field(
+        ..., min_length=1, max_length=PERIODIC_PRICING_BATCH_MAX_CANDIDATES, description="Các phương án cần báo giá"
+    )
+    start_date: Optional[str] = Field(None, description="Ngày bắt đầu (YYYY-MM-DD), mặc định là hôm nay")
+    exclude_holidays: bool = Field(False, description="Bỏ các ngày Tết và ngày lễ")
+    appointment_duration: int = Field(..., description="Thời gian dịch vụ (giờ)")
+    categ_id: int = Field(..., description="ID danh mục dịch vụ")
+    contact_id: int = Field(..., description="ID địa chỉ liên hệ")
+    employee_quantity: int = Field(..., description="Số lượng nhân viên")
+    program_id: Optional[int] = None
+    card_id: Optional[int] = None
+    extra_data: Optional[List[ExtraProductItem]] = None
+
+
 class PeriodicBookingCreateRequest(BaseModel):
     dates: List[str] = Field(..., description="Danh sách ngày dọn dẹp (YYYY-MM-DD)")
     start_hours: int = Field(..., description="Giờ bắt đầu")
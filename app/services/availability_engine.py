@@ -0,0 +1,323 @@
+import asyncio
+import logging
+import time
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.utils.background import background_tasks
+from app.utils.erp_db import PostgresDB
+from app.utils.metrics import registry
+from app.utils.pg_listener import pg_listener
+
+logger = logging.getLogger(__name__)
+
+CALENDAR_EVENT_CHANNEL = "calendar_event_changed"
+CALENDAR_EVENT_STAFF_CHANNEL = "calendar_event_staff_changed"
+
+AVAILABILITY_HORIZON_DAYS = 60  # chỉ giữ lịch trong khoảng [hôm qua, +60 ngày]
+AVAILABILITY_RELOAD_INTERVAL = 600  # giây, nạp lại toàn bộ để bù NOTIFY bị lỡ và dời cửa sổ thời gian
+AVAILABILITY_FLUSH_DELAY = 0.2  # giây, gom các NOTIFY của cùng một lần ghi
+INACTIVE_CLEANING_STATES = ['cancel']
+
+_EPOCH = datetime(1970, 1, 1)
+
+EVENTS_QUERY = '''
+    SELECT ce.id, ce.start, ce.stop, cesr.employee_id
+    FROM calendar_event ce
+         JOIN calendar_event_staff_rel cesr ON cesr.event_id = ce.id
+    WHERE ce.active = true
+      AND COALESCE(ce.cleaning_state, '') <> ALL($1::varchar[])
+      AND ce.stop >= (NOW() AT TIME ZONE 'UTC') - interval '1 day'
+      AND ce.start < (NOW() AT TIME ZONE 'UTC') + interval '{} days'
+'''.format(AVAILABILITY_HORIZON_DAYS)
+
+EVENT_REFRESH_QUERY = '''
+    SELECT
+        ce.id,
+        ce.start,
+        ce.stop,
+        ce.active,
+        ce.cleaning_state,
+        ARRAY_REMOVE(ARRAY_AGG(cesr.employee_id), NULL) AS employee_ids
+    FROM calendar_event ce
+         LEFT JOIN calendar_event_staff_rel cesr ON cesr.event_id = ce.id
+    WHERE ce.id = ANY($1::int[])
+    GROUP BY ce.id
+'''
+
+# Bảng quan hệ many2many hr.employee <-> product.category. Odoo đặt tên theo field (relation=...)
+# nên không cố định tên bảng: tìm trong catalog các bảng *_rel có đúng hai khóa ngoại tới
+# hr_employee và product_category, ưu tiên tên mặc định của Odoo nếu có nhiều bảng.
+EMPLOYEE_CATEGORY_DEFAULT_RELATION = "hr_employee_product_category_rel"
+EMPLOYEE_CATEGORY_RELATION_QUERY = '''
+    SELECT
+        employee_fk.conrelid::regclass::text AS table_name,
+        employee_column.attname AS employee_column,
+        category_column.attname AS category_column
+    FROM pg_constraint employee_fk
+         JOIN pg_constraint category_fk
+              ON category_fk.conrelid = employee_fk.conrelid AND category_fk.contype = 'f'
+         JOIN pg_attribute employee_column
+              ON employee_column.attrelid = employee_fk.conrelid AND employee_column.attnum = employee_fk.conkey[1]
+         JOIN pg_attribute category_column
+              ON category_column.attrelid = category_fk.conrelid AND category_column.attnum = category_fk.conkey[1]
+    WHERE employee_fk.contype = 'f'
+      AND employee_fk.confrelid = 'hr_employee'::regclass
+      AND category_fk.confrelid = 'product_category'::regclass
+      AND employee_fk.conrelid::regclass::text LIKE '%\\_rel'
+      AND (SELECT COUNT(*) FROM pg_constraint fk
+           WHERE fk.conrelid = employee_fk.conrelid AND fk.contype = 'f') = 2
+'''
+
+EMPLOYEE_CATEGORY_QUERY = '''
+    SELECT rel."{category_column}" AS categ_id, he.id, he.name
+    FROM hr_employee he
+         JOIN "{table_name}" rel ON rel."{employee_column}" = he.id
+    WHERE he.active = true
+    ORDER BY he.name, he.id
+'''
+
+
+class AvailabilityUnavailable(Exception):
+    """Không dựng được chỉ mục (vd. không xác định được bảng nhân viên - danh mục), dùng Odoo"""
+
+
+def _ts(value: datetime) -> float:
+    """datetime UTC naive -> số giây, so sánh float nhanh hơn datetime khi bisect"""
+    return (value - _EPOCH).total_seconds()
+
+
+class EmployeeSchedule:
+    """
+    Lịch bận của một nhân viên: các khoảng [start, stop) sắp theo start, kèm max_stops là
+    max(stop) của tiền tố. Kiểm tra trùng khoảng [s, e) chỉ cần một lần bisect:
+    các lịch có start < e là tiền tố [0, i), trùng khi max stop của tiền tố đó > s.
+    """
+
+    __slots__ = ('starts', 'stops', 'event_ids', 'max_stops')
+
+    def __init__(self):
+        self.starts: List[float] = []
+        self.stops: List[float] = []
+        self.event_ids: List[int] = []
+        self.max_stops: List[float] = []
+
+    @classmethod
+    def from_intervals(cls, intervals: Iterable[Tuple[float, float, int]]) -> "EmployeeSchedule":
+        schedule = cls()
+        for start, stop, event_id in sorted(intervals):
+            schedule.starts.append(start)
+            schedule.stops.append(stop)
+            schedule.event_ids.append(event_id)
+        schedule._rebuild_from(0)
+        return schedule
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def _rebuild_from(self, index: int):
+        del self.max_stops[index:]
+        current = self.max_stops[index - 1] if index else float('-inf')
+        for stop in self.stops[index:]:
+            if stop > current:
+                current = stop
+            self.max_stops.append(current)
+
+    def add(self, start: float, stop: float, event_id: int):
+        index = bisect_right(self.starts, start)
+        self.starts.insert(index, start)
+        self.stops.insert(index, stop)
+        self.event_ids.insert(index, event_id)
+        self._rebuild_from(index)
+
+    def remove(self, event_id: int) -> bool:
+        try:
+            index = self.event_ids.index(event_id)
+        except ValueError:
+            return False
+        del self.starts[index]
+        del self.stops[index]
+        del self.event_ids[index]
+        self._rebuild_from(index)
+        return True
+
+    def is_free(self, start: float, stop: float) -> bool:
+        index = bisect_left(self.starts, stop)
+        return index == 0 or self.max_stops[index - 1] <= start
+
+
+class AvailabilityEngine:
+    """
+    Chỉ mục lịch bận theo nhân viên trong bộ nhớ của worker, thay cho việc gọi Odoo
+    get_available_employee_api mỗi lần mở form đặt lịch.
+
+    Nạp toàn bộ định kỳ, giữa hai lần nạp cập nhật từng lịch theo NOTIFY của calendar_event
+    và calendar_event_staff_rel.
+    """
+
+    def __init__(self):
+        self._schedules: Dict[int, EmployeeSchedule] = {}
+        self._events: Dict[int, Tuple[float, float, Tuple[int, ...]]] = {}
+        self._category_employees: Dict[int, List[int]] = {}
+        self._employees: Dict[int, Dict[str, Any]] = {}
+        self.loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+        self._pending: Set[int] = set()
+        self._touched_while_reloading: Optional[Set[int]] = None
+        self._flush_task: Optional[asyncio.Task] = None
+
+    @property
+    def event_count(self) -> int:
+        return len(self._events)
+
+    def load(self, event_rows: Iterable[Dict[str, Any]], employee_rows: Iterable[Dict[str, Any]]):
+        """Thay toàn bộ chỉ mục bằng dữ liệu mới (mỗi dòng lịch là một cặp lịch - nhân viên)"""
+        events: Dict[int, Tuple[float, float, List[int]]] = {}
+        intervals: Dict[int, List[Tuple[float, float, int]]] = {}
+        for row in event_rows:
+            start, stop = _ts(row['start']), _ts(row['stop'])
+            event = events.setdefault(row['id'], (start, stop, []))
+            event[2].append(row['employee_id'])
+            intervals.setdefault(row['employee_id'], []).append((start, stop, row['id']))
+
+        category_employees: Dict[int, List[int]] = {}
+        employees: Dict[int, Dict[str, Any]] = {}
+        for row in employee_rows:
+            category_employees.setdefault(row['categ_id'], []).append(row['id'])
+            employees[row['id']] = {'id': row['id'], 'name': row['name']}
+
+        self._schedules = {
+            employee_id: EmployeeSchedule.from_intervals(items) for employee_id, items in intervals.items()
+        }
+        self._events = {event_id: (start, stop, tuple(staff)) for event_id, (start, stop, staff) in events.items()}
+        self._category_employees = category_employees
+        self._employees = employees
+        self.loaded_at = time.time()
+
+    def apply_event(self, event_id: int, start: Optional[datetime], stop: Optional[datetime],
+                    employee_ids: Iterable[int]):
+        """Cập nhật một lịch: bỏ khỏi lịch bận của nhân viên cũ rồi thêm cho nhân viên mới"""
+        self.remove_event(event_id)
+        employee_ids = tuple(employee_ids)
+        if start is None or stop is None or not employee_ids:
+            return
+        start_ts, stop_ts = _ts(start), _ts(stop)
+        for employee_id in employee_ids:
+            schedule = self._schedules.get(employee_id)
+            if schedule is None:
+                schedule = self._schedules[employee_id] = EmployeeSchedule()
+            schedule.add(start_ts, stop_ts, event_id)
+        self._events[event_id] = (start_ts, stop_ts, employee_ids)
+
+    def remove_event(self, event_id: int):
+        previous = self._events.pop(event_id, None)
+        if previous is None:
+            return
+        for employee_id in previous[2]:
+            schedule = self._schedules.get(employee_id)
+            if schedule is not None:
+                schedule.remove(event_id)
+
+    def category_employee_ids(self, categ_id: int) -> List[int]:
+        return list(self._category_employees.get(categ_id, ()))
+
+    def available_employees(self, categ_id: int, start: datetime, stop: datetime) -> List[Dict[str, Any]]:
+        """Nhân viên của danh mục không có lịch trùng với [start, stop) (UTC naive)"""
+        start_ts, stop_ts = _ts(start), _ts(stop)
+        result = []
+        for employee_id in self._category_employees.get(categ_id, ()):
+            schedule = self._schedules.get(employee_id)
+            if schedule is None or schedule.is_free(start_ts, stop_ts):
+                result.append(self._employees[employee_id])
+        return result
+
+    async def reload(self):
+        async with self._lock:
+            await self._reload()
+
+    async def ensure_loaded(self):
+        """
+        Nạp lần đầu khi request tới trước tác vụ định kỳ. Nạp lỗi thì raise AvailabilityUnavailable
+        để nơi gọi dùng Odoo thay vì trả lỗi 500.
+        """
+        if self.loaded_at is None:
+            async with self._lock:
+                if self.loaded_at is None:
+                    try:
+                        await self._reload()
+                    except AvailabilityUnavailable:
+                        raise
+                    except Exception as e:
+                        raise AvailabilityUnavailable(str(e)) from e
+
+    @staticmethod
+    async def _employee_category_query() -> str:
+        relations = await PostgresDB.execute_query(EMPLOYEE_CATEGORY_RELATION_QUERY)
+        if len(relations) > 1:
+            relations = [row for row in relations if row['table_name'] == EMPLOYEE_CATEGORY_DEFAULT_RELATION]
+        if len(relations) != 1:
+            raise AvailabilityUnavailable("Không xác định được bảng quan hệ hr_employee - product_category")
+        return EMPLOYEE_CATEGORY_QUERY.format(**relations[0])
+
+    async def _reload(self):
+        self._touched_while_reloading = set()
+        try:
+            employee_category_query = await self._employee_category_query()
+            event_rows, employee_rows = await asyncio.gather(
+                PostgresDB.execute_query(EVENTS_QUERY, [INACTIVE_CLEANING_STATES]),
+                PostgresDB.execute_query(employee_category_query),
+            )
+            self.load(event_rows, employee_rows)
+            touched = self._touched_while_reloading
+        finally:
+            self._touched_while_reloading = None
+        logger.info(f"Availability index loaded: {self.event_count} events, {len(self._schedules)} employees")
+        # Thay đổi nhận được trong lúc query có thể chưa có trong dữ liệu vừa nạp
+        if touched:
+            self.schedule_refresh(touched)
+
+    def schedule_refresh(self, event_ids: Iterable[int]):
+        event_ids = {int(event_id) for event_id in event_ids if event_id}
+        if not event_ids or self.loaded_at is None:
+            return
+        self._pending.update(event_ids)
+        if self._touched_while_reloading is not None:
+            self._touched_while_reloading.update(event_ids)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush())
+
+    async def _flush(self):
+        await asyncio.sleep(AVAILABILITY_FLUSH_DELAY)
+        event_ids, self._pending = self._pending, set()
+        try:
+            rows = await PostgresDB.execute_query(EVENT_REFRESH_QUERY, [list(event_ids)])
+        except Exception as e:
+            logger.error(f"Error refreshing availability for events {sorted(event_ids)}: {str(e)}")
+            return
+        found = set()
+        for row in rows:
+            found.add(row['id'])
+            if not row['active'] or (row['cleaning_state'] or '') in INACTIVE_CLEANING_STATES:
+                self.remove_event(row['id'])
+            else:
+                self.apply_event(row['id'], row['start'], row['stop'], row['employee_ids'])
+        for event_id in event_ids - found:
+            self.remove_event(event_id)
+
+    async def on_calendar_event_changed(self, payload: Dict[str, Any]):
+        if payload.get('op') == 'DELETE':
+            self.remove_event(payload.get('id'))
+        else:
+            self.schedule_refresh([payload.get('id')])
+
+    async def on_calendar_event_staff_changed(self, payload: Dict[str, Any]):
+        self.schedule_refresh([payload.get('event_id')])
+
+
+availability_engine = AvailabilityEngine()
+registry.gauge("availability_index_events", "Số lịch hẹn trong chỉ mục lịch bận của worker",
+               callback=lambda: [({}, availability_engine.event_count)])
+pg_listener.add_handler(CALENDAR_EVENT_CHANNEL, availability_engine.on_calendar_event_changed)
+pg_listener.add_handler(CALENDAR_EVENT_STAFF_CHANNEL, availability_engine.on_calendar_event_staff_changed)
+background_tasks.add("availability_reload", AVAILABILITY_RELOAD_INTERVAL, availability_engine.reload)
@@ -0,0 +1,195 @@
+import asyncio
+import logging
+import math
+import time
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from dateutil.relativedelta import relativedelta
+
+from app.config import settings
+from app.utils.erp_db import PostgresDB
+
+logger = logging.getLogger(__name__)
+
+PACKAGE_CACHE_TTL = 300  # giây
+PACKAGE_MISS_RELOAD_INTERVAL = 10  # giây, tối thiểu giữa hai lần nạp lại khi không tìm thấy gói
+WEEKDAY_NAMES = ['Thứ 2', 'Thứ 3', 'Thứ 4', 'Thứ 5', 'Thứ 6', 'Thứ 7', 'Chủ nhật']
+
+VN_TIMEZONE_HOURS = 7  # âm lịch Việt Nam tính theo giờ UTC+7
+TET_DAYS_BEFORE = 2  # 29, 30 Tết
+TET_DAYS_AFTER = 4  # tới mùng 5
+# Ngày lễ dương lịch cố định (tháng, ngày)
+FIXED_HOLIDAYS = ((1, 1), (4, 30), (5, 1), (9, 2))
+
+
+def _julian_day(value: date) -> int:
+    return value.toordinal() + 1721425
+
+
+def _new_moon_day(k: int) -> int:
+    """Ngày Julius (giờ Việt Nam) của lần sóc thứ k tính từ 1900-01-01 (thuật toán Hồ Ngọc Đức)"""
+    t = k / 1236.85
+    t2 = t * t
+    t3 = t2 * t
+    dr = math.pi / 180
+    jd = 2415020.75933 + 29.53058868 * k + 0.0001178 * t2 - 0.000000155 * t3
+    jd += 0.00033 * math.sin((166.56 + 132.87 * t - 0.009173 * t2) * dr)
+    m = 359.2242 + 29.10535608 * k - 0.0000333 * t2 - 0.00000347 * t3
+    mpr = 306.0253 + 385.81691806 * k + 0.0107306 * t2 + 0.00001236 * t3
+    f = 21.2964 + 390.67050646 * k - 0.0016528 * t2 - 0.00000239 * t3
+    c1 = (0.1734 - 0.000393 * t) * math.sin(m * dr) + 0.0021 * math.sin(2 * dr * m)
+    c1 += -0.4068 * math.sin(mpr * dr) + 0.0161 * math.sin(dr * 2 * mpr) - 0.0004 * math.sin(dr * 3 * mpr)
+    c1 += 0.0104 * math.sin(dr * 2 * f) - 0.0051 * math.sin(dr * (m + mpr))
+    c1 += -0.0074 * math.sin(dr * (m - mpr)) + 0.0004 * math.sin(dr * (2 * f + m))
+    c1 += -0.0004 * math.sin(dr * (2 * f - m)) - 0.0006 * math.sin(dr * (2 * f + mpr))
+    c1 += 0.0010 * math.sin(dr * (2 * f - mpr)) + 0.0005 * math.sin(dr * (2 * mpr + m))
+    if t < -11:
+        delta_t = 0.001 + 0.000839 * t + 0.0002261 * t2 - 0.00000845 * t3 - 0.000000081 * t * t3
+    else:
+        delta_t = -0.000278 + 0.000265 * t + 0.000262 * t2
+    return math.floor(jd + c1 - delta_t + 0.5 + VN_TIMEZONE_HOURS / 24)
+
+
+def _sun_longitude_sector(day: int) -> int:
+    """Cung hoàng đạo (0..11, mỗi cung 30 độ) của mặt trời lúc 0h giờ Việt Nam ngày Julius day"""
+    t = (day - 0.5 - VN_TIMEZONE_HOURS / 24 - 2451545.0) / 36525
+    t2 = t * t
+    dr = math.pi / 180
+    m = 357.52910 + 35999.05030 * t - 0.0001559 * t2 - 0.00000048 * t * t2
+    l0 = 280.46645 + 36000.76983 * t + 0.0003032 * t2
+    dl = (1.914600 - 0.004817 * t - 0.000014 * t2) * math.sin(dr * m)
+    dl += (0.019993 - 0.000101 * t) * math.sin(dr * 2 * m) + 0.000290 * math.sin(dr * 3 * m)
+    longitude = (l0 + dl) * dr
+    longitude -= 2 * math.pi * math.floor(longitude / (2 * math.pi))
+    return math.floor(longitude / math.pi * 6)
+
+
+def _lunar_month_11(year: int) -> int:
+    """Ngày Julius mùng 1 tháng 11 âm lịch (tháng chứa đông chí) của năm dương lịch year"""
+    k = math.floor((_julian_day(date(year, 12, 31)) - 2415021) / 29.530588853)
+    day = _new_moon_day(k)
+    if _sun_longitude_sector(day) >= 9:
+        day = _new_moon_day(k - 1)
+    return day
+
+
+@lru_cache(maxsize=None)
+def tet_date(year: int) -> date:
+    """
+    Mùng 1 Tết Nguyên đán (dương lịch) của year: tháng giêng là tháng thứ hai sau tháng 11 của năm
+    trước, thứ ba nếu năm âm lịch có tháng nhuận rơi vào tháng 11 hoặc 12.
+    """
+    a11 = _lunar_month_11(year - 1)
+    b11 = _lunar_month_11(year)
+    k = math.floor(0.5 + (a11 - 2415021.076998695) / 29.530588853)
+    offset = 2
+    if b11 - a11 > 365:
+        # Tháng nhuận là tháng đầu tiên không chứa trung khí (mặt trời không đổi cung)
+        leap = 1
+        sector = _sun_longitude_sector(_new_moon_day(k + 1))
+        while leap < 13:
+            next_sector = _sun_longitude_sector(_new_moon_day(k + leap + 1))
+            if next_sector == sector:
+                break
+            sector = next_sector
+            leap += 1
+        if leap <= 2:
+            offset = 3
+    return date.fromordinal(_new_moon_day(k + offset) - 1721425)
+
+
+def holiday_dates(first_year: int, last_year: int) -> Tuple[str, ...]:
+    """Ngày nghỉ (Tết, lễ cố định, CLEANING_EXCLUDED_DATES) trong các năm, dạng YYYY-MM-DD"""
+    dates = set()
+    for year in range(first_year, last_year + 1):
+        for month, day in FIXED_HOLIDAYS:
+            dates.add(date(year, month, day))
+        tet = tet_date(year)
+        for offset in range(-TET_DAYS_BEFORE, TET_DAYS_AFTER + 1):
+            dates.add(tet + timedelta(days=offset))
+    # Đã kiểm tra định dạng khi nạp settings
+    for value in settings.CLEANING_EXCLUDED_DATES.split(","):
+        if value:
+            dates.add(date.fromisoformat(value))
+    return tuple(sorted(item.isoformat() for item in dates))
+
+
+@lru_cache(maxsize=1024)
+def _month_occurrences(weekdays: Tuple[int, ...], duration_months: int, month_start: date,
+                       holidays: Tuple[str, ...]) -> np.ndarray:
+    """
+    Mọi ngày thuộc các thứ đã chọn từ đầu tháng bắt đầu tới hết khoảng của gói (tính dư một tháng
+    để đủ cho mọi ngày bắt đầu trong tháng). Dùng lại cho mọi request cùng thứ/gói/tháng bắt đầu.
+    """
+    weekmask = [0] * 7
+    for weekday in weekdays:
+        weekmask[weekday] = 1
+    period_end = month_start + relativedelta(months=duration_months + 1)
+    days = np.arange(np.datetime64(month_start, 'D'), np.datetime64(period_end, 'D'))
+    selected = days[np.is_busday(days, weekmask=weekmask, holidays=list(holidays))]
+    selected.setflags(write=False)
+    return selected
+
+
+def generate_cleaning_dates(weekdays: Iterable[int], start_date: date, duration_months: int,
+                            exclude_holidays: bool = False) -> List[Dict[str, Any]]:
+    """Các ngày trong [start_date, start_date + duration_months] rơi vào các thứ đã chọn (0 = Thứ 2)"""
+    weekdays = tuple(sorted({min(int(weekday), 6) for weekday in weekdays}))
+    end_date = start_date + relativedelta(months=duration_months)
+    month_start = start_date.replace(day=1)
+    holidays = holiday_dates(start_date.year, end_date.year) if exclude_holidays else ()
+
+    occurrences = _month_occurrences(weekdays, duration_months, month_start, holidays)
+    first, last = np.searchsorted(
+        occurrences, [np.datetime64(start_date, 'D'), np.datetime64(end_date, 'D')], side='left'
+    )
+    # end_date được tính (<= end_date)
+    if last < len(occurrences) and occurrences[last] == np.datetime64(end_date, 'D'):
+        last += 1
+    selected = occurrences[first:last]
+
+    # 1970-01-01 là Thứ 5 -> (số ngày + 3) % 7 cho 0 = Thứ 2
+    day_weekdays = ((selected.astype(np.int64) + 3) % 7).tolist()
+    return [
+        {'date': date_str, 'weekday': weekday, 'weekday_name': WEEKDAY_NAMES[weekday]}
+        for date_str, weekday in zip(np.datetime_as_string(selected, unit='D').tolist(), day_weekdays)
+    ]
+
+
+class PeriodicPackageCache:
+    """Các gói định kỳ đang hoạt động giữ trong bộ nhớ, nạp lại sau PACKAGE_CACHE_TTL giây"""
+
+    _packages: Dict[int, Dict[str, Any]] = {}
+    _loaded_at: Optional[float] = None
+    _lock: Optional[asyncio.Lock] = None
+
+    @classmethod
+    async def _reload(cls):
+        rows = await PostgresDB.execute_query('''
+            SELECT id, name, duration_months, min_booking_count
+            FROM periodic_package
+            WHERE active = true
+        ''')
+        cls._packages = {row['id']: dict(row) for row in rows}
+        cls._loaded_at = time.time()
+
+    @classmethod
+    async def get(cls, package_id: int) -> Optional[Dict[str, Any]]:
+        if cls._lock is None:
+            cls._lock = asyncio.Lock()
+        if cls._loaded_at is None or time.time() - cls._loaded_at >= PACKAGE_CACHE_TTL:
+            async with cls._lock:
+                if cls._loaded_at is None or time.time() - cls._loaded_at >= PACKAGE_CACHE_TTL:
+                    await cls._reload()
+
+        package = cls._packages.get(package_id)
+        if package is None and time.time() - cls._loaded_at >= PACKAGE_MISS_RELOAD_INTERVAL:
+            # Gói vừa tạo/kích hoạt sau lần nạp trước
+            async with cls._lock:
+                if time.time() - cls._loaded_at >= PACKAGE_MISS_RELOAD_INTERVAL:
+                    await cls._reload()
+            package = cls._packages.get(package_id)
+        return package
@@ -0,0 +1,38 @@
+import logging
+from typing import Any, Dict
+from app.utils.cache import cache
+from app.utils.erp_db import PostgresDB
+
+logger = logging.getLogger(__name__)
+
+
+class CompanyProfileService:
+    """
+    Thông tin công ty (tên, số điện thoại, email) dùng chung cho các API, cache 1 giờ.
+    Hết giờ vẫn trả bản cũ (tối đa 1 ngày) trong lúc nạp lại ở nền.
+    """
+
+    @staticmethod
+    @cache(ttl=3600, prefix="company_profile", stale_ttl=86400)
+    async def get_company_profile() -> Dict[str, Any]:
+        query = '''
+            SELECT
+                rc.id,
+                rc.name,
+                COALESCE(rp.phone, '') AS phone,
+                COALESCE(rp.email, '') AS email
+            FROM res_company rc
+                 JOIN res_partner rp ON rc.partner_id = rp.id
+            ORDER BY rc.id
+            LIMIT 1
+        '''
+        result = await PostgresDB.execute_query(query)
+        if not result:
+            logger.warning("No company found in res_company")
+            return {}
+        return result[0]
+
+    @classmethod
+    async def get_company_phone(cls) -> str:
+        profile = await cls.get_company_profile()
+        return profile.get('phone') or ''
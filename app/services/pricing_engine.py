@@ -0,0 +1,278 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.utils.cache import cache
+from app.utils.erp_db import PostgresDB
+from app.utils.shadow import ShadowComparator
+
+logger = logging.getLogger(__name__)
+
+PRICING_MODE_ODOO = "odoo"
+PRICING_MODE_SHADOW = "shadow"
+PRICING_MODE_LOCAL = "local"
+
+# Trường của báo giá local -> khóa trong kết quả get_calculate_booking của Odoo (cùng tên các trường
+# estimated_* Odoo ghi vào calendar_event khi tính giá). Báo giá local so sánh ở chế độ shadow theo đúng các khóa này.
+ODOO_QUOTE_KEYS = {
+    'price_per_hour': 'price_per_hour',
+    'appointment_duration': 'appointment_duration',
+    'amount_before_discount': 'estimated_amount_before_discount',
+    'discount_percent': 'estimated_discount_percent',
+    'discount_amount': 'estimated_discount_amount',
+    'amount_subtotal': 'estimated_price',
+    'amount_tax': 'estimated_tax',
+    'amount_total': 'estimated_total',
+}
+# So sánh từng khóa cùng tên, kèm khóa chỉ có ở Odoo/chỉ có ở local: phải rỗng trước khi bật local
+QUOTE_COMPARE_FIELDS = {
+    **{key: (key,) for key in ODOO_QUOTE_KEYS.values()},
+    'missing_keys': ('missing_keys',),
+    'extra_keys': ('extra_keys',),
+}
+
+pricing_shadow = ShadowComparator("pricing_quote")
+
+
+class PricingSnapshot:
+    """
+    Dữ liệu tính giá đọc từ Postgres tại một thời điểm, không đổi sau khi tạo.
+
+    - rates: (categ_id, số giờ, số nhân viên) -> đơn giá/giờ của lịch gần nhất Odoo đã tính giá
+    - tax_ratios: categ_id -> tỷ lệ thuế (estimated_tax / estimated_price của lịch gần nhất)
+    - extras: (categ_id, product_id) -> list_price của dịch vụ thêm
+    - program_discounts: program_id -> % giảm giá (chỉ chương trình có đúng một phần thưởng giảm %)
+    """
+
+    def __init__(self, rates: Dict[Tuple[int, int, int], float], tax_ratios: Dict[int, float],
+                 extras: Dict[Tuple[int, int], float], program_discounts: Dict[int, float]):
+        self.rates = rates
+        self.tax_ratios = tax_ratios
+        self.extras = extras
+        self.program_discounts = program_discounts
+        self.loaded_at = time.time()
+        self.version = self._compute_version()
+
+    def _compute_version(self) -> str:
+        """Version theo nội dung: các worker đọc cùng dữ liệu có cùng version"""
+        content = json.dumps({
+            'rates': sorted([list(key), value] for key, value in self.rates.items()),
+            'tax_ratios': sorted(self.tax_ratios.items()),
+            'extras': sorted([list(key), value] for key, value in self.extras.items()),
+            'program_discounts': sorted(self.program_discounts.items()),
+        }, default=float)
+        return hashlib.sha1(content.encode()).hexdigest()[:12]
+
+    def quote(self, categ_id: int, appointment_duration: int, employee_quantity: int,
+              extra_data: Optional[List[Dict[str, Any]]] = None,
+              program_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Báo giá một lịch hẹn, trả None nếu snapshot không đủ dữ liệu (dùng Odoo)"""
+        price_per_hour = self.rates.get((categ_id, appointment_duration, employee_quantity))
+        tax_ratio = self.tax_ratios.get(categ_id)
+        if price_per_hour is None or tax_ratio is None:
+            return None
+
+        extra_amount = 0.0
+        for extra in extra_data or []:
+            list_price = self.extras.get((categ_id, extra['product_id']))
+            if list_price is None:
+                return None
+            extra_amount += list_price * extra['quantity']
+
+        discount_percent = 0.0
+        if program_id:
+            discount_percent = self.program_discounts.get(program_id)
+            if discount_percent is None:
+                return None
+
+        base_amount = price_per_hour * appointment_duration * employee_quantity
+        amount_before_discount = base_amount + extra_amount
+        discount_amount = round(amount_before_discount * discount_percent / 100)
+        amount_subtotal = amount_before_discount - discount_amount
+        amount_tax = round(amount_subtotal * tax_ratio)
+
+        return {
+            'price_per_hour': price_per_hour,
+            'appointment_duration': appointment_duration,
+            'employee_quantity': employee_quantity,
+            'base_amount': base_amount,
+            'extra_amount': extra_amount,
+            'amount_before_discount': amount_before_discount,
+            'discount_percent': discount_percent,
+            'discount_amount': discount_amount,
+            'amount_subtotal': amount_subtotal,
+            'amount_tax': amount_tax,
+            'amount_total': amount_subtotal + amount_tax,
+            'pricing_version': self.version,
+        }
+
+
+class PricingEngine:
+    """Tính giá lịch hẹn trong process từ snapshot, snapshot được nạp lại định kỳ"""
+
+    _snapshot: Optional[PricingSnapshot] = None
+    _lock: Optional[asyncio.Lock] = None
+
+    _local_mode_warned = False
+
+    @classmethod
+    def mode(cls) -> str:
+        """
+        Chỉ hỗ trợ odoo và shadow: đơn giá đang suy ra từ lịch đã tính giá và chưa tính theo
+        start_date/start_hours, chưa đọc từ bảng quy tắc giá của Odoo nên không được trả cho client.
+        Cấu hình local được chạy như shadow.
+        """
+        mode = (settings.PRICING_ENGINE_MODE or PRICING_MODE_ODOO).lower()
+        if mode == PRICING_MODE_LOCAL:
+            if not cls._local_mode_warned:
+                cls._local_mode_warned = True
+                logger.warning("PRICING_ENGINE_MODE=local is not supported yet, running in shadow mode")
+            return PRICING_MODE_SHADOW
+        return mode
+
+    @staticmethod
+    async def _load_snapshot() -> PricingSnapshot:
+        lookback = "interval '{} days'".format(int(settings.PRICING_SNAPSHOT_LOOKBACK_DAYS))
+        rates_query = '''
+            SELECT DISTINCT ON (pt.categ_id, ce.appointment_duration, ce.required_staff_qty)
+                pt.categ_id,
+                ce.appointment_duration,
+                ce.required_staff_qty,
+                ce.price_per_hour
+            FROM calendar_event ce
+                 JOIN product_product pp ON ce.service_product_id = pp.id
+                 JOIN product_template pt ON pp.product_tmpl_id = pt.id
+            WHERE ce.price_per_hour > 0
+              AND ce.create_date >= NOW() - {}
+            ORDER BY pt.categ_id, ce.appointment_duration, ce.required_staff_qty, ce.create_date DESC
+        '''.format(lookback)
+        tax_query = '''
+            SELECT DISTINCT ON (pt.categ_id)
+                pt.categ_id,
+                ce.estimated_tax / ce.estimated_price AS tax_ratio
+            FROM calendar_event ce
+                 JOIN product_product pp ON ce.service_product_id = pp.id
+                 JOIN product_template pt ON pp.product_tmpl_id = pt.id
+            WHERE ce.estimated_price > 0
+              AND ce.estimated_tax IS NOT NULL
+              AND ce.create_date >= NOW() - {}
+            ORDER BY pt.categ_id, ce.create_date DESC
+        '''.format(lookback)
+        extras_query = '''
+            SELECT
+                pcpp.category_id,
+                pp.id AS product_id,
+                COALESCE(pt.list_price, 0) AS list_price
+            FROM product_category_product_product_extra_rel pcpp
+                 JOIN product_product pp ON pcpp.product_id = pp.id
+                 JOIN product_template pt ON pp.product_tmpl_id = pt.id
+        '''
+        discounts_query = '''
+            SELECT
+                lr.program_id,
+                MAX(lr.discount) AS discount,
+                COUNT(*) AS reward_count,
+                BOOL_AND(lr.reward_type = 'discount' AND lr.discount_mode = 'percent') AS is_percent
+            FROM loyalty_reward lr
+                 JOIN loyalty_program lp ON lr.program_id = lp.id
+            WHERE lp.active = true AND lr.active = true
+              AND (lp.date_from IS NULL OR lp.date_from <= CURRENT_DATE)
+              AND (lp.date_to IS NULL OR lp.date_to >= CURRENT_DATE)
+            GROUP BY lr.program_id
+        '''
+        rates_rows, tax_rows, extras_rows, discount_rows = await asyncio.gather(
+            PostgresDB.execute_query(rates_query),
+            PostgresDB.execute_query(tax_query),
+            PostgresDB.execute_query(extras_query),
+            PostgresDB.execute_query(discounts_query),
+        )
+        return PricingSnapshot(
+            rates={
+                (row['categ_id'], row['appointment_duration'], row['required_staff_qty']): float(row['price_per_hour'])
+                for row in rates_rows
+            },
+            tax_ratios={row['categ_id']: float(row['tax_ratio']) for row in tax_rows},
+            extras={(row['category_id'], row['product_id']): float(row['list_price']) for row in extras_rows},
+            program_discounts={
+                row['program_id']: float(row['discount'] or 0)
+                for row in discount_rows
+                # Chương trình nhiều phần thưởng hoặc giảm theo số tiền: để Odoo tính
+                if row['is_percent'] and row['reward_count'] == 1
+            },
+        )
+
+    @classmethod
+    async def get_snapshot(cls) -> PricingSnapshot:
+        """Lấy snapshot hiện tại, nạp lại khi quá PRICING_SNAPSHOT_TTL giây"""
+        snapshot = cls._snapshot
+        if snapshot is not None and time.time() - snapshot.loaded_at < settings.PRICING_SNAPSHOT_TTL:
+            return snapshot
+
+        if cls._lock is None:
+            cls._lock = asyncio.Lock()
+        async with cls._lock:
+            snapshot = cls._snapshot
+            if snapshot is None or time.time() - snapshot.loaded_at >= settings.PRICING_SNAPSHOT_TTL:
+                try:
+                    snapshot = await cls._load_snapshot()
+                    if cls._snapshot is None or cls._snapshot.version != snapshot.version:
+                        logger.info(f"Pricing snapshot loaded, version {snapshot.version}")
+                    cls._snapshot = snapshot
+                except Exception as e:
+                    if cls._snapshot is None:
+                        raise
+                    # Giữ snapshot cũ nếu nạp lại lỗi
+                    logger.error(f"Error reloading pricing snapshot: {str(e)}")
+                    snapshot = cls._snapshot
+            return snapshot
+
+    @staticmethod
+    @cache(ttl=300, prefix="loyalty_card_program")
+    async def get_card_program_id(card_id: int) -> Optional[int]:
+        result = await PostgresDB.execute_query(
+            "SELECT program_id FROM loyalty_card WHERE id = $1", [int(card_id)]
+        )
+        return result[0]['program_id'] if result else None
+
+    @staticmethod
+    def to_odoo_response(quote: Dict[str, Any]) -> Dict[str, Any]:
+        """Báo giá local theo khóa của get_calculate_booking"""
+        return {odoo_key: quote[key] for key, odoo_key in ODOO_QUOTE_KEYS.items()}
+
+    @classmethod
+    async def quote_odoo_response(cls, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        quote = await cls.quote(data)
+        return cls.to_odoo_response(quote) if quote is not None else None
+
+    @classmethod
+    async def shadow_summary(cls, data: Dict[str, Any], expected: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Response local kèm khóa lệch so với response Odoo expected, để so sánh đủ tập khóa"""
+        response = await cls.quote_odoo_response(data)
+        if response is None:
+            return None
+        return {
+            **response,
+            'missing_keys': sorted(key for key in expected if key not in response),
+            'extra_keys': sorted(key for key in response if key not in expected),
+        }
+
+    @classmethod
+    async def quote(cls, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Báo giá từ payload BookingCalculateRequest, None nếu không tính local được"""
+        program_id = data.get('program_id')
+        if not program_id and data.get('card_id'):
+            program_id = await cls.get_card_program_id(data['card_id'])
+            if program_id is None:
+                return None
+        snapshot = await cls.get_snapshot()
+        return snapshot.quote(
+            categ_id=data['categ_id'],
+            appointment_duration=data['appointment_duration'],
+            employee_quantity=data['employee_quantity'],
+            extra_data=data.get('extra_data'),
+            program_id=program_id,
+        )
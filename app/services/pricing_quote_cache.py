@@ -0,0 +1,127 @@
+import hashlib
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.utils.cache import cache, get_or_load, get_or_load_many
+from app.utils.erp_db import PostgresDB
+
+logger = logging.getLogger(__name__)
+
+PRICING_QUOTE_PREFIX = "pricing_quote"
+PRICING_QUOTE_TTL = 60  # giây
+
+# Các bảng ảnh hưởng tới giá trong Odoo, đổi write_date lớn nhất là đổi version bảng giá
+PRICING_VERSION_QUERY = '''
+    SELECT GREATEST(
+        (SELECT MAX(write_date) FROM product_pricelist_item),
+        (SELECT MAX(write_date) FROM product_template),
+        (SELECT MAX(write_date) FROM loyalty_program),
+        (SELECT MAX(write_date) FROM loyalty_reward)
+    ) AS version
+'''
+
+
+class PricingQuoteCache:
+    """
+    Ghi nhớ báo giá Odoo trong thời gian ngắn cho các request lặp lại (bật/tắt một tùy chọn rồi
+    bật lại). Key gồm hash chuẩn hóa của payload, partner, version bảng giá và trạng thái thẻ
+    khách hàng thân thiết (điểm, write_date) nên đổi thẻ/điểm là tự động bỏ qua kết quả cũ.
+    Tỷ lệ lặp lại xem qua metrics cache_requests_total{prefix="pricing_quote"}.
+    """
+
+    @staticmethod
+    @cache(ttl=60, prefix="pricing_version")
+    async def get_pricing_version() -> str:
+        result = await PostgresDB.execute_query(PRICING_VERSION_QUERY)
+        version = result[0].get('version') if result else None
+        return version.isoformat() if version else "0"
+
+    @staticmethod
+    async def get_card_fingerprint(card_id: Optional[int]) -> str:
+        if not card_id:
+            return "-"
+        result = await PostgresDB.execute_query(
+            "SELECT points, write_date FROM loyalty_card WHERE id = $1", [int(card_id)]
+        )
+        if not result:
+            return "missing"
+        card = result[0]
+        write_date = card.get('write_date')
+        return f"{card.get('points')}@{write_date.isoformat() if write_date else ''}"
+
+    @staticmethod
+    def normalize_payload(data: Dict[str, Any]) -> Dict[str, Any]:
+        """Chuẩn hóa payload: bỏ giá trị rỗng, gộp và sắp xếp dịch vụ thêm theo sản phẩm"""
+        normalized = {key: value for key, value in data.items() if value not in (None, [], {})}
+        extra_data = data.get('extra_data')
+        if extra_data:
+            quantities: Dict[int, int] = {}
+            for extra in extra_data:
+                quantities[extra['product_id']] = quantities.get(extra['product_id'], 0) + extra['quantity']
+            normalized['extra_data'] = [
+                {'product_id': product_id, 'quantity': quantity}
+                for product_id, quantity in sorted(quantities.items()) if quantity
+            ]
+            if not normalized['extra_data']:
+                del normalized['extra_data']
+        return normalized
+
+    @staticmethod
+    def is_cacheable(result: Any) -> bool:
+        """Không lưu kết quả báo lỗi để lần sau gọi lại Odoo"""
+        if isinstance(result, dict):
+            return not result.get('error') and result.get('success') is not False
+        return result is not None
+
+    @classmethod
+    def _cache_key(cls, method: str, data: Dict[str, Any], version: str, card_fingerprint: str) -> str:
+        payload = json.dumps(cls.normalize_payload(data), sort_keys=True, default=str, separators=(",", ":"))
+        digest = hashlib.sha1(
+            f"{method}|{version}|{card_fingerprint}|{payload}".encode()
+        ).hexdigest()
+        return f"{PRICING_QUOTE_PREFIX}:{data.get('partner_id')}:{digest}"
+
+    @classmethod
+    async def get_or_quote(cls, method: str, data: Dict[str, Any],
+                           loader: Callable[[], Awaitable[Any]]) -> Any:
+        """data phải có partner_id (đã gán từ user hiện tại)"""
+        try:
+            version = await cls.get_pricing_version()
+            card_fingerprint = await cls.get_card_fingerprint(data.get('card_id'))
+        except Exception as e:
+            logger.warning(f"Cannot build pricing quote cache key: {str(e)}")
+            return await loader()
+
+        return await get_or_load(
+            PRICING_QUOTE_PREFIX,
+            cls._cache_key(method, data, version, card_fingerprint),
+            loader,
+            ttl=PRICING_QUOTE_TTL,
+            cache_if=cls.is_cacheable,
+        )
+
+    @classmethod
+    async def get_or_quote_many(cls, method: str, items: List[Dict[str, Any]],
+                                loader: Callable[[List[Dict[str, Any]]], Awaitable[List[Any]]]) -> List[Any]:
+        """
+        Như get_or_quote cho nhiều payload (cùng key cache với method): loader nhận các payload
+        chưa có trong cache và trả kết quả cùng thứ tự, gọi một lần cho tất cả.
+        Các payload phải có cùng partner_id và card_id.
+        """
+        if not items:
+            return []
+        try:
+            version = await cls.get_pricing_version()
+            card_fingerprint = await cls.get_card_fingerprint(items[0].get('card_id'))
+        except Exception as e:
+            logger.warning(f"Cannot build pricing quote cache key: {str(e)}")
+            return await loader(items)
+
+        return await get_or_load_many(
+            PRICING_QUOTE_PREFIX,
+            [cls._cache_key(method, data, version, card_fingerprint) for data in items],
+            lambda missing: loader([items[index] for index in missing]),
+            ttl=PRICING_QUOTE_TTL,
+            cache_if=cls.is_cacheable,
+        )
@@ -0,0 +1,68 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    """Chạy một coroutine định kỳ trong mỗi worker, lỗi của một lần chạy không dừng vòng lặp"""
+
+    def __init__(self, name: str, interval: float, func: Callable[[], Awaitable[None]],
+                 run_on_start: bool = True):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.run_on_start = run_on_start
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        if not self.run_on_start:
+            await asyncio.sleep(self.interval)
+        while True:
+            try:
+                await self.func()
+            except Exception as e:
+                logger.error(f"Periodic task {self.name} failed: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+
+class BackgroundTasks:
+    """Danh sách tác vụ định kỳ, các module đăng ký lúc import, main khởi động/dừng cùng ứng dụng"""
+
+    def __init__(self):
+        self._tasks: List[PeriodicTask] = []
+
+    def add(self, name: str, interval: float, func: Callable[[], Awaitable[None]],
+            run_on_start: bool = True) -> PeriodicTask:
+        task = PeriodicTask(name, interval, func, run_on_start=run_on_start)
+        self._tasks.append(task)
+        return task
+
+    async def start(self):
+        for task in self._tasks:
+            await task.start()
+
+    async def stop(self):
+        for task in self._tasks:
+            await task.stop()
+
+
+background_tasks = BackgroundTasks()
@@ -1,9 +1,13 @@
+import asyncio
 import functools
 import inspect
 import logging
 import hashlib
 import json
-from typing import Any, Callable, Dict, List, Optional, Union, TypeVar, cast
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Union, TypeVar, cast
+from redis.exceptions import RedisError
+from .metrics import registry
 from .redis_client import redis_client
 from ..config import settings
 
@@ -31,13 +35,188 @@ def generate_cache_key(prefix: str, *args, **kwargs) -> str:
     key_str = "_".join(key_parts)
     return f"{prefix}:{hashlib.md5(key_str.encode()).hexdigest()}"
 
-def cache(ttl: Optional[int] = None, prefix: Optional[str] = None):
+class CacheKeyStats:
+    """
+    Thống kê key trong bộ nhớ của worker: số lần truy cập và kích thước gần nhất.
+    Giới hạn số key theo dõi, khi vượt ngưỡng chỉ giữ lại một nửa key được truy cập nhiều nhất.
+    """
+
+    def __init__(self, max_keys: int = 5000):
+        self.max_keys = max_keys
+        self._keys: Dict[str, List[Any]] = {}  # key -> [prefix, số lần truy cập, kích thước bytes]
+
+    def record(self, prefix: str, key: str, size: Optional[int] = None, count: bool = True):
+        entry = self._keys.get(key)
+        if entry is None:
+            if len(self._keys) >= self.max_keys:
+                self._prune()
+            entry = self._keys[key] = [prefix, 0, 0]
+        if count:
+            entry[1] += 1
+        if size is not None:
+            entry[2] = size
+
+    def _prune(self):
+        keep = sorted(self._keys.items(), key=lambda item: item[1][1], reverse=True)[:self.max_keys // 2]
+        self._keys = dict(keep)
+
+    def top(self, limit: int = 20, by: str = "requests") -> List[Dict[str, Any]]:
+        index = 2 if by == "size" else 1
+        items = sorted(self._keys.items(), key=lambda item: item[1][index], reverse=True)[:limit]
+        return [
+            {"key": key, "prefix": prefix, "requests": requests, "size": size}
+            for key, (prefix, requests, size) in items
+        ]
+
+
+cache_requests = registry.counter(
+    "cache_requests_total", "Số lần đọc cache theo prefix và kết quả (hit, miss, stale)"
+)
+cache_errors = registry.counter("cache_errors_total", "Số lỗi Redis khi đọc/ghi cache theo prefix")
+cache_bytes_read = registry.counter("cache_read_bytes_total", "Số bytes đọc từ cache theo prefix")
+cache_bytes_written = registry.counter("cache_written_bytes_total", "Số bytes ghi vào cache theo prefix")
+cache_fetch_seconds = registry.histogram(
+    "cache_fetch_seconds", "Thời gian lấy dữ liệu theo prefix và nguồn (redis, loader)"
+)
+
+cache_key_stats = CacheKeyStats()
+
+# Giá trị cache được bọc [mark, hạn mềm, giá trị] để hỗ trợ trả dữ liệu cũ trong lúc làm mới
+CACHE_ENVELOPE_MARK = "__cache_v1__"
+
+# Các key đang được làm mới nền trong worker, tránh nhiều task cùng gọi loader
+_refreshing: Set[str] = set()
+
+
+async def _read_cache(prefix: str, cache_key: str):
+    """Đọc cache, trả về (có dữ liệu, giá trị, hạn mềm). Lỗi Redis được tính là miss"""
+    try:
+        with cache_fetch_seconds.time(prefix=prefix, source="redis"):
+            raw = await redis_client.get_raw(cache_key)
+    except RedisError as e:
+        cache_errors.inc(prefix=prefix, operation="get")
+        logger.warning(f"Cache get error for {cache_key}: {str(e)}")
+        return False, None, None
+
+    if raw is None:
+        cache_key_stats.record(prefix, cache_key)
+        return False, None, None
+
+    cache_bytes_read.inc(len(raw), prefix=prefix)
+    cache_key_stats.record(prefix, cache_key, len(raw))
+    value = redis_client.serializer.loads(raw)
+    if isinstance(value, list) and len(value) == 3 and value[0] == CACHE_ENVELOPE_MARK:
+        return True, value[2], value[1]
+    # Giá trị ghi trước khi có envelope: coi như còn hạn
+    return True, value, None
+
+
+async def _write_cache(prefix: str, cache_key: str, value: Any, ttl: Optional[int], stale_ttl: int):
+    ttl = ttl or settings.REDIS_DEFAULT_EXPIRY
+    raw = redis_client.serializer.dumps([CACHE_ENVELOPE_MARK, time.time() + ttl, value])
+    try:
+        # Key sống thêm stale_ttl sau hạn mềm để có thể trả dữ liệu cũ
+        await redis_client.set_raw(cache_key, raw, ttl + stale_ttl)
+    except RedisError as e:
+        cache_errors.inc(prefix=prefix, operation="set")
+        logger.warning(f"Cache set error for {cache_key}: {str(e)}")
+        return
+    cache_bytes_written.inc(len(raw), prefix=prefix)
+    cache_key_stats.record(prefix, cache_key, len(raw), count=False)
+
+
+async def _load(prefix: str, cache_key: str, loader: Callable[[], Awaitable[Any]],
+                ttl: Optional[int], stale_ttl: int, cache_if: Optional[Callable[[Any], bool]] = None):
+    with cache_fetch_seconds.time(prefix=prefix, source="loader"):
+        result = await loader()
+    if result is not None and (cache_if is None or cache_if(result)):
+        await _write_cache(prefix, cache_key, result, ttl, stale_ttl)
+    return result
+
+
+async def _refresh(prefix: str, cache_key: str, loader: Callable[[], Awaitable[Any]],
+                   ttl: Optional[int], stale_ttl: int, cache_if: Optional[Callable[[Any], bool]] = None):
+    try:
+        await _load(prefix, cache_key, loader, ttl, stale_ttl, cache_if)
+    except Exception as e:
+        logger.error(f"Background cache refresh failed for {cache_key}: {str(e)}")
+    finally:
+        _refreshing.discard(cache_key)
+
+
+async def get_or_load(prefix: str, cache_key: str, loader: Callable[[], Awaitable[Any]],
+                      ttl: Optional[int] = None, stale_ttl: int = 0,
+                      cache_if: Optional[Callable[[Any], bool]] = None) -> Any:
+    """
+    Lấy giá trị từ cache, nếu không có thì gọi loader và lưu lại kết quả
+
+    Args:
+        prefix: Tiền tố dùng làm label cho metrics
+        cache_key: Key đầy đủ trong Redis
+        loader: Hàm bất đồng bộ không tham số trả về dữ liệu gốc
+        ttl: Thời gian dữ liệu được coi là mới (giây)
+        stale_ttl: Sau khi hết ttl, vẫn trả dữ liệu cũ thêm chừng này giây và làm mới ở nền
+        cache_if: Chỉ lưu kết quả khi hàm này trả True (vd. bỏ qua kết quả lỗi)
+    """
+    found, value, expires_at = await _read_cache(prefix, cache_key)
+    if found:
+        if expires_at is None or time.time() < expires_at:
+            cache_requests.inc(prefix=prefix, result="hit")
+            logger.debug(f"Cache hit for {cache_key}")
+            return value
+        if stale_ttl > 0:
+            cache_requests.inc(prefix=prefix, result="stale")
+            logger.debug(f"Cache stale for {cache_key}, refreshing in background")
+            if cache_key not in _refreshing:
+                _refreshing.add(cache_key)
+                asyncio.create_task(_refresh(prefix, cache_key, loader, ttl, stale_ttl, cache_if))
+            return value
+
+    cache_requests.inc(prefix=prefix, result="miss")
+    logger.debug(f"Cache miss for {cache_key}")
+    return await _load(prefix, cache_key, loader, ttl, stale_ttl, cache_if)
+
+
+async def get_or_load_many(prefix: str, cache_keys: List[str],
+                           loader: Callable[[List[int]], Awaitable[List[Any]]],
+                           ttl: Optional[int] = None,
+                           cache_if: Optional[Callable[[Any], bool]] = None) -> List[Any]:
+    """
+    Như get_or_load cho nhiều key: đọc cache song song, các key miss được nạp bằng một lần gọi
+    loader(vị trí các key miss) trả về danh sách kết quả cùng thứ tự. Không hỗ trợ stale_ttl.
+    """
+    reads = await asyncio.gather(*(_read_cache(prefix, cache_key) for cache_key in cache_keys))
+    values: List[Any] = [None] * len(cache_keys)
+    missing: List[int] = []
+    for index, (found, value, expires_at) in enumerate(reads):
+        if found and (expires_at is None or time.time() < expires_at):
+            cache_requests.inc(prefix=prefix, result="hit")
+            values[index] = value
+        else:
+            cache_requests.inc(prefix=prefix, result="miss")
+            missing.append(index)
+    if not missing:
+        return values
+
+    with cache_fetch_seconds.time(prefix=prefix, source="loader"):
+        loaded = await loader(missing)
+    writes = []
+    for index, result in zip(missing, loaded):
+        values[index] = result
+        if result is not None and (cache_if is None or cache_if(result)):
+            writes.append(_write_cache(prefix, cache_keys[index], result, ttl, 0))
+    await asyncio.gather(*writes)
+    return values
+
+
+def cache(ttl: Optional[int] = None, prefix: Optional[str] = None, stale_ttl: int = 0):
     """
     Decorator để cache kết quả của hàm bất đồng bộ
     
     Args:
         ttl: Thời gian sống của cache (giây), None để sử dụng giá trị mặc định
         prefix: Tiền tố cho cache key, mặc định là tên hàm
+        stale_ttl: Thời gian (giây) vẫn trả dữ liệu cũ sau khi hết ttl trong lúc làm mới ở nền
     """
     def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
         # Lấy tên hàm làm prefix nếu không được chỉ định
@@ -53,22 +232,13 @@ def cache(ttl: Optional[int] = None, prefix: Optional[str] = None):
             
             # Tạo cache key
             cache_key = generate_cache_key(cache_prefix, *cache_args, **kwargs)
-            
-            # Thử lấy từ cache
-            cached_result = await redis_client.get(cache_key)
-            if cached_result is not None:
-                logger.debug(f"Cache hit for {cache_key}")
-                return cached_result
-            
-            # Nếu không có trong cache, gọi hàm gốc
-            logger.debug(f"Cache miss for {cache_key}")
-            result = await func(*args, **kwargs)
-            
-            # Lưu kết quả vào cache
-            if result is not None:
-                await redis_client.set(cache_key, result, ttl)
-            
-            return result
+            return await get_or_load(
+                cache_prefix,
+                cache_key,
+                lambda: func(*args, **kwargs),
+                ttl=ttl,
+                stale_ttl=stale_ttl,
+            )
         
         return wrapper
     
@@ -89,8 +259,4 @@ async def invalidate_cache_pattern(pattern: str) -> int:
     if not keys:
         return 0
     
-    count = 0
-    for key in keys:
-        count += await redis_client.delete(key)
-    
-    return count 
\ No newline at end of file
+    return await redis_client.delete(*keys) 
\ No newline at end of file
@@ -0,0 +1,160 @@
+import hashlib
+import logging
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Sequence
+
+from fastapi import HTTPException, Request, Response
+from redis.exceptions import RedisError
+
+from .cache import get_or_load
+from .erp_db import PostgresDB
+from .redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+VALIDATOR_PREFIX = "conditional_validator"
+VALIDATOR_TTL = 10  # giây, thay đổi trong Odoo hiện ra sau tối đa chừng này
+CONDITIONAL_CACHE_CONTROL = "no-cache"  # client được giữ bản cũ nhưng phải hỏi lại mỗi lần
+
+
+def _table_state_query(tables: Sequence[str]) -> str:
+    # Bảng quan hệ many2many của Odoo (*_rel) không có write_date, chỉ đếm số dòng
+    parts = [
+        "SELECT '{table}' AS name, {write_date} AS write_date, COUNT(*) AS total FROM {table}".format(
+            table=table,
+            write_date="NULL::timestamp" if table.endswith("_rel") else "MAX(write_date)",
+        )
+        for table in tables
+    ]
+    return " UNION ALL ".join(parts)
+
+
+async def get_table_state(tables: Sequence[str]) -> Dict[str, Any]:
+    """
+    (max write_date, số dòng) của các bảng gộp thành một chuỗi trạng thái, cache VALIDATOR_TTL giây
+    để nhiều request liên tiếp chỉ quét bảng một lần.
+    """
+    async def loader():
+        rows = await PostgresDB.execute_query(_table_state_query(tables))
+        write_dates = [row['write_date'] for row in rows if row['write_date'] is not None]
+        return {
+            'state': ";".join(
+                f"{row['name']}:{row['write_date'].isoformat() if row['write_date'] else ''}:{row['total']}"
+                for row in rows
+            ),
+            # write_date của Odoo là UTC naive
+            'last_modified': max(write_dates).replace(tzinfo=timezone.utc).timestamp() if write_dates else None,
+        }
+
+    return await get_or_load(VALIDATOR_PREFIX, f"{VALIDATOR_PREFIX}:{','.join(tables)}", loader, ttl=VALIDATOR_TTL)
+
+
+class CacheValidator:
+    """ETag (weak) và Last-Modified của một response, so với If-None-Match/If-Modified-Since của request"""
+
+    def __init__(self, etag: str, last_modified: Optional[float] = None):
+        self.etag = etag
+        self.last_modified = last_modified
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        headers = {"ETag": self.etag, "Cache-Control": CONDITIONAL_CACHE_CONTROL}
+        if self.last_modified is not None:
+            headers["Last-Modified"] = format_datetime(
+                datetime.fromtimestamp(int(self.last_modified), tz=timezone.utc), usegmt=True
+            )
+        return headers
+
+    def matches(self, request: Request) -> bool:
+        """True khi bản client đang giữ còn mới (If-None-Match được ưu tiên hơn If-Modified-Since)"""
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            if if_none_match.strip() == "*":
+                return True
+            tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+            return self.etag.removeprefix("W/") in tags
+
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since and self.last_modified is not None:
+            try:
+                since = parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+            if since.tzinfo is None:
+                since = since.replace(tzinfo=timezone.utc)
+            return int(self.last_modified) <= since.timestamp()
+        return False
+
+    def not_modified(self) -> HTTPException:
+        """304 không có body, http_exception_handler (app/main.py) trả kèm headers"""
+        return HTTPException(status_code=304, headers=self.headers)
+
+    def apply(self, response: Response):
+        response.headers.update(self.headers)
+
+
+async def build_validator(request: Request, tables: Sequence[str] = (),
+                          version_keys: Iterable[str] = ()) -> CacheValidator:
+    """
+    Validator cho request từ trạng thái các bảng và các key version trong Redis (dữ liệu không đổi
+    write_date, vd. bảng xếp hạng theo lượt xem). ETag gồm cả path và query string vì mỗi
+    trang/bộ lọc là một bản khác nhau.
+    """
+    parts = [request.url.path, str(sorted(request.query_params.multi_items()))]
+    last_modified = None
+    if tables:
+        table_state = await get_table_state(tuple(tables))
+        parts.append(table_state['state'])
+        last_modified = table_state['last_modified']
+    version_keys = list(version_keys)
+    if version_keys:
+        try:
+            versions = await redis_client.mget(version_keys)
+        except RedisError as e:
+            logger.warning(f"Cannot read validator versions {version_keys}: {str(e)}")
+            versions = [None]
+        if any(version is None for version in versions):
+            # Không biết version thì không so được, luôn trả bản mới
+            versions.append(datetime.now().timestamp())
+        parts.extend(str(version) for version in versions)
+        # Last-Modified không phản ánh version, để client dùng ETag
+        last_modified = None
+    digest = hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:20]
+    return CacheValidator(f'W/"{digest}"', last_modified)
+
+
+async def check_not_modified(request: Request, response: Response, tables: Sequence[str] = (),
+                             version_keys: Iterable[str] = (),
+                             on_not_modified: Optional[Callable[[], Awaitable[Any]]] = None
+                             ) -> Optional[CacheValidator]:
+    """
+    Raise 304 nếu bản client đang giữ còn mới (gọi on_not_modified trước, vd. vẫn tính lượt xem),
+    ngược lại gắn ETag/Last-Modified vào response. Không tính được validator thì bỏ qua.
+    """
+    try:
+        validator = await build_validator(request, tables, version_keys)
+    except Exception as e:
+        logger.error(f"Cannot build validator for {request.url.path}: {str(e)}")
+        return None
+    if validator.matches(request):
+        if on_not_modified is not None:
+            await on_not_modified()
+        raise validator.not_modified()
+    validator.apply(response)
+    return validator
+
+
+def conditional_get(*tables: str, version_keys: Iterable[str] = ()):
+    """
+    Dependency trả 304 trước khi endpoint chạy query nếu dữ liệu của các bảng không đổi,
+    ngược lại gắn ETag/Last-Modified vào response.
+
+        @router.get("/", dependencies=[Depends(conditional_get("product_category"))])
+    """
+    version_keys = tuple(version_keys)
+
+    async def dependency(request: Request, response: Response) -> Optional[CacheValidator]:
+        return await check_not_modified(request, response, tables, version_keys)
+
+    return dependency
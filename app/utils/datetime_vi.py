@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+# Định dạng ngày giờ tiếng Việt không phụ thuộc locale của hệ điều hành.
+# Odoo lưu datetime dạng UTC không timezone, hiển thị theo giờ Việt Nam (UTC+7, không có DST).
+
+VN_OFFSET = timedelta(hours=7)
+VN_TIMEZONE = timezone(VN_OFFSET)
+
+# Theo datetime.weekday(): 0 = Thứ hai ... 6 = Chủ nhật (giống tên ngày của locale vi_VN)
+WEEKDAY_NAMES = ("Thứ hai", "Thứ ba", "Thứ tư", "Thứ năm", "Thứ sáu", "Thứ bảy", "Chủ nhật")
+MONTH_NAMES = ("",) + tuple(f"tháng {month}" for month in range(1, 13))
+_TWO_DIGITS = tuple(f"{number:02d}" for number in range(100))
+
+
+def to_vn_time(value: Optional[datetime]) -> Optional[datetime]:
+    """Chuyển datetime UTC (naive như Odoo lưu, hoặc có timezone) sang giờ Việt Nam, bỏ tzinfo"""
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        return value.astimezone(VN_TIMEZONE).replace(tzinfo=None)
+    return value + VN_OFFSET
+
+
+def vn_to_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Chuyển giờ Việt Nam (naive) hoặc datetime có timezone sang UTC naive như Odoo lưu"""
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value - VN_OFFSET
+
+
+def format_datetime(local: Optional[datetime]) -> Optional[str]:
+    """DD-MM-YYYY HH:MM (giống TO_CHAR(..., 'DD-MM-YYYY HH24:MI') trước đây)"""
+    if local is None:
+        return None
+    return (
+        f"{_TWO_DIGITS[local.day]}-{_TWO_DIGITS[local.month]}-{local.year} "
+        f"{_TWO_DIGITS[local.hour]}:{_TWO_DIGITS[local.minute]}"
+    )
+
+
+def format_date_vi(local: Optional[datetime]) -> Optional[str]:
+    """Thứ hai, 5 tháng 3, 2025"""
+    if local is None:
+        return None
+    return f"{WEEKDAY_NAMES[local.weekday()]}, {local.day} {MONTH_NAMES[local.month]}, {local.year}"
+
+
+def format_time_range(start: Optional[datetime], stop: Optional[datetime]) -> Optional[str]:
+    """HH:MM - HH:MM"""
+    if start is None or stop is None:
+        return None
+    return (
+        f"{_TWO_DIGITS[start.hour]}:{_TWO_DIGITS[start.minute]} - "
+        f"{_TWO_DIGITS[stop.hour]}:{_TWO_DIGITS[stop.minute]}"
+    )
+
+
+def format_event_times(start: Optional[datetime], stop: Optional[datetime]) -> Dict[str, Any]:
+    """Các trường ngày giờ của một lịch hẹn từ start/stop UTC"""
+    start_local = to_vn_time(start)
+    stop_local = to_vn_time(stop)
+    return {
+        'date_start': format_datetime(start_local),
+        'date_end': format_datetime(stop_local),
+        'date_to_string': format_date_vi(start_local),
+        'time_to_string': format_time_range(start_local, stop_local),
+    }
+
+
+def format_event_times_page(rows: Iterable[Dict[str, Any]],
+                            start_field: str = 'start', stop_field: str = 'stop') -> List[Dict[str, Any]]:
+    """
+    Định dạng ngày giờ cho cả trang kết quả trong một lượt.
+    Các lịch trong trang thường trùng ngày nên chuỗi ngày được tính một lần cho mỗi ngày.
+    """
+    date_labels: Dict[Any, str] = {}
+    result = []
+    for row in rows:
+        start_local = to_vn_time(row.get(start_field))
+        stop_local = to_vn_time(row.get(stop_field))
+        date_label = None
+        if start_local is not None:
+            day = start_local.date()
+            date_label = date_labels.get(day)
+            if date_label is None:
+                date_label = date_labels[day] = format_date_vi(start_local)
+        result.append({
+            'date_start': format_datetime(start_local),
+            'date_end': format_datetime(stop_local),
+            'date_to_string': date_label,
+            'time_to_string': format_time_range(start_local, stop_local),
+        })
+    return result
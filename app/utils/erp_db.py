@@ -71,6 +71,17 @@ class PostgresDB:
             logger.error(f"Error executing query: {str(e)}")
             raise
 
+    @classmethod
+    async def fetchval(cls, query: str, params: Any = None) -> Any:
+        """Execute a query and return the first column of the first row (None if no row)"""
+        pool = await cls.get_pool()
+        try:
+            async with pool.acquire() as connection:
+                return await connection.fetchval(query, *(params or []))
+        except Exception as e:
+            logger.error(f"Error executing query: {str(e)}")
+            raise
+
     @classmethod
     async def execute_transaction(cls, queries: list) -> None:
         """Execute multiple queries in a transaction"""
@@ -0,0 +1,134 @@
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+from fastapi import Header, HTTPException, status
+from redis.exceptions import RedisError
+
+from .metrics import registry
+from .redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_PREFIX = "idempotency"
+IDEMPOTENCY_LOCK_TTL = 120  # giây, thời gian tối đa một request đang xử lý giữ key
+IDEMPOTENCY_RESULT_TTL = 86400  # giây, thời gian lưu kết quả để trả lại cho request lặp
+IDEMPOTENCY_WAIT_TIMEOUT = 30  # giây, request trùng chờ request đầu tối đa
+IDEMPOTENCY_POLL_INTERVAL = 0.2  # giây
+IDEMPOTENCY_KEY_PATTERN = re.compile(r"^[A-Za-z0-9_\-:.]{8,128}$")
+
+STATE_PENDING = "pending"
+STATE_DONE = "done"
+
+idempotency_requests = registry.counter(
+    "idempotency_requests_total", "Số request có Idempotency-Key theo thao tác và kết quả"
+)
+
+
+async def get_idempotency_key(
+        idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+) -> Optional[str]:
+    """Dependency đọc header Idempotency-Key (tùy chọn, client nên gửi UUID mới cho mỗi thao tác)"""
+    if idempotency_key is None:
+        return None
+    idempotency_key = idempotency_key.strip()
+    if not IDEMPOTENCY_KEY_PATTERN.match(idempotency_key):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Idempotency-Key không hợp lệ (8-128 ký tự chữ, số, '-', '_', ':', '.')",
+        )
+    return idempotency_key
+
+
+def _fingerprint(payload: Any) -> str:
+    return hashlib.sha256(
+        json.dumps(payload, sort_keys=True, default=str, separators=(",", ":")).encode()
+    ).hexdigest()
+
+
+async def run_idempotent(scope: str, idempotency_key: Optional[str], current_user, payload: Any,
+                         handler: Callable[[], Awaitable[Any]],
+                         store_if: Optional[Callable[[Any], bool]] = None) -> Any:
+    """
+    Chạy handler một lần cho mỗi (thao tác, user, Idempotency-Key).
+
+    - Request đầu tiên giữ key trạng thái pending (SET NX) trong lúc gọi Odoo, xong thì lưu kết quả.
+    - Request trùng khi request đầu đang chạy: chờ rồi trả cùng kết quả, quá thời gian chờ trả 409.
+    - Request trùng sau khi xong: trả kết quả đã lưu, không gọi Odoo.
+    - Cùng key nhưng payload khác: 422.
+    - Handler lỗi (hoặc store_if trả False): xóa key để client thử lại được.
+    - Request bị hủy giữa chừng: giữ key pending tới khi hết IDEMPOTENCY_LOCK_TTL.
+
+    Không có header hoặc Redis lỗi: chạy handler như bình thường.
+    """
+    if not idempotency_key:
+        return await handler()
+
+    key = f"{IDEMPOTENCY_PREFIX}:{scope}:{current_user.partner_id}:{idempotency_key}"
+    fingerprint = _fingerprint(payload)
+    deadline = time.monotonic() + IDEMPOTENCY_WAIT_TIMEOUT
+
+    while True:
+        try:
+            claimed = await redis_client.set(
+                key, {'state': STATE_PENDING, 'fingerprint': fingerprint},
+                expiry=IDEMPOTENCY_LOCK_TTL, nx=True,
+            )
+            record = None if claimed else await redis_client.get(key)
+        except RedisError as e:
+            logger.error(f"Redis unavailable for idempotency key {scope}: {str(e)}")
+            return await handler()
+
+        if claimed:
+            break
+        if record is None:
+            # Key vừa hết hạn/bị xóa giữa SET NX và GET: thử giữ lại
+            continue
+        if record.get('fingerprint') != fingerprint:
+            idempotency_requests.inc(scope=scope, result="mismatch")
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Idempotency-Key đã được dùng cho một yêu cầu khác",
+            )
+        if record.get('state') == STATE_DONE:
+            idempotency_requests.inc(scope=scope, result="replayed")
+            return record.get('response')
+        if time.monotonic() >= deadline:
+            idempotency_requests.inc(scope=scope, result="conflict")
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Yêu cầu đang được xử lý, vui lòng thử lại sau",
+            )
+        await asyncio.sleep(IDEMPOTENCY_POLL_INTERVAL)
+
+    idempotency_requests.inc(scope=scope, result="new")
+    try:
+        response = await handler()
+    except Exception:
+        await _release(key)
+        raise
+    # CancelledError (client ngắt kết nối, shutdown): không xóa key vì Odoo có thể đã xử lý xong,
+    # để bản ghi pending tự hết hạn sau IDEMPOTENCY_LOCK_TTL
+
+    if store_if is not None and not store_if(response):
+        await _release(key)
+        return response
+    try:
+        await redis_client.set(
+            key, {'state': STATE_DONE, 'fingerprint': fingerprint, 'response': response},
+            expiry=IDEMPOTENCY_RESULT_TTL,
+        )
+    except RedisError as e:
+        logger.error(f"Cannot store idempotent response {scope}: {str(e)}")
+    return response
+
+
+async def _release(key: str):
+    try:
+        await redis_client.delete(key)
+    except RedisError as e:
+        logger.error(f"Cannot release idempotency key: {str(e)}")
@@ -0,0 +1,98 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import asyncpg
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+NotificationHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class PgListener:
+    """
+    Một kết nối LISTEN riêng cho mỗi worker, nhận NOTIFY từ trigger trong database và
+    chuyển payload (JSON) tới các handler đã đăng ký theo channel.
+    Kết nối không lấy từ pool của PostgresDB vì phải giữ mở suốt vòng đời ứng dụng.
+    """
+
+    RECONNECT_INTERVAL = 5  # giây
+
+    def __init__(self):
+        self._handlers: Dict[str, List[NotificationHandler]] = defaultdict(list)
+        self._connection: Optional[asyncpg.Connection] = None
+        self._supervisor: Optional[asyncio.Task] = None
+        self._tasks = set()
+
+    def add_handler(self, channel: str, handler: NotificationHandler):
+        """Đăng ký handler cho channel, nên gọi trước khi start"""
+        if handler not in self._handlers[channel]:
+            self._handlers[channel].append(handler)
+
+    @property
+    def connected(self) -> bool:
+        return self._connection is not None and not self._connection.is_closed()
+
+    async def start(self):
+        if self._supervisor is None and self._handlers:
+            self._supervisor = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._supervisor is not None:
+            self._supervisor.cancel()
+            try:
+                await self._supervisor
+            except asyncio.CancelledError:
+                pass
+            self._supervisor = None
+        await self._close_connection()
+
+    async def _connect(self):
+        connection = await asyncpg.connect(settings.POSTGRES_DATABASE_URL)
+        for channel in self._handlers:
+            await connection.add_listener(channel, self._on_notification)
+        self._connection = connection
+        logger.info(f"Listening to PostgreSQL channels: {', '.join(self._handlers)}")
+
+    async def _close_connection(self):
+        if self._connection is not None:
+            try:
+                await self._connection.close()
+            except Exception as e:
+                logger.warning(f"Error closing PostgreSQL listener connection: {str(e)}")
+            self._connection = None
+
+    async def _run(self):
+        """Giữ kết nối LISTEN, tự kết nối lại khi bị ngắt"""
+        while True:
+            if not self.connected:
+                await self._close_connection()
+                try:
+                    await self._connect()
+                except Exception as e:
+                    logger.error(f"PostgreSQL listener connection failed: {str(e)}")
+            await asyncio.sleep(self.RECONNECT_INTERVAL)
+
+    def _on_notification(self, connection, pid: int, channel: str, payload: str):
+        try:
+            data = json.loads(payload) if payload else {}
+        except ValueError:
+            logger.warning(f"Invalid notification payload on {channel}: {payload}")
+            return
+        for handler in self._handlers.get(channel, []):
+            task = asyncio.create_task(self._dispatch(channel, handler, data))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    @staticmethod
+    async def _dispatch(channel: str, handler: NotificationHandler, data: Dict[str, Any]):
+        try:
+            await handler(data)
+        except Exception as e:
+            logger.error(f"Error handling notification on {channel}: {str(e)}")
+
+
+pg_listener = PgListener()
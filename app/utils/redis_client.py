@@ -1,66 +1,404 @@
+import asyncio
 import redis.asyncio as redis
-from redis.exceptions import ConnectionError
-import json
+from redis.asyncio.cluster import RedisCluster
+from redis.asyncio.connection import BlockingConnectionPool, parse_url
+from redis.asyncio.retry import Retry
+from redis.asyncio.sentinel import Sentinel, SentinelConnectionPool
+from redis.backoff import ExponentialBackoff
+from redis.exceptions import ConnectionError, RedisError, ResponseError, TimeoutError
 import logging
-from typing import Any, Dict, List, Optional, Union
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple, Union
 from ..config import settings
+from .metrics import registry
+from .redis_serializer import RedisSerializer, get_serializer
 
 logger = logging.getLogger(__name__)
 
+REDIS_MODE_STANDALONE = "standalone"
+REDIS_MODE_SENTINEL = "sentinel"
+REDIS_MODE_CLUSTER = "cluster"
+
+redis_pool_waiting = registry.gauge(
+    "redis_pool_waiting_connections", "Số request đang chờ lấy kết nối Redis từ pool"
+)
+redis_pool_errors = registry.counter(
+    "redis_pool_errors_total", "Số lần lấy kết nối Redis từ pool thất bại"
+)
+redis_command_errors = registry.counter(
+    "redis_command_errors_total", "Số lệnh Redis lỗi theo loại lỗi"
+)
+
+
+def _pool_gauge(field: str):
+    return lambda: [({"mode": redis_client.mode}, redis_client.pool_stats()[field])]
+
+
+registry.gauge("redis_pool_in_use_connections", "Số kết nối Redis đang được sử dụng",
+               callback=_pool_gauge("in_use"))
+registry.gauge("redis_pool_available_connections", "Số kết nối Redis rảnh trong pool",
+               callback=_pool_gauge("available"))
+registry.gauge("redis_pool_max_connections", "Số kết nối Redis tối đa của pool",
+               callback=_pool_gauge("max_connections"))
+
+
+class InstrumentedPoolMixin:
+    """Đếm số request đang chờ kết nối và số lần lấy kết nối lỗi (timeout pool, mất kết nối)"""
+
+    async def get_connection(self, command_name, *keys, **options):
+        redis_pool_waiting.inc()
+        try:
+            return await super().get_connection(command_name, *keys, **options)
+        except BaseException as e:
+            if not isinstance(e, asyncio.CancelledError):
+                redis_pool_errors.inc(error=type(e).__name__)
+            raise
+        finally:
+            redis_pool_waiting.dec()
+
+
+class InstrumentedBlockingConnectionPool(InstrumentedPoolMixin, BlockingConnectionPool):
+    pass
+
+
+class InstrumentedSentinelConnectionPool(InstrumentedPoolMixin, SentinelConnectionPool):
+    pass
+
+
+class InstrumentedCommandMixin:
+    async def execute_command(self, *args, **options):
+        try:
+            return await super().execute_command(*args, **options)
+        except RedisError as e:
+            redis_command_errors.inc(error=type(e).__name__)
+            raise
+
+
+class InstrumentedRedis(InstrumentedCommandMixin, redis.Redis):
+    pass
+
+
+class InstrumentedRedisCluster(InstrumentedCommandMixin, RedisCluster):
+    pass
+
+
+_DELETE_IF_EQUALS_SCRIPT = """
+local stored = redis.call('GET', KEYS[1])
+if not stored then
+    return 0
+end
+if stored == ARGV[1] or stored == ARGV[2] then
+    redis.call('DEL', KEYS[1])
+    return 1
+end
+return -1
+"""
+
+
+class RedisPipeline:
+    """
+    Gom nhiều lệnh Redis vào một round trip, giá trị được serialize như RedisClient.
+
+    Mỗi lệnh logic có thể sinh nhiều lệnh Redis (vd. incr có expiry), kết quả trả về
+    theo đúng thứ tự lệnh logic đã gọi, có trong `results` sau khi execute.
+    """
+
+    def __init__(self, pipe, serializer: RedisSerializer, default_expiry: int):
+        self._pipe = pipe
+        self._serializer = serializer
+        self._default_expiry = default_expiry
+        # (số lệnh Redis, hàm xử lý kết quả thô) cho từng lệnh logic
+        self._ops: List[Tuple[int, Callable[[list], Any]]] = []
+        self.results: Optional[List[Any]] = None
+
+    def _queue(self, size: int = 1, handler: Callable[[list], Any] = None):
+        self._ops.append((size, handler or (lambda raw: raw[-1])))
+        return self
+
+    def set(self, key: str, value: Any, expiry: int = None, nx: bool = False):
+        self._pipe.set(key, self._serializer.dumps(value), ex=expiry or self._default_expiry, nx=nx)
+        return self._queue()
+
+    def get(self, key: str):
+        self._pipe.get(key)
+        return self._queue(handler=lambda raw: self._serializer.loads(raw[0]))
+
+    def getdel(self, key: str):
+        self._pipe.getdel(key)
+        return self._queue(handler=lambda raw: self._serializer.loads(raw[0]))
+
+    def delete(self, *keys: str):
+        self._pipe.delete(*keys)
+        return self._queue()
+
+    def exists(self, key: str):
+        self._pipe.exists(key)
+        return self._queue(handler=lambda raw: raw[0] > 0)
+
+    def expire(self, key: str, seconds: int):
+        self._pipe.expire(key, seconds)
+        return self._queue()
+
+    def ttl(self, key: str):
+        self._pipe.ttl(key)
+        return self._queue()
+
+    def incr(self, key: str, expiry: int = None):
+        """Tăng key, chỉ đặt expiry khi key mới được tạo (SET NX EX rồi INCR)"""
+        if expiry:
+            self._pipe.set(key, 0, ex=expiry, nx=True)
+            self._pipe.incr(key)
+            return self._queue(size=2)
+        self._pipe.incr(key)
+        return self._queue()
+
+    def hset(self, name: str, key: str, value: Any):
+        self._pipe.hset(name, key, self._serializer.dumps(value))
+        return self._queue()
+
+    def hget(self, name: str, key: str):
+        self._pipe.hget(name, key)
+        return self._queue(handler=lambda raw: self._serializer.loads(raw[0]))
+
+    def hincrby(self, name: str, key: str, amount: int = 1):
+        self._pipe.hincrby(name, key, amount)
+        return self._queue()
+
+    def zadd(self, name: str, mapping: Dict[str, float]):
+        self._pipe.zadd(name, mapping)
+        return self._queue()
+
+    def zincrby(self, name: str, amount: float, member: str):
+        self._pipe.zincrby(name, amount, member)
+        return self._queue()
+
+    def zunionstore(self, dest: str, keys: Union[List[str], Dict[str, float]]):
+        """keys là dict {key: weight} để nhân điểm khi gộp"""
+        self._pipe.zunionstore(dest, keys)
+        return self._queue()
+
+    def rename(self, src: str, dst: str):
+        self._pipe.rename(src, dst)
+        return self._queue()
+
+    async def execute(self) -> List[Any]:
+        raw_results = await self._pipe.execute()
+        results, index = [], 0
+        for size, handler in self._ops:
+            results.append(handler(raw_results[index:index + size]))
+            index += size
+        self._ops = []
+        self.results = results
+        return results
+
+
 class RedisClient:
-    def __init__(self):
+    def __init__(self, serializer: Optional[RedisSerializer] = None):
         self.redis_url = settings.REDIS_URL
+        self.mode = (settings.REDIS_MODE or REDIS_MODE_STANDALONE).lower()
         self.redis_client = None
         self.default_expiry = settings.REDIS_DEFAULT_EXPIRY  # Thời gian hết hạn mặc định (giây)
+        # Serializer cho giá trị, có thể thay bằng serializer khác khi khởi tạo
+        self.serializer = serializer or get_serializer(
+            settings.REDIS_SERIALIZER,
+            compress_threshold=settings.REDIS_COMPRESS_THRESHOLD,
+        )
+
+    @property
+    def is_cluster(self) -> bool:
+        return self.mode == REDIS_MODE_CLUSTER
+
+    @staticmethod
+    def _connection_kwargs() -> Dict[str, Any]:
+        """Cấu hình kết nối dùng chung cho mọi chế độ"""
+        kwargs = {
+            # Không decode response: giá trị là bytes có header của serializer
+            "decode_responses": False,
+            "socket_timeout": settings.REDIS_SOCKET_TIMEOUT,
+            "socket_connect_timeout": settings.REDIS_SOCKET_CONNECT_TIMEOUT,
+            "socket_keepalive": settings.REDIS_SOCKET_KEEPALIVE,
+            "health_check_interval": settings.REDIS_HEALTH_CHECK_INTERVAL,
+        }
+        if settings.REDIS_RETRY_ON_TIMEOUT and settings.REDIS_RETRY_ATTEMPTS > 0:
+            # Thử lại khi mất kết nối/timeout (vd. trong lúc failover), backoff tăng dần
+            kwargs["retry"] = Retry(ExponentialBackoff(cap=1, base=0.05), settings.REDIS_RETRY_ATTEMPTS)
+            kwargs["retry_on_error"] = [ConnectionError, TimeoutError]
+        return kwargs
+
+    def _create_standalone_client(self):
+        pool = InstrumentedBlockingConnectionPool.from_url(
+            self.redis_url,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            timeout=settings.REDIS_POOL_TIMEOUT,
+            **self._connection_kwargs(),
+        )
+        return InstrumentedRedis.from_pool(pool)
+
+    def _create_sentinel_client(self):
+        sentinels = []
+        for address in settings.REDIS_SENTINELS.split(","):
+            host, _, port = address.strip().rpartition(":")
+            sentinels.append((host, int(port)))
+
+        # REDIS_URL chỉ dùng để lấy db/username/password của master
+        url_options = parse_url(self.redis_url) if self.redis_url else {}
+        connection_kwargs = {
+            key: url_options[key] for key in ("db", "username", "password") if url_options.get(key) is not None
+        }
+        sentinel_kwargs = {
+            "socket_timeout": settings.REDIS_SOCKET_TIMEOUT,
+            "socket_connect_timeout": settings.REDIS_SOCKET_CONNECT_TIMEOUT,
+        }
+        if settings.REDIS_SENTINEL_PASSWORD:
+            sentinel_kwargs["password"] = settings.REDIS_SENTINEL_PASSWORD
+
+        sentinel = Sentinel(sentinels, sentinel_kwargs=sentinel_kwargs, **self._connection_kwargs())
+        return sentinel.master_for(
+            settings.REDIS_SENTINEL_MASTER,
+            redis_class=InstrumentedRedis,
+            connection_pool_class=InstrumentedSentinelConnectionPool,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            **connection_kwargs,
+        )
+
+    def _create_cluster_client(self):
+        # Mỗi node trong cluster có pool riêng, giới hạn max_connections theo từng node
+        return InstrumentedRedisCluster.from_url(
+            self.redis_url,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            **self._connection_kwargs(),
+        )
 
     async def connect(self):
-        """Kết nối đến Redis server"""
+        """Kết nối đến Redis server theo REDIS_MODE (standalone | sentinel | cluster)"""
         try:
-            self.redis_client = await redis.from_url(
-                self.redis_url,
-                encoding="utf-8",
-                decode_responses=True
-            )
-            logger.info("Connected to Redis successfully")
+            if self.mode == REDIS_MODE_SENTINEL:
+                client = self._create_sentinel_client()
+            elif self.mode == REDIS_MODE_CLUSTER:
+                client = self._create_cluster_client()
+                await client.initialize()
+            else:
+                client = self._create_standalone_client()
+            self.redis_client = client
+            logger.info(f"Connected to Redis successfully (mode={self.mode})")
             return self.redis_client
-        except ConnectionError as e:
+        except (ConnectionError, TimeoutError) as e:
             logger.error(f"Failed to connect to Redis: {e}")
             raise
 
+    async def ping(self) -> bool:
+        """Kiểm tra Redis còn phản hồi không"""
+        client = await self.get_client()
+        return bool(await client.ping())
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """Số kết nối đang dùng/sẵn sàng trong pool, tổng hợp trên mọi node khi chạy cluster"""
+        stats = {
+            "mode": self.mode,
+            "max_connections": settings.REDIS_MAX_CONNECTIONS,
+            "in_use": 0,
+            "available": 0,
+            "waiting": int(redis_pool_waiting.get()),
+            "errors": int(redis_pool_errors.total()),
+        }
+        client = self.redis_client
+        if client is None:
+            return stats
+        if self.is_cluster:
+            for node in client.get_nodes():
+                stats["available"] += len(node._free)
+                stats["in_use"] += len(node._connections) - len(node._free)
+        else:
+            pool = client.connection_pool
+            stats["available"] = len(pool._available_connections)
+            stats["in_use"] = len(pool._in_use_connections)
+        return stats
+
     async def get_client(self):
         """Lấy Redis client, tạo kết nối mới nếu chưa có"""
         if self.redis_client is None:
             await self.connect()
         return self.redis_client
 
-    async def set(self, key: str, value: Any, expiry: int = None) -> bool:
-        """Lưu giá trị vào Redis với key"""
+    async def set(self, key: str, value: Any, expiry: int = None, nx: bool = False) -> bool:
+        """Lưu giá trị vào Redis với key, nx=True chỉ lưu khi key chưa tồn tại"""
         client = await self.get_client()
-        if isinstance(value, (dict, list)):
-            value = json.dumps(value)
-        
         expiry = expiry or self.default_expiry
-        return await client.set(key, value, ex=expiry)
+        return bool(await client.set(key, self.serializer.dumps(value), ex=expiry, nx=nx))
 
     async def get(self, key: str) -> Any:
         """Lấy giá trị từ Redis theo key"""
         client = await self.get_client()
-        value = await client.get(key)
-        
-        if value is None:
-            return None
-            
+        return self.serializer.loads(await client.get(key))
+
+    async def get_raw(self, key: str) -> Optional[bytes]:
+        """Lấy bytes thô (chưa deserialize) của key"""
+        client = await self.get_client()
+        return await client.get(key)
+
+    async def set_raw(self, key: str, value: bytes, expiry: int = None) -> bool:
+        """Lưu bytes đã serialize sẵn vào key"""
+        client = await self.get_client()
+        return await client.set(key, value, ex=expiry or self.default_expiry)
+
+    async def mget(self, keys: List[str]) -> List[Any]:
+        """Lấy nhiều key trong một round trip, key không tồn tại trả về None"""
+        if not keys:
+            return []
+        client = await self.get_client()
+        if self.is_cluster:
+            # Các key có thể nằm ở slot khác nhau, gom theo node rồi gộp kết quả
+            values = await client.mget_nonatomic(keys)
+        else:
+            values = await client.mget(keys)
+        return [self.serializer.loads(value) for value in values]
+
+    async def mset(self, mapping: Dict[str, Any], expiry: int = None) -> bool:
+        """Lưu nhiều key kèm TTL trong một round trip (MSET không hỗ trợ TTL nên dùng pipeline SET EX)"""
+        if not mapping:
+            return True
+        async with self.pipeline() as pipe:
+            for key, value in mapping.items():
+                pipe.set(key, value, expiry=expiry)
+        return all(pipe.results)
+
+    async def getdel(self, key: str) -> Any:
+        """Lấy giá trị và xóa key trong một lệnh (GETDEL, Redis >= 6.2)"""
+        client = await self.get_client()
         try:
-            # Thử parse JSON
-            return json.loads(value)
-        except json.JSONDecodeError:
-            # Nếu không phải JSON, trả về giá trị nguyên bản
-            return value
+            value = await client.getdel(key)
+        except ResponseError:
+            # Redis cũ chưa có GETDEL: GET + DEL trong một transaction
+            async with client.pipeline(transaction=not self.is_cluster) as pipe:
+                value, _ = await pipe.get(key).delete(key).execute()
+        return self.serializer.loads(value)
 
-    async def delete(self, key: str) -> int:
-        """Xóa key khỏi Redis"""
+    @asynccontextmanager
+    async def pipeline(self, transaction: bool = True) -> AsyncIterator[RedisPipeline]:
+        """
+        Context manager gom lệnh vào một round trip, tự execute khi thoát khối lệnh.
+        transaction=True bọc trong MULTI/EXEC để các lệnh được thực hiện nguyên tử
+        (chế độ cluster không hỗ trợ MULTI nên luôn chạy pipeline thường).
+
+            async with redis_client.pipeline() as pipe:
+                pipe.incr(key, expiry=60)
+                pipe.get(other_key)
+            count, other = pipe.results
+        """
+        client = await self.get_client()
+        if self.is_cluster:
+            transaction = None
+        async with client.pipeline(transaction=transaction) as pipe:
+            wrapper = RedisPipeline(pipe, self.serializer, self.default_expiry)
+            yield wrapper
+            await wrapper.execute()
+
+    async def delete(self, *keys: str) -> int:
+        """Xóa một hoặc nhiều key khỏi Redis"""
+        if not keys:
+            return 0
         client = await self.get_client()
-        return await client.delete(key)
+        return await client.delete(*keys)
 
     async def exists(self, key: str) -> bool:
         """Kiểm tra key có tồn tại trong Redis không"""
@@ -79,65 +417,100 @@ class RedisClient:
 
     async def incr(self, key: str, expiry: int = None) -> int:
         """Tăng giá trị của key lên 1, trả về giá trị sau khi tăng"""
-        client = await self.get_client()
-        value = await client.incr(key)
-        
-        # Nếu key mới được tạo (value = 1), set expiry
-        if value == 1 and expiry:
-            await client.expire(key, expiry)
-        
-        return value
+        if not expiry:
+            client = await self.get_client()
+            return await client.incr(key)
+
+        # Chỉ set expiry khi key mới được tạo, SET NX EX + INCR trong một round trip
+        async with self.pipeline() as pipe:
+            pipe.incr(key, expiry=expiry)
+        return pipe.results[0]
 
     async def keys(self, pattern: str = "*") -> List[str]:
         """Lấy danh sách các key theo pattern"""
         client = await self.get_client()
-        return await client.keys(pattern)
+        return [self._decode_key(key) for key in await client.keys(pattern)]
 
     async def hset(self, name: str, key: str, value: Any) -> int:
         """Lưu giá trị vào hash"""
         client = await self.get_client()
-        if isinstance(value, (dict, list)):
-            value = json.dumps(value)
-        return await client.hset(name, key, value)
+        return await client.hset(name, key, self.serializer.dumps(value))
 
     async def hget(self, name: str, key: str) -> Any:
         """Lấy giá trị từ hash"""
         client = await self.get_client()
-        value = await client.hget(name, key)
-        
-        if value is None:
-            return None
-            
-        try:
-            # Thử parse JSON
-            return json.loads(value)
-        except json.JSONDecodeError:
-            # Nếu không phải JSON, trả về giá trị nguyên bản
-            return value
+        return self.serializer.loads(await client.hget(name, key))
 
     async def hgetall(self, name: str) -> Dict[str, Any]:
         """Lấy tất cả giá trị từ hash"""
         client = await self.get_client()
         result = await client.hgetall(name)
-        
-        # Thử parse JSON cho mỗi giá trị
-        for key, value in result.items():
-            try:
-                result[key] = json.loads(value)
-            except json.JSONDecodeError:
-                pass
-                
-        return result
+        return {
+            self._decode_key(key): self.serializer.loads(value)
+            for key, value in result.items()
+        }
+
+    async def delete_if_equals(self, key: str, value: Any) -> Optional[bool]:
+        """
+        So sánh và xóa key nguyên tử (Lua): True khi giá trị bằng value và đã xóa,
+        False khi khác (giữ nguyên key), None khi key không tồn tại.
+        Nhận cả giá trị cũ lưu không có header serializer.
+        """
+        client = await self.get_client()
+        raw = value.encode("utf-8") if isinstance(value, str) else value
+        result = await client.eval(_DELETE_IF_EQUALS_SCRIPT, 1, key, self.serializer.dumps(value), raw)
+        if result == 0:
+            return None
+        return result == 1
+
+    async def hincrby(self, name: str, key: str, amount: int = 1) -> int:
+        """Tăng số nguyên trong hash, trả về giá trị sau khi tăng"""
+        client = await self.get_client()
+        return await client.hincrby(name, key, amount)
+
+    async def renamenx(self, src: str, dst: str) -> bool:
+        """
+        Đổi tên key nếu dst chưa tồn tại. False khi dst đã có hoặc src không tồn tại.
+        Chế độ cluster: src và dst phải cùng hash slot (dùng hash tag {...}).
+        """
+        client = await self.get_client()
+        try:
+            return bool(await client.renamenx(src, dst))
+        except ResponseError:
+            # "no such key"
+            return False
+
+    async def zrevrange(self, name: str, start: int, end: int) -> List[Tuple[str, float]]:
+        """Các member theo điểm giảm dần trong khoảng [start, end], kèm điểm"""
+        client = await self.get_client()
+        return [
+            (self._decode_key(member), score)
+            for member, score in await client.zrevrange(name, start, end, withscores=True)
+        ]
+
+    async def zrange(self, name: str, start: int = 0, end: int = -1) -> List[str]:
+        client = await self.get_client()
+        return [self._decode_key(member) for member in await client.zrange(name, start, end)]
+
+    async def zrem(self, name: str, *members: str) -> int:
+        if not members:
+            return 0
+        client = await self.get_client()
+        return await client.zrem(name, *members)
 
     async def hdel(self, name: str, *keys) -> int:
         """Xóa các key khỏi hash"""
         client = await self.get_client()
         return await client.hdel(name, *keys)
 
+    @staticmethod
+    def _decode_key(key: Union[bytes, str]) -> str:
+        return key.decode("utf-8") if isinstance(key, bytes) else key
+
     async def close(self):
         """Đóng kết nối Redis"""
         if self.redis_client:
-            await self.redis_client.close()
+            await self.redis_client.aclose()
             self.redis_client = None
             logger.info("Redis connection closed")
 
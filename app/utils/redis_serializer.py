@@ -0,0 +1,174 @@
+import datetime
+import decimal
+import json
+import logging
+import zlib
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional, Union
+
+try:
+    import msgpack
+except ImportError:  # msgpack là tùy chọn, thiếu thì dùng JSON
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+# Header giá trị: MAGIC + định dạng + cờ nén.
+# 0xC1 không hợp lệ trong UTF-8 (và không được dùng trong msgpack) nên không thể
+# trùng với byte đầu của giá trị cũ (JSON/chuỗi thuần) đã lưu trước đây.
+HEADER_MAGIC = b"\xc1"
+HEADER_SIZE = 3
+
+FORMAT_STR = b"s"
+FORMAT_BYTES = b"b"
+FORMAT_JSON = b"j"
+FORMAT_MSGPACK = b"m"
+
+FLAG_PLAIN = b"-"
+FLAG_ZLIB = b"z"
+
+
+def _default(value: Any) -> Any:
+    """Chuyển các kiểu asyncpg hay trả về (Decimal, datetime) sang kiểu serialize được"""
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+
+def _json_dumps(value: Any) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+def _json_loads(payload: bytes) -> Any:
+    return json.loads(payload)
+
+
+def _msgpack_dumps(value: Any) -> bytes:
+    return msgpack.packb(value, use_bin_type=True, default=_default)
+
+
+def _msgpack_loads(payload: bytes) -> Any:
+    if msgpack is None:
+        raise RuntimeError("Giá trị được lưu bằng msgpack nhưng thư viện msgpack chưa được cài đặt")
+    return msgpack.unpackb(payload, raw=False, strict_map_key=False)
+
+
+_DECODERS = {
+    FORMAT_STR: lambda payload: payload.decode("utf-8"),
+    FORMAT_BYTES: lambda payload: payload,
+    FORMAT_JSON: _json_loads,
+    FORMAT_MSGPACK: _msgpack_loads,
+}
+
+
+class RedisSerializer(ABC):
+    """
+    Serializer cho giá trị lưu trong Redis
+
+    Mỗi giá trị được gắn header 3 byte (magic, định dạng, cờ nén) nên khi đọc không
+    cần đoán kiểu. Chuỗi và bytes được lưu nguyên bản, các kiểu khác dùng định dạng
+    của serializer. Payload lớn hơn ngưỡng sẽ được nén zlib nếu nén có lợi.
+    Giá trị cũ không có header vẫn đọc được theo cách cũ (thử JSON, lỗi thì trả chuỗi).
+    """
+
+    name = "base"
+    format_tag = FORMAT_JSON
+
+    def __init__(self, compress_threshold: int = 1024, compress_level: int = 6):
+        # compress_threshold <= 0: tắt nén
+        self.compress_threshold = compress_threshold
+        self.compress_level = compress_level
+
+    @abstractmethod
+    def encode(self, value: Any) -> bytes:
+        """Serialize giá trị không phải str/bytes thành payload (chưa có header)"""
+
+    def dumps(self, value: Any) -> bytes:
+        """Serialize giá trị thành bytes kèm header"""
+        if isinstance(value, str):
+            format_tag, payload = FORMAT_STR, value.encode("utf-8")
+        elif isinstance(value, (bytes, bytearray)):
+            format_tag, payload = FORMAT_BYTES, bytes(value)
+        else:
+            format_tag, payload = self.format_tag, self.encode(value)
+
+        flag = FLAG_PLAIN
+        if 0 < self.compress_threshold <= len(payload):
+            compressed = zlib.compress(payload, self.compress_level)
+            if len(compressed) < len(payload):
+                flag, payload = FLAG_ZLIB, compressed
+
+        return HEADER_MAGIC + format_tag + flag + payload
+
+    def loads(self, raw: Optional[Union[bytes, str]]) -> Any:
+        """Đọc giá trị từ Redis, hỗ trợ cả giá trị cũ không có header"""
+        if raw is None:
+            return None
+        if isinstance(raw, str):
+            raw = raw.encode("utf-8")
+
+        if raw[:1] == HEADER_MAGIC and len(raw) >= HEADER_SIZE:
+            format_tag, flag, payload = raw[1:2], raw[2:3], raw[HEADER_SIZE:]
+            decoder = _DECODERS.get(format_tag)
+            if decoder is not None and flag in (FLAG_PLAIN, FLAG_ZLIB):
+                if flag == FLAG_ZLIB:
+                    payload = zlib.decompress(payload)
+                return decoder(payload)
+
+        return self._loads_legacy(raw)
+
+    @staticmethod
+    def _loads_legacy(raw: bytes) -> Any:
+        try:
+            value = raw.decode("utf-8")
+        except UnicodeDecodeError:
+            return raw
+        try:
+            # Thử parse JSON
+            return json.loads(value)
+        except json.JSONDecodeError:
+            # Nếu không phải JSON, trả về giá trị nguyên bản
+            return value
+
+
+class JsonSerializer(RedisSerializer):
+    name = "json"
+    format_tag = FORMAT_JSON
+
+    def encode(self, value: Any) -> bytes:
+        return _json_dumps(value)
+
+
+class MsgpackSerializer(RedisSerializer):
+    name = "msgpack"
+    format_tag = FORMAT_MSGPACK
+
+    def __init__(self, *args, **kwargs):
+        if msgpack is None:
+            raise RuntimeError("Chưa cài đặt thư viện msgpack")
+        super().__init__(*args, **kwargs)
+
+    def encode(self, value: Any) -> bytes:
+        return _msgpack_dumps(value)
+
+
+SERIALIZERS: Dict[str, type] = {
+    JsonSerializer.name: JsonSerializer,
+    MsgpackSerializer.name: MsgpackSerializer,
+}
+
+
+def get_serializer(name: str = "msgpack", compress_threshold: int = 1024) -> RedisSerializer:
+    """Tạo serializer theo tên cấu hình, fallback về JSON nếu không dùng được"""
+    serializer_cls = SERIALIZERS.get((name or "").lower())
+    if serializer_cls is None:
+        logger.warning(f"Unknown Redis serializer '{name}', falling back to json")
+        serializer_cls = JsonSerializer
+    if serializer_cls is MsgpackSerializer and msgpack is None:
+        logger.warning("msgpack is not installed, falling back to json Redis serializer")
+        serializer_cls = JsonSerializer
+    return serializer_cls(compress_threshold=compress_threshold)
@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+shadow_comparisons = registry.counter(
+    "shadow_comparisons_total", "Số lần so sánh kết quả mới với kết quả gốc theo tên và kết quả so sánh"
+)
+
+SHADOW_RESULT_MATCH = "match"
+SHADOW_RESULT_MISMATCH = "mismatch"
+SHADOW_RESULT_SKIPPED = "skipped"
+SHADOW_RESULT_ERROR = "error"
+
+
+class ShadowComparator:
+    """
+    Chạy song song cách làm mới (local) với cách làm cũ (nguồn chuẩn, vd. Odoo) và ghi nhận sai lệch.
+    Kết quả trả cho client luôn là kết quả gốc; phần so sánh chạy nền, lỗi không ảnh hưởng request.
+    """
+
+    _instances: Dict[str, "ShadowComparator"] = {}
+
+    def __init__(self, name: str, max_samples: int = 50, tolerance: float = 0.5):
+        self.name = name
+        self.tolerance = tolerance
+        self.samples = deque(maxlen=max_samples)
+        self._tasks = set()
+        ShadowComparator._instances[name] = self
+
+    @classmethod
+    def all(cls) -> List["ShadowComparator"]:
+        return list(cls._instances.values())
+
+    def _equal(self, expected: Any, actual: Any) -> bool:
+        if isinstance(expected, (int, float)) and isinstance(actual, (int, float)) \
+                and not isinstance(expected, bool) and not isinstance(actual, bool):
+            return abs(float(expected) - float(actual)) <= self.tolerance
+        return expected == actual
+
+    def compare(self, expected: Dict[str, Any], actual: Dict[str, Any],
+                fields: Dict[str, Iterable[str]], context: Optional[Dict[str, Any]] = None) -> str:
+        """
+        So sánh các trường của actual với expected.
+        fields: tên trường của actual -> các tên có thể có của trường tương ứng trong expected.
+        """
+        differences = {}
+        compared = 0
+        for field, aliases in fields.items():
+            expected_key = next((alias for alias in aliases if alias in expected), None)
+            if expected_key is None or field not in actual:
+                continue
+            compared += 1
+            if not self._equal(expected[expected_key], actual[field]):
+                differences[field] = {'expected': expected[expected_key], 'actual': actual[field]}
+
+        if compared == 0:
+            result = SHADOW_RESULT_SKIPPED
+        elif differences:
+            result = SHADOW_RESULT_MISMATCH
+        else:
+            result = SHADOW_RESULT_MATCH
+
+        shadow_comparisons.inc(name=self.name, result=result)
+        if result != SHADOW_RESULT_MATCH:
+            self.samples.append({
+                'time': time.time(),
+                'result': result,
+                'context': context,
+                'differences': differences,
+                # Không so sánh được trường nào: lưu nguyên kết quả gốc để xem cấu trúc
+                'expected': expected if result == SHADOW_RESULT_SKIPPED else None,
+            })
+            logger.warning(f"Shadow {self.name} {result}: {differences or 'no comparable fields'}")
+        return result
+
+    def record_error(self, error: Exception, context: Optional[Dict[str, Any]] = None):
+        shadow_comparisons.inc(name=self.name, result=SHADOW_RESULT_ERROR)
+        self.samples.append({
+            'time': time.time(),
+            'result': SHADOW_RESULT_ERROR,
+            'context': context,
+            'error': str(error),
+        })
+
+    def compare_in_background(self, expected: Dict[str, Any], compute: Callable[[], Awaitable[Optional[Dict[str, Any]]]],
+                              fields: Dict[str, Iterable[str]], context: Optional[Dict[str, Any]] = None):
+        """Tính kết quả mới ở nền rồi so sánh; compute trả None nghĩa là cách mới không hỗ trợ trường hợp này"""
+
+        async def run():
+            try:
+                actual = await compute()
+            except Exception as e:
+                logger.error(f"Shadow {self.name} compute failed: {str(e)}")
+                self.record_error(e, context)
+                return
+            if actual is None:
+                shadow_comparisons.inc(name=self.name, result=SHADOW_RESULT_SKIPPED)
+                return
+            self.compare(expected, actual, fields, context)
+
+        task = asyncio.create_task(run())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'counts': {
+                result: int(shadow_comparisons.get(name=self.name, result=result))
+                for result in (SHADOW_RESULT_MATCH, SHADOW_RESULT_MISMATCH, SHADOW_RESULT_SKIPPED, SHADOW_RESULT_ERROR)
+            },
+            'recent': list(self.samples),
+        }
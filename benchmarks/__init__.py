@@ -0,0 +1 @@
+# Microbenchmark cho các đường xử lý nóng, chạy bằng: python -m benchmarks.<tên_module>
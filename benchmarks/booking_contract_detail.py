@@ -0,0 +1,154 @@
+"""
+So sánh hai cách trả chi tiết hợp đồng định kỳ (hợp đồng 1 năm, 52 buổi):
+- cũ: 3 query tuần tự, dựng dict trong Python, FastAPI encode lại thành JSON
+- mới: Postgres dựng cả document bằng json_build_object/json_agg, API gửi thẳng bytes
+
+Mặc định đo phần xử lý trong Python trên dữ liệu giả (không cần database, không tính thời gian query).
+Với --contract-id/--partner-id thì chạy cả hai cách trên database thật theo POSTGRES_DATABASE_URL.
+
+Chạy:
+    python -m benchmarks.booking_contract_detail
+    python -m benchmarks.booking_contract_detail --contract-id 123 --partner-id 45 --repeat 200
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.api.v1.endpoints.booking_contract.booking_contract_service import (
+    BookingContractService,
+    CONTRACT_DETAIL_MESSAGE,
+)
+from app.schemas.user import UserObject
+from app.utils.erp_db import PostgresDB
+
+
+def make_rows(schedule_count: int):
+    contract = {
+        'id': 1, 'code': 'HD0001', 'name': 'Hợp đồng dọn nhà định kỳ', 'partner_id': 7,
+        'partner_name': 'Nguyễn Văn A', 'contact_id': 9, 'contact_name': 'Nhà riêng',
+        'contact_address': '12 Lê Lợi, Phường Bến Nghé, Hồ Chí Minh', 'package_id': 3,
+        'package_name': 'Gói 12 tháng', 'package_duration_months': 12, 'categ_id': 2,
+        'categ_name': 'Dọn dẹp nhà', 'start_date': '2025-01-06', 'end_date': '2026-01-06',
+        'start_hours': 8, 'appointment_duration': 3, 'total_hours': 156, 'required_staff_qty': 2,
+        'state': 'confirm', 'payment_status': 'paid', 'price_unit': Decimal('180000.00'),
+        'base_price': Decimal('28080000.00'), 'extra_total': Decimal('520000.00'),
+        'amount_before_discount': Decimal('28600000.00'), 'discount_amount': Decimal('2860000.00'),
+        'discount_percent': 10.0, 'amount_subtotal': Decimal('25740000.00'),
+        'amount_tax': Decimal('2059200.00'), 'amount_total': Decimal('27799200.00'),
+        'program_id': None, 'program_name': None, 'description': None, 'payment_method_id': 1,
+        'pm_id': 1, 'payment_method_name': 'PayOS', 'payment_method_code': 'payos',
+    }
+    schedules = []
+    for index in range(schedule_count):
+        done = index < schedule_count // 2
+        schedules.append({
+            'id': 1000 + index,
+            'date_cleaning': (date(2025, 1, 6) + timedelta(weeks=index)).isoformat(),
+            'time_cleaning': 8.0, 'hours': 3.0, 'base_amount': Decimal('540000.00'),
+            'amount': Decimal('495000.00'), 'state': 'done' if done else 'draft',
+            'actual_event_id': 5000 + index if done else None,
+            'event_id': 5000 + index if done else None,
+            'event_name': f'Lịch dọn dẹp #{index + 1}' if done else None,
+            'event_start': f'{date(2025, 1, 6) + timedelta(weeks=index)} 01:00:00' if done else None,
+            'cleaning_state': 'done' if done else None,
+        })
+    extras = [
+        {'id': 1, 'product_id': 11, 'product_name': 'Giặt rèm', 'quantity': 1, 'price_unit': Decimal('200000.00')},
+        {'id': 2, 'product_id': 12, 'product_name': 'Lau kính', 'quantity': 2, 'price_unit': Decimal('160000.00')},
+    ]
+    return contract, schedules, extras
+
+
+def wrap(result):
+    return {"success": True, "message": CONTRACT_DETAIL_MESSAGE, "data": result.get("data")}
+
+
+async def bench(label, func, repeat):
+    await func()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        body = await func()
+    elapsed = (time.perf_counter() - started) / repeat
+    print(f"{label:<10} {elapsed * 1e6:10.1f} µs/request  {len(body)} bytes")
+    return elapsed
+
+
+async def run_simulated(args, user):
+    contract, schedules, extras = make_rows(args.schedules)
+
+    async def fake_execute_query(query, params=None):
+        if 'FROM schedule_booking_calendar' in query:
+            return [dict(row) for row in schedules]
+        if 'FROM extra_service' in query:
+            return [dict(row) for row in extras]
+        return [dict(contract)]
+
+    PostgresDB.execute_query = fake_execute_query
+    old_result = await BookingContractService.get_booking_contract_detail(1, user)
+    # Document mà Postgres sẽ trả: cùng nội dung, số thập phân ở dạng number
+    document = json.dumps(jsonable_encoder(wrap(old_result)), ensure_ascii=False)
+
+    async def fake_fetchval(query, params=None):
+        return document
+
+    PostgresDB.fetchval = fake_fetchval
+
+    async def old_path():
+        result = await BookingContractService.get_booking_contract_detail(1, user)
+        return JSONResponse(content=jsonable_encoder(wrap(result))).body
+
+    async def new_path():
+        body = await BookingContractService.get_booking_contract_detail_json(1, user)
+        return Response(content=body, media_type="application/json").body
+
+    assert json.loads(await old_path()) == json.loads(await new_path())
+    old_time = await bench('cũ', old_path, args.repeat)
+    new_time = await bench('sql json', new_path, args.repeat)
+    print(f"phần Python nhanh hơn {old_time / new_time:.1f} lần (chưa tính 3 -> 1 round trip database)")
+
+
+async def run_live(args, user):
+    await PostgresDB.initialize_pool(min_size=1, max_size=2)
+    try:
+        async def old_path():
+            result = await BookingContractService.get_booking_contract_detail(args.contract_id, user)
+            return JSONResponse(content=jsonable_encoder(wrap(result))).body
+
+        async def new_path():
+            return await BookingContractService.get_booking_contract_detail_json(args.contract_id, user)
+
+        old_doc, new_doc = json.loads(await old_path()), json.loads(await new_path())
+        if old_doc != new_doc:
+            print("CẢNH BÁO: hai cách trả về khác nhau")
+        print(f"số buổi: {len(new_doc['data']['schedules'])}")
+        old_time = await bench('cũ', old_path, args.repeat)
+        new_time = await bench('sql json', new_path, args.repeat)
+        print(f"nhanh hơn {old_time / new_time:.1f} lần")
+    finally:
+        await PostgresDB.close_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--schedules', type=int, default=52, help='số buổi của hợp đồng giả')
+    parser.add_argument('--repeat', type=int, default=2000)
+    parser.add_argument('--contract-id', type=int, help='đo trên database thật')
+    parser.add_argument('--partner-id', type=int, default=7)
+    args = parser.parse_args()
+
+    user = UserObject(odoo_token='', uid=0, partner_id=args.partner_id)
+    if args.contract_id:
+        asyncio.run(run_live(args, user))
+    else:
+        asyncio.run(run_simulated(args, user))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+So sánh định dạng ngày giờ của danh sách lịch hẹn: code cũ (TO_CHAR trong SQL, strptime lại,
+setlocale + strftime mỗi request) và app.utils.datetime_vi trên timestamp gốc của asyncpg.
+
+Chạy:
+    python -m benchmarks.booking_date_format
+    python -m benchmarks.booking_date_format --rows 50 --repeat 2000
+"""
+import argparse
+import locale
+import random
+import time
+from datetime import datetime, timedelta
+
+from app.utils.datetime_vi import format_event_times_page
+
+
+def make_rows(count: int):
+    """Trang dữ liệu giả: start/stop UTC naive như asyncpg trả về, kèm chuỗi TO_CHAR như query cũ"""
+    base = datetime(2025, 3, 1, 0, 0)
+    rows = []
+    for _ in range(count):
+        start = base + timedelta(days=random.randint(0, 30), hours=random.randint(0, 12))
+        stop = start + timedelta(hours=random.choice((2, 3, 4, 5)))
+        rows.append({
+            'start': start,
+            'stop': stop,
+            'start_text': (start + timedelta(hours=7)).strftime('%d-%m-%Y %H:%M'),
+            'stop_text': (stop + timedelta(hours=7)).strftime('%d-%m-%Y %H:%M'),
+        })
+    return rows
+
+
+def legacy_format(rows):
+    try:
+        locale.setlocale(locale.LC_TIME, 'vi_VN.UTF-8')
+    except locale.Error:
+        locale.setlocale(locale.LC_TIME, 'C')
+
+    result = []
+    for item in rows:
+        start_dt = datetime.strptime(item.get('start_text'), '%d-%m-%Y %H:%M')
+        stop_dt = datetime.strptime(item.get('stop_text'), '%d-%m-%Y %H:%M')
+        result.append({
+            'date_start': item.get('start_text'),
+            'date_end': item.get('stop_text'),
+            'date_to_string': start_dt.strftime("%A, %d tháng %m, %Y").replace(" 0", " "),
+            'time_to_string': f"{start_dt.strftime('%H:%M')} - {stop_dt.strftime('%H:%M')}",
+        })
+    return result
+
+
+def bench(label, func, rows, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(rows)
+    elapsed = time.perf_counter() - start
+    per_page = elapsed / repeat * 1e6
+    print(f"{label:<12} {per_page:10.1f} µs/trang {per_page / len(rows):8.2f} µs/dòng")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10, help='số dòng mỗi trang')
+    parser.add_argument('--repeat', type=int, default=5000)
+    args = parser.parse_args()
+
+    random.seed(1)
+    rows = make_rows(args.rows)
+
+    legacy = legacy_format(rows)
+    current = format_event_times_page(rows)
+    has_vi_locale = locale.setlocale(locale.LC_TIME).startswith('vi_VN')
+    locale.setlocale(locale.LC_TIME, 'C')
+    print(f"locale vi_VN: {'có' if has_vi_locale else 'không có (code cũ ra tên thứ tiếng Anh)'}")
+    print(f"ví dụ cũ: {legacy[0]['date_to_string']} | mới: {current[0]['date_to_string']}")
+    for old, new in zip(legacy, current):
+        for field in ('date_start', 'date_end', 'time_to_string'):
+            assert old[field] == new[field], (field, old[field], new[field])
+        if has_vi_locale:
+            assert old['date_to_string'] == new['date_to_string']
+
+    old_time = bench('cũ', legacy_format, rows, args.repeat)
+    new_time = bench('datetime_vi', format_event_times_page, rows, args.repeat)
+    print(f"nhanh hơn {old_time / new_time:.1f} lần")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Đo chỉ mục lịch bận của nhân viên (app.services.availability_engine) trên một tuần dữ liệu giả:
+thời gian nạp, thời gian trả lời một câu hỏi (danh mục, khung giờ) và thời gian cập nhật một lịch.
+Kết quả được đối chiếu với cách quét tuyến tính toàn bộ lịch.
+
+Chạy:
+    python -m benchmarks.employee_availability
+    python -m benchmarks.employee_availability --events 10000 --employees 300 --queries 20000
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from app.services.availability_engine import AvailabilityEngine
+
+
+def make_data(event_count: int, employee_count: int, category_count: int):
+    """Lịch giả trong 7 ngày từ 7h-19h giờ Việt Nam, mỗi lịch 1-3 nhân viên, mỗi nhân viên 1-3 danh mục"""
+    base = datetime(2025, 3, 3, 0, 0)  # 7h giờ Việt Nam
+    employee_rows = []
+    for employee_id in range(1, employee_count + 1):
+        for categ_id in random.sample(range(1, category_count + 1), random.randint(1, 3)):
+            employee_rows.append({'categ_id': categ_id, 'id': employee_id, 'name': f"Nhân viên {employee_id}"})
+
+    event_rows = []
+    for event_id in range(1, event_count + 1):
+        start = base + timedelta(days=random.randint(0, 6), minutes=30 * random.randint(0, 20))
+        stop = start + timedelta(hours=random.choice((2, 3, 4)))
+        for employee_id in random.sample(range(1, employee_count + 1), random.randint(1, 3)):
+            event_rows.append({'id': event_id, 'start': start, 'stop': stop, 'employee_id': employee_id})
+    return base, event_rows, employee_rows
+
+
+def linear_available(event_rows, employee_rows, categ_id, start, stop):
+    busy = {row['employee_id'] for row in event_rows if row['start'] < stop and row['stop'] > start}
+    return [row['id'] for row in employee_rows if row['categ_id'] == categ_id and row['id'] not in busy]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=int, default=10000)
+    parser.add_argument('--employees', type=int, default=300)
+    parser.add_argument('--categories', type=int, default=10)
+    parser.add_argument('--queries', type=int, default=20000)
+    args = parser.parse_args()
+
+    random.seed(1)
+    base, event_rows, employee_rows = make_data(args.events, args.employees, args.categories)
+    engine = AvailabilityEngine()
+
+    started = time.perf_counter()
+    engine.load(event_rows, employee_rows)
+    print(f"nạp {args.events} lịch ({len(event_rows)} dòng lịch-nhân viên): "
+          f"{(time.perf_counter() - started) * 1000:.1f} ms")
+
+    queries = []
+    for _ in range(args.queries):
+        start = base + timedelta(days=random.randint(0, 6), minutes=30 * random.randint(0, 20))
+        queries.append((random.randint(1, args.categories), start, start + timedelta(hours=random.choice((2, 3, 4)))))
+
+    for categ_id, start, stop in queries[:200]:
+        expected = linear_available(event_rows, employee_rows, categ_id, start, stop)
+        assert [employee['id'] for employee in engine.available_employees(categ_id, start, stop)] == expected
+
+    timings = []
+    for categ_id, start, stop in queries:
+        started = time.perf_counter()
+        engine.available_employees(categ_id, start, stop)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    print(f"truy vấn: trung bình {sum(timings) / len(timings) * 1e6:.1f} µs, "
+          f"p99 {timings[int(len(timings) * 0.99)] * 1e6:.1f} µs")
+
+    categ_id, start, stop = queries[0]
+    started = time.perf_counter()
+    for _ in range(20):
+        linear_available(event_rows, employee_rows, categ_id, start, stop)
+    print(f"quét tuyến tính: {(time.perf_counter() - started) / 20 * 1e6:.1f} µs/truy vấn")
+
+    started = time.perf_counter()
+    updates = 2000
+    for index in range(updates):
+        event_id = random.randint(1, args.events)
+        start = base + timedelta(days=random.randint(0, 6), minutes=30 * random.randint(0, 20))
+        engine.apply_event(event_id, start, start + timedelta(hours=3),
+                           random.sample(range(1, args.employees + 1), 2))
+    print(f"cập nhật một lịch: {(time.perf_counter() - started) / updates * 1e6:.1f} µs")
+
+
+if __name__ == '__main__':
+    main()
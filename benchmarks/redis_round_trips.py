@@ -0,0 +1,157 @@
+"""
+Đếm số round trip Redis cho từng endpoint, trước và sau khi dùng pipeline/batch helper.
+
+Chạy (cần các biến môi trường của app, xem .env.example):
+    python -m benchmarks.redis_round_trips            # Redis thật theo REDIS_URL
+    python -m benchmarks.redis_round_trips --fake     # fakeredis trong bộ nhớ (pip install fakeredis)
+
+Luồng "trước" chạy lại đúng chuỗi lệnh của code cũ trên client thô, luồng "sau" gọi
+trực tiếp code hiện tại của AuthorizationService/deps. Các bước gọi Odoo/Postgres bị bỏ qua.
+"""
+import argparse
+import asyncio
+import time
+
+from app.api import deps
+from app.api.v1.endpoints.authorization.authorization_service import (
+    AuthorizationService,
+    OTP_EXPIRE,
+    OTP_REDIS_PREFIX,
+    OTP_RATE_LIMIT_PREFIX,
+    REDIS_EXPIRE,
+)
+from app.utils.redis_client import redis_client
+
+
+class RoundTripCounter:
+    """Đếm round trip: mỗi lệnh đơn là 1, mỗi lần execute pipeline (khác rỗng) là 1"""
+
+    def __init__(self, client):
+        self.count = 0
+        execute_command = client.execute_command
+        make_pipeline = client.pipeline
+
+        async def counted_execute_command(*args, **kwargs):
+            self.count += 1
+            return await execute_command(*args, **kwargs)
+
+        def counted_pipeline(*args, **kwargs):
+            pipe = make_pipeline(*args, **kwargs)
+            execute = pipe.execute
+
+            async def counted_execute(*e_args, **e_kwargs):
+                if pipe.command_stack:
+                    self.count += 1
+                return await execute(*e_args, **e_kwargs)
+
+            pipe.execute = counted_execute
+            return pipe
+
+        client.execute_command = counted_execute_command
+        client.pipeline = counted_pipeline
+
+
+USER = {'token': 'odoo-token', 'uid': 1, 'partner_id': 1, 'login': '0900000000'}
+
+
+# ---- Luồng cũ: chuỗi lệnh giống hệt code trước khi tối ưu ----
+
+async def legacy_login(client, i):
+    token_key = f"bench::legacy-jwt-{i}"
+    await client.set(token_key, f"login:{USER['login']}", ex=3600)
+    await client.expire(token_key, REDIS_EXPIRE)
+    return token_key
+
+
+async def legacy_auth(client, i):
+    await client.exists(f"bench::legacy-jwt-{i}")
+
+
+async def legacy_send_otp(client, i):
+    phone, ip = f"09{i:08d}", f"10.0.{i // 250}.{i % 250}"
+    keys = [
+        (f"{OTP_RATE_LIMIT_PREFIX}phone:{phone}:5min", 300),
+        (f"{OTP_RATE_LIMIT_PREFIX}phone:{phone}:24h", 86400),
+        (f"{OTP_RATE_LIMIT_PREFIX}ip:{ip}:1min", 60),
+    ]
+    for key, _ in keys:
+        await client.get(key)
+    for key, expiry in keys:
+        value = await client.incr(key)
+        if value == 1:
+            await client.expire(key, expiry)
+    await client.set(f"{OTP_REDIS_PREFIX}{phone}", "123456", ex=OTP_EXPIRE)
+
+
+async def legacy_verify_otp(client, i):
+    key = f"{OTP_REDIS_PREFIX}09{i:08d}"
+    await client.get(key)
+    await client.delete(key)
+    await legacy_login(client, i)
+
+
+# ---- Luồng hiện tại ----
+
+TOKENS = {}
+
+
+async def current_login(client, i):
+    TOKENS[i] = await AuthorizationService.create_token(USER)
+
+
+async def current_auth(client, i):
+    await deps.parse_token(TOKENS[i])
+
+
+async def current_send_otp(client, i):
+    phone, ip = f"08{i:08d}", f"10.1.{i // 250}.{i % 250}"
+    await AuthorizationService.check_otp_rate_limit(phone, ip)
+    await redis_client.set(f"{OTP_REDIS_PREFIX}{phone}", "123456", expiry=OTP_EXPIRE)
+
+
+async def current_verify_otp(client, i):
+    await AuthorizationService.consume_otp(f"08{i:08d}", "123456")
+    await AuthorizationService.create_token(USER)
+
+
+ENDPOINTS = [
+    ("POST /authorization/login (lưu token)", legacy_login, current_login),
+    ("Request có xác thực (parse_token)", legacy_auth, current_auth),
+    ("POST /authorization/send-otp", legacy_send_otp, current_send_otp),
+    ("POST /authorization/verify-otp", legacy_verify_otp, current_verify_otp),
+]
+
+
+async def measure(flow, client, counter, iterations):
+    counter.count = 0
+    started = time.perf_counter()
+    for i in range(iterations):
+        await flow(client, i)
+    elapsed = time.perf_counter() - started
+    return counter.count / iterations, elapsed / iterations * 1e6
+
+
+async def main(iterations: int, fake: bool):
+    if fake:
+        import fakeredis.aioredis
+        redis_client.redis_client = fakeredis.aioredis.FakeRedis()
+    client = await redis_client.get_client()
+    counter = RoundTripCounter(client)
+
+    print(f"{'Endpoint':<42} {'RT trước':>9} {'RT sau':>7} {'µs trước':>10} {'µs sau':>9}")
+    for name, legacy_flow, current_flow in ENDPOINTS:
+        legacy_rt, legacy_us = await measure(legacy_flow, client, counter, iterations)
+        current_rt, current_us = await measure(current_flow, client, counter, iterations)
+        print(f"{name:<42} {legacy_rt:>9.1f} {current_rt:>7.1f} {legacy_us:>10.1f} {current_us:>9.1f}")
+
+    if fake:
+        await client.flushdb()
+    await redis_client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--fake", action="store_true", help="Dùng fakeredis thay vì REDIS_URL")
+    args = parser.parse_args()
+    asyncio.run(main(args.iterations, args.fake))
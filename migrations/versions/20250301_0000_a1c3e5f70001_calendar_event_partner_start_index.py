@@ -0,0 +1,32 @@
+"""calendar_event (partner_id, start) index for booking list
+
+Revision ID: a1c3e5f70001
+Revises:
+Create Date: 2025-03-01 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a1c3e5f70001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY không chạy được trong transaction, tránh khóa ghi bảng calendar_event của Odoo
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS calendar_event_partner_id_start_idx "
+            "ON calendar_event (partner_id, start)"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS calendar_event_partner_id_start_idx")
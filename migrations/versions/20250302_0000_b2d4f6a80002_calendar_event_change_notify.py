@@ -0,0 +1,57 @@
+"""NOTIFY calendar_event_changed on calendar_event writes
+
+Revision ID: b2d4f6a80002
+Revises: a1c3e5f70001
+Create Date: 2025-03-02 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b2d4f6a80002'
+down_revision: Union[str, None] = 'a1c3e5f70001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Gửi NOTIFY sau mỗi thay đổi calendar_event (kể cả từ Odoo) để API làm mới cache.
+    # NOTIFY chỉ được gửi khi transaction commit.
+    op.execute("""
+        CREATE OR REPLACE FUNCTION api_notify_calendar_event_changed() RETURNS trigger AS $$
+        DECLARE
+            rec calendar_event;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                rec := OLD;
+            ELSE
+                rec := NEW;
+            END IF;
+            PERFORM pg_notify('calendar_event_changed', json_build_object(
+                'op', TG_OP,
+                'id', rec.id,
+                'partner_id', rec.partner_id,
+                'old_partner_id', CASE WHEN TG_OP = 'UPDATE' THEN OLD.partner_id END,
+                'cleaning_state', rec.cleaning_state,
+                'payment_status', rec.payment_status,
+                'write_date', rec.write_date
+            )::text);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("DROP TRIGGER IF EXISTS api_calendar_event_changed ON calendar_event")
+    op.execute("""
+        CREATE TRIGGER api_calendar_event_changed
+        AFTER INSERT OR UPDATE OR DELETE ON calendar_event
+        FOR EACH ROW EXECUTE FUNCTION api_notify_calendar_event_changed()
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS api_calendar_event_changed ON calendar_event")
+    op.execute("DROP FUNCTION IF EXISTS api_notify_calendar_event_changed()")
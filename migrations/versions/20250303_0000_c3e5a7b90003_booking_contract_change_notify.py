@@ -0,0 +1,56 @@
+"""NOTIFY booking_contract_changed on booking_contract writes
+
+Revision ID: c3e5a7b90003
+Revises: b2d4f6a80002
+Create Date: 2025-03-03 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e5a7b90003'
+down_revision: Union[str, None] = 'b2d4f6a80002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Thay đổi trạng thái/thanh toán hợp đồng, dùng cho luồng SSE /booking/events/stream
+    op.execute("""
+        CREATE OR REPLACE FUNCTION api_notify_booking_contract_changed() RETURNS trigger AS $$
+        DECLARE
+            rec booking_contract;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                rec := OLD;
+            ELSE
+                rec := NEW;
+            END IF;
+            PERFORM pg_notify('booking_contract_changed', json_build_object(
+                'op', TG_OP,
+                'id', rec.id,
+                'partner_id', rec.partner_id,
+                'old_partner_id', CASE WHEN TG_OP = 'UPDATE' THEN OLD.partner_id END,
+                'state', rec.state,
+                'payment_status', rec.payment_status,
+                'write_date', rec.write_date
+            )::text);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("DROP TRIGGER IF EXISTS api_booking_contract_changed ON booking_contract")
+    op.execute("""
+        CREATE TRIGGER api_booking_contract_changed
+        AFTER INSERT OR UPDATE OR DELETE ON booking_contract
+        FOR EACH ROW EXECUTE FUNCTION api_notify_booking_contract_changed()
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS api_booking_contract_changed ON booking_contract")
+    op.execute("DROP FUNCTION IF EXISTS api_notify_booking_contract_changed()")
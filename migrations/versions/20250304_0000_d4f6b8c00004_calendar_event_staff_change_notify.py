@@ -0,0 +1,53 @@
+"""NOTIFY calendar_event_staff_changed on calendar_event_staff_rel writes
+
+Revision ID: d4f6b8c00004
+Revises: c3e5a7b90003
+Create Date: 2025-03-04 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4f6b8c00004'
+down_revision: Union[str, None] = 'c3e5a7b90003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Đổi nhân viên của lịch chỉ ghi vào bảng quan hệ, calendar_event không đổi nên cần trigger riêng
+    # để chỉ mục lịch bận của nhân viên trong API được cập nhật.
+    op.execute("""
+        CREATE OR REPLACE FUNCTION api_notify_calendar_event_staff_changed() RETURNS trigger AS $$
+        DECLARE
+            rec calendar_event_staff_rel;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                rec := OLD;
+            ELSE
+                rec := NEW;
+            END IF;
+            PERFORM pg_notify('calendar_event_staff_changed', json_build_object(
+                'op', TG_OP,
+                'event_id', rec.event_id,
+                'employee_id', rec.employee_id
+            )::text);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("DROP TRIGGER IF EXISTS api_calendar_event_staff_changed ON calendar_event_staff_rel")
+    op.execute("""
+        CREATE TRIGGER api_calendar_event_staff_changed
+        AFTER INSERT OR UPDATE OR DELETE ON calendar_event_staff_rel
+        FOR EACH ROW EXECUTE FUNCTION api_notify_calendar_event_staff_changed()
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS api_calendar_event_staff_changed ON calendar_event_staff_rel")
+    op.execute("DROP FUNCTION IF EXISTS api_notify_calendar_event_staff_changed()")
@@ -0,0 +1,38 @@
+"""booking_contract (partner_id, start_date, id) and schedule_booking_calendar (contract_id) indexes
+
+Revision ID: e5a7c9d10005
+Revises: d4f6b8c00004
+Create Date: 2025-03-05 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a7c9d10005'
+down_revision: Union[str, None] = 'd4f6b8c00004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Danh sách hợp đồng phân trang keyset theo (start_date, id) của partner,
+    # tiến độ hợp đồng đếm schedule theo contract_id
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS booking_contract_partner_id_start_date_id_idx "
+            "ON booking_contract (partner_id, start_date DESC, id DESC)"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS schedule_booking_calendar_contract_id_date_cleaning_idx "
+            "ON schedule_booking_calendar (contract_id, date_cleaning)"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS schedule_booking_calendar_contract_id_date_cleaning_idx")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS booking_contract_partner_id_start_date_id_idx")
@@ -0,0 +1,115 @@
+"""blog_post full-text search side table (unaccent + pg_trgm)
+
+Revision ID: f6b8d0e20006
+Revises: e5a7c9d10005
+Create Date: 2025-03-06 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6b8d0e20006'
+down_revision: Union[str, None] = 'e5a7c9d10005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # Postgres không có cấu hình tiếng Việt: dùng simple (không stemming) qua unaccent để
+    # "vệ sinh" và "ve sinh" cho cùng lexeme. ts_headline với cấu hình này vẫn đánh dấu
+    # được trên văn bản gốc có dấu.
+    op.execute("DROP TEXT SEARCH CONFIGURATION IF EXISTS api_vi")
+    op.execute("CREATE TEXT SEARCH CONFIGURATION api_vi (COPY = simple)")
+    op.execute("""
+        ALTER TEXT SEARCH CONFIGURATION api_vi
+        ALTER MAPPING FOR asciiword, asciihword, hword_asciipart, word, hword, hword_part
+        WITH unaccent, simple
+    """)
+
+    # Bảng phụ thay vì thêm cột vào blog_post (bảng của Odoo)
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS api_blog_post_search (
+            post_id integer PRIMARY KEY REFERENCES blog_post (id) ON DELETE CASCADE,
+            document tsvector NOT NULL,
+            search_text text NOT NULL
+        )
+    """)
+
+    # SECURITY DEFINER: trigger chạy khi Odoo ghi blog_post, user của Odoo không cần quyền ghi
+    # bảng phụ. search_path cố định để user khác không chèn được bảng/hàm unaccent cùng tên
+    # vào schema đứng trước public (pg_temp để cuối cùng).
+    op.execute("""
+        CREATE OR REPLACE FUNCTION api_blog_post_search_refresh() RETURNS trigger AS $$
+        DECLARE
+            title text := COALESCE(NEW.name ->> 'vi_VN', NEW.name ->> 'en_US', '');
+            subtitle text := COALESCE(NEW.subtitle ->> 'vi_VN', NEW.subtitle ->> 'en_US', '');
+            body text := regexp_replace(
+                COALESCE(NEW.content ->> 'vi_VN', NEW.content ->> 'en_US', ''), '<[^>]*>', ' ', 'g'
+            );
+        BEGIN
+            INSERT INTO api_blog_post_search (post_id, document, search_text)
+            VALUES (
+                NEW.id,
+                setweight(to_tsvector('api_vi', title), 'A')
+                    || setweight(to_tsvector('api_vi', subtitle), 'B')
+                    || setweight(to_tsvector('api_vi', body), 'C'),
+                lower(unaccent(title || ' ' || subtitle))
+            )
+            ON CONFLICT (post_id) DO UPDATE
+                SET document = EXCLUDED.document,
+                    search_text = EXCLUDED.search_text;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        SECURITY DEFINER
+        SET search_path = public, pg_temp
+    """)
+    op.execute("REVOKE ALL ON FUNCTION api_blog_post_search_refresh() FROM PUBLIC")
+    op.execute("DROP TRIGGER IF EXISTS api_blog_post_search_refresh ON blog_post")
+    # Chỉ khi nội dung đổi, tăng lượt xem không tính lại
+    op.execute("""
+        CREATE TRIGGER api_blog_post_search_refresh
+        AFTER INSERT OR UPDATE OF name, subtitle, content ON blog_post
+        FOR EACH ROW EXECUTE FUNCTION api_blog_post_search_refresh()
+    """)
+
+    # Nạp các bài viết hiện có
+    op.execute("""
+        INSERT INTO api_blog_post_search (post_id, document, search_text)
+        SELECT
+            bp.id,
+            setweight(to_tsvector('api_vi', COALESCE(bp.name ->> 'vi_VN', bp.name ->> 'en_US', '')), 'A')
+                || setweight(to_tsvector('api_vi', COALESCE(bp.subtitle ->> 'vi_VN', bp.subtitle ->> 'en_US', '')), 'B')
+                || setweight(to_tsvector('api_vi', regexp_replace(
+                    COALESCE(bp.content ->> 'vi_VN', bp.content ->> 'en_US', ''), '<[^>]*>', ' ', 'g'
+                )), 'C'),
+            lower(unaccent(
+                COALESCE(bp.name ->> 'vi_VN', bp.name ->> 'en_US', '') || ' '
+                || COALESCE(bp.subtitle ->> 'vi_VN', bp.subtitle ->> 'en_US', '')
+            ))
+        FROM blog_post bp
+        ON CONFLICT (post_id) DO NOTHING
+    """)
+
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS api_blog_post_search_document_idx "
+        "ON api_blog_post_search USING gin (document)"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS api_blog_post_search_search_text_trgm_idx "
+        "ON api_blog_post_search USING gin (search_text gin_trgm_ops)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS api_blog_post_search_refresh ON blog_post")
+    op.execute("DROP FUNCTION IF EXISTS api_blog_post_search_refresh()")
+    op.execute("DROP TABLE IF EXISTS api_blog_post_search")
+    op.execute("DROP TEXT SEARCH CONFIGURATION IF EXISTS api_vi")
@@ -0,0 +1,122 @@
+"""Add start/stop to calendar_event and calendar_event_staff_rel NOTIFY payloads
+
+Revision ID: a7c9e1f30007
+Revises: f6b8d0e20006
+Create Date: 2025-03-07 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c9e1f30007'
+down_revision: Union[str, None] = 'f6b8d0e20006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Thêm khoảng thời gian của lịch (cả giá trị cũ khi UPDATE) để API chỉ làm mới cache
+    # của các tháng bị ảnh hưởng thay vì toàn bộ.
+    op.execute("""
+        CREATE OR REPLACE FUNCTION api_notify_calendar_event_changed() RETURNS trigger AS $$
+        DECLARE
+            rec calendar_event;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                rec := OLD;
+            ELSE
+                rec := NEW;
+            END IF;
+            PERFORM pg_notify('calendar_event_changed', json_build_object(
+                'op', TG_OP,
+                'id', rec.id,
+                'partner_id', rec.partner_id,
+                'old_partner_id', CASE WHEN TG_OP = 'UPDATE' THEN OLD.partner_id END,
+                'cleaning_state', rec.cleaning_state,
+                'payment_status', rec.payment_status,
+                'write_date', rec.write_date,
+                'start', rec.start,
+                'stop', rec.stop,
+                'old_start', CASE WHEN TG_OP = 'UPDATE' THEN OLD.start END,
+                'old_stop', CASE WHEN TG_OP = 'UPDATE' THEN OLD.stop END
+            )::text);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION api_notify_calendar_event_staff_changed() RETURNS trigger AS $$
+        DECLARE
+            rec calendar_event_staff_rel;
+            event_start timestamp;
+            event_stop timestamp;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                rec := OLD;
+            ELSE
+                rec := NEW;
+            END IF;
+            -- Lịch đã bị xóa (cascade) thì start/stop là NULL
+            SELECT ce.start, ce.stop INTO event_start, event_stop
+            FROM calendar_event ce
+            WHERE ce.id = rec.event_id;
+            PERFORM pg_notify('calendar_event_staff_changed', json_build_object(
+                'op', TG_OP,
+                'event_id', rec.event_id,
+                'employee_id', rec.employee_id,
+                'start', event_start,
+                'stop', event_stop
+            )::text);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+
+
+def downgrade() -> None:
+    op.execute("""
+        CREATE OR REPLACE FUNCTION api_notify_calendar_event_changed() RETURNS trigger AS $$
+        DECLARE
+            rec calendar_event;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                rec := OLD;
+            ELSE
+                rec := NEW;
+            END IF;
+            PERFORM pg_notify('calendar_event_changed', json_build_object(
+                'op', TG_OP,
+                'id', rec.id,
+                'partner_id', rec.partner_id,
+                'old_partner_id', CASE WHEN TG_OP = 'UPDATE' THEN OLD.partner_id END,
+                'cleaning_state', rec.cleaning_state,
+                'payment_status', rec.payment_status,
+                'write_date', rec.write_date
+            )::text);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION api_notify_calendar_event_staff_changed() RETURNS trigger AS $$
+        DECLARE
+            rec calendar_event_staff_rel;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                rec := OLD;
+            ELSE
+                rec := NEW;
+            END IF;
+            PERFORM pg_notify('calendar_event_staff_changed', json_build_object(
+                'op', TG_OP,
+                'event_id', rec.event_id,
+                'employee_id', rec.employee_id
+            )::text);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
@@ -0,0 +1,21 @@
+import os
+
+# Settings bắt buộc để import app, test không kết nối Postgres/Odoo thật
+os.environ.setdefault("POSTGRES_DATABASE_URL", "postgresql://test@localhost/test")
+os.environ.setdefault("ODOO_URL", "http://localhost:8069")
+os.environ.setdefault("ODOO_TOKEN", "test")
+os.environ.setdefault("TOKEN_PREFIX", "test")
+os.environ.setdefault("PORTAL_KEY", "test")
+
+import fakeredis.aioredis  # noqa: E402
+import pytest  # noqa: E402
+
+from app.utils.redis_client import redis_client  # noqa: E402
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """redis_client dùng fakeredis (có Lua) thay cho Redis thật"""
+    client = fakeredis.aioredis.FakeRedis()
+    monkeypatch.setattr(redis_client, "redis_client", client)
+    return client
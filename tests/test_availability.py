@@ -0,0 +1,253 @@
+import asyncio
+from datetime import date, datetime
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.api.v1.endpoints.booking import booking_availability
+from app.api.v1.endpoints.booking.booking_availability import (
+    MonthAvailability,
+    SLOTS_PER_DAY,
+    compute_free_staff,
+)
+from app.api.v1.endpoints.employee import employee_service
+from app.api.v1.endpoints.employee.employee_service import EmployeeService
+from app.services import availability_engine as engine_module
+from app.services.availability_engine import (
+    AvailabilityEngine,
+    AvailabilityUnavailable,
+    EmployeeSchedule,
+)
+from app.utils.erp_db import PostgresDB
+
+CLEANING = 5
+EMPLOYEES = [
+    {'categ_id': CLEANING, 'id': 1, 'name': "An"},
+    {'categ_id': CLEANING, 'id': 2, 'name': "Bình"},
+    {'categ_id': 9, 'id': 3, 'name': "Chi"},
+]
+
+
+def event(event_id, employee_id, start, stop):
+    return {'id': event_id, 'employee_id': employee_id, 'start': start, 'stop': stop}
+
+
+def free_ids(engine, start, stop):
+    return [employee['id'] for employee in engine.available_employees(CLEANING, start, stop)]
+
+
+@pytest.fixture
+def engine():
+    engine = AvailabilityEngine()
+    engine.load([
+        event(10, 1, datetime(2025, 3, 10, 2), datetime(2025, 3, 10, 5)),
+        event(11, 1, datetime(2025, 3, 10, 8), datetime(2025, 3, 10, 9)),
+        event(12, 2, datetime(2025, 3, 10, 1), datetime(2025, 3, 10, 12)),
+    ], EMPLOYEES)
+    return engine
+
+
+@pytest.mark.parametrize("start, stop, free", [
+    (0, 2, True),  # kết thúc đúng lúc lịch bắt đầu
+    (5, 8, True),  # bắt đầu đúng lúc lịch kết thúc, kết thúc đúng lúc lịch sau bắt đầu
+    (4, 6, False),
+    (1, 3, False),
+    (3, 4, False),  # nằm trong lịch
+    (0, 10, False),  # bao trùm lịch
+    (9, 11, True),
+])
+def test_schedule_overlap_boundaries(start, stop, free):
+    schedule = EmployeeSchedule.from_intervals([(2, 5, 1), (8, 9, 2)])
+
+    assert schedule.is_free(start, stop) is free
+
+
+def test_schedule_long_event_blocks_after_later_short_ones():
+    # Lịch dài bắt đầu sớm vẫn chặn khung giờ sau các lịch ngắn (nhờ max stop của tiền tố)
+    schedule = EmployeeSchedule.from_intervals([(0, 20, 1), (2, 3, 2), (4, 5, 3)])
+
+    assert not schedule.is_free(10, 12)
+    schedule.remove(1)
+    assert schedule.is_free(10, 12)
+    schedule.add(11, 13, 4)
+    assert not schedule.is_free(10, 12)
+
+
+def test_available_employees_for_category(engine):
+    assert free_ids(engine, datetime(2025, 3, 10, 5), datetime(2025, 3, 10, 8)) == [1]
+    assert free_ids(engine, datetime(2025, 3, 10, 12), datetime(2025, 3, 10, 14)) == [1, 2]
+    assert free_ids(engine, datetime(2025, 3, 10, 4), datetime(2025, 3, 10, 6)) == []
+    assert engine.category_employee_ids(CLEANING) == [1, 2]
+
+
+def test_apply_and_remove_event(engine):
+    engine.apply_event(11, datetime(2025, 3, 10, 12), datetime(2025, 3, 10, 13), [2])
+
+    assert free_ids(engine, datetime(2025, 3, 10, 8), datetime(2025, 3, 10, 9)) == [1]
+    assert free_ids(engine, datetime(2025, 3, 10, 12), datetime(2025, 3, 10, 14)) == [1]
+
+    engine.remove_event(12)
+    engine.remove_event(11)
+    assert free_ids(engine, datetime(2025, 3, 10, 5), datetime(2025, 3, 10, 14)) == [1, 2]
+
+
+def test_schedule_refresh_applies_database_rows(engine, monkeypatch):
+    async def execute_query(query, params=None):
+        assert query == engine_module.EVENT_REFRESH_QUERY
+        assert sorted(params[0]) == [10, 12, 13]
+        return [
+            # Lịch 10 bị hủy, lịch 13 mới cho nhân viên 2, lịch 12 không còn trong DB
+            {'id': 10, 'start': datetime(2025, 3, 10, 2), 'stop': datetime(2025, 3, 10, 5),
+             'active': True, 'cleaning_state': 'cancel', 'employee_ids': [1]},
+            {'id': 13, 'start': datetime(2025, 3, 10, 14), 'stop': datetime(2025, 3, 10, 16),
+             'active': True, 'cleaning_state': None, 'employee_ids': [2]},
+        ]
+
+    async def scenario():
+        engine.schedule_refresh([10, 12])
+        engine.schedule_refresh([13])
+        await engine._flush_task
+
+    monkeypatch.setattr(engine_module, "AVAILABILITY_FLUSH_DELAY", 0)
+    monkeypatch.setattr(PostgresDB, "execute_query", staticmethod(execute_query))
+    asyncio.run(scenario())
+
+    assert free_ids(engine, datetime(2025, 3, 10, 2), datetime(2025, 3, 10, 5)) == [1, 2]
+    assert free_ids(engine, datetime(2025, 3, 10, 15), datetime(2025, 3, 10, 16)) == [1]
+
+
+def relation(table_name):
+    return {'table_name': table_name, 'employee_column': 'employee_id', 'category_column': 'category_id'}
+
+
+@pytest.mark.parametrize("relations, table_name", [
+    ([relation("hr_employee_service_category_rel")], "hr_employee_service_category_rel"),
+    ([relation("other_rel"), relation("hr_employee_product_category_rel")], "hr_employee_product_category_rel"),
+])
+def test_employee_category_relation_from_catalog(monkeypatch, relations, table_name):
+    async def execute_query(query, params=None):
+        return relations
+
+    monkeypatch.setattr(PostgresDB, "execute_query", staticmethod(execute_query))
+    query = asyncio.run(AvailabilityEngine._employee_category_query())
+
+    assert f'JOIN "{table_name}" rel ON rel."employee_id" = he.id' in query
+    assert 'rel."category_id" AS categ_id' in query
+
+
+@pytest.mark.parametrize("relations", [[], [relation("a_rel"), relation("b_rel")]])
+def test_unknown_employee_category_relation(monkeypatch, relations):
+    async def execute_query(query, params=None):
+        return relations
+
+    monkeypatch.setattr(PostgresDB, "execute_query", staticmethod(execute_query))
+
+    with pytest.raises(AvailabilityUnavailable):
+        asyncio.run(AvailabilityEngine().ensure_loaded())
+
+
+def test_employee_available_falls_back_to_odoo(monkeypatch):
+    calls = []
+
+    async def ensure_loaded():
+        raise AvailabilityUnavailable("relation does not exist")
+
+    async def call_method_not_record(**kwargs):
+        calls.append(kwargs)
+        return [{'id': 1, 'name': "An"}]
+
+    monkeypatch.setattr(employee_service.availability_engine, "ensure_loaded", ensure_loaded)
+    monkeypatch.setattr(employee_service.odoo, "call_method_not_record", call_method_not_record)
+    result = asyncio.run(EmployeeService.get_employee_available(
+        CLEANING, SimpleNamespace(uid=4), start=datetime(2025, 3, 10, 9), appointment_duration=2,
+    ))
+
+    assert result == {'success': True, 'data': [{'id': 1, 'name': "An"}]}
+    assert calls[0]['method'] == 'get_available_employee_api'
+
+
+def test_compute_free_staff_boundaries():
+    # 2 nhân viên, 2 ngày, khung 7 giờ và 9 giờ, thời lượng 2 giờ (ô 30 phút)
+    free = compute_free_staff(
+        employee_index=np.array([0, 1]),
+        start_slots=np.array([18, 14]),  # nhân viên 0 bận 9:00-10:00 ngày 1, nhân viên 1 bận 7:00-9:00 ngày 1
+        stop_slots=np.array([20, 18]),
+        employee_count=2, day_count=2, hours=[7, 9], duration=2,
+    )
+
+    # 7:00-9:00 ngày 1: nhân viên 0 rảnh (lịch bắt đầu đúng 9:00), nhân viên 1 bận
+    # 9:00-11:00 ngày 1: nhân viên 1 rảnh (lịch kết thúc đúng 9:00), nhân viên 0 bận
+    assert free.tolist() == [[1, 1], [2, 2]]
+
+
+def test_compute_free_staff_window_past_midnight_of_last_day():
+    day_count = 2
+    next_day = day_count * SLOTS_PER_DAY  # 0:00 ngày đầu tháng sau
+    free = compute_free_staff(
+        employee_index=np.array([0]), start_slots=np.array([next_day]), stop_slots=np.array([next_day + 2]),
+        employee_count=1, day_count=day_count, hours=[19, 22], duration=3,
+    )
+
+    assert free.tolist() == [[1, 1], [1, 0]]
+
+
+@pytest.fixture
+def month_engine(monkeypatch):
+    engine = AvailabilityEngine()
+    engine.load([], EMPLOYEES)
+    monkeypatch.setattr(booking_availability, "availability_engine", engine)
+    return engine
+
+
+def test_month_free_staff_edges(month_engine, monkeypatch):
+    # Giờ UTC như Odoo lưu, giờ Việt Nam = UTC + 7
+    rows = [
+        # Lịch tháng trước kết thúc đúng 7:00 ngày 1/3: không chặn khung 7 giờ
+        {'employee_id': 1, 'start': datetime(2025, 2, 28, 20), 'stop': datetime(2025, 3, 1, 0)},
+        # Kết thúc 7:30 ngày 1/3: chặn khung 7 giờ của nhân viên 2
+        {'employee_id': 2, 'start': datetime(2025, 2, 28, 20), 'stop': datetime(2025, 3, 1, 0, 30)},
+        # 0:00-2:00 ngày 1/4: chặn khung 19 giờ 31/3 kéo qua nửa đêm
+        {'employee_id': 1, 'start': datetime(2025, 3, 31, 17), 'stop': datetime(2025, 3, 31, 19)},
+    ]
+
+    async def execute_query(query, params=None):
+        assert params[1] == datetime(2025, 2, 28, 17)
+        assert params[3] == [1, 2]
+        return rows
+
+    monkeypatch.setattr(PostgresDB, "execute_query", staticmethod(execute_query))
+    data = asyncio.run(MonthAvailability._load_free_staff(CLEANING, date(2025, 3, 1), 6))
+    free_staff = data['free_staff']
+
+    assert data['employee_count'] == 2
+    assert len(free_staff) == 31
+    assert free_staff[0][0] == 1  # 1/3 7 giờ
+    assert free_staff[0][1] == 2  # 1/3 8 giờ
+    assert free_staff[30][-1] == 1  # 31/3 19 giờ
+    assert free_staff[30][-2] == 2  # 31/3 18 giờ, kết thúc đúng 0:00 lúc lịch bắt đầu
+    assert free_staff[30][0] == 2
+
+
+def test_month_without_index_is_unavailable(monkeypatch):
+    engine = AvailabilityEngine()
+
+    async def execute_query(query, params=None):
+        return []
+
+    monkeypatch.setattr(booking_availability, "availability_engine", engine)
+    monkeypatch.setattr(PostgresDB, "execute_query", staticmethod(execute_query))
+
+    with pytest.raises(AvailabilityUnavailable):
+        asyncio.run(MonthAvailability._load_free_staff(CLEANING, date(2025, 3, 1), 2))
+
+
+@pytest.mark.parametrize("start, stop, months", [
+    ("2025-03-10 02:00:00", "2025-03-10 05:00:00", {date(2025, 3, 1)}),
+    # 0:00 ngày 1/3 giờ Việt Nam còn thuộc cache tháng 2 (tính thêm ngày đầu tháng sau)
+    ("2025-02-28 17:00:00", "2025-02-28 19:00:00", {date(2025, 2, 1), date(2025, 3, 1)}),
+    ("2025-01-31 16:00:00", "2025-03-01 02:00:00", {date(2025, 1, 1), date(2025, 2, 1), date(2025, 3, 1)}),
+    ("2024-12-31 18:00:00", None, {date(2024, 12, 1), date(2025, 1, 1)}),
+])
+def test_affected_months(start, stop, months):
+    assert MonthAvailability.affected_months(start, stop) == months
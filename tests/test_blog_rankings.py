@@ -0,0 +1,106 @@
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.v1.endpoints.blog import blog_rankings, blog_visits
+from app.main import app
+from app.utils.erp_db import PostgresDB
+
+POSTS = {
+    1: {'id': 1, 'title': "Bài 1", 'visits': 5},
+    2: {'id': 2, 'title': "Bài 2", 'visits': 50},
+    3: {'id': 3, 'title': "Bài 3", 'visits': 20},
+}
+
+
+@pytest.fixture
+def client(fake_redis, monkeypatch):
+    queries = []
+
+    async def execute_query(query, params=None):
+        queries.append(query)
+        if query in (blog_rankings.POPULAR_ROWS_QUERY, blog_rankings.TRENDING_ROWS_QUERY):
+            return [dict(POSTS[post_id]) for post_id in params[0] if post_id in POSTS]
+        if "AS write_date, COUNT(*) AS total" in query:
+            return [{'name': 'blog_post', 'write_date': None, 'total': len(POSTS)}]
+        raise AssertionError(f"Unexpected query: {query}")
+
+    monkeypatch.setattr(PostgresDB, "execute_query", staticmethod(execute_query))
+    client = TestClient(app)
+    client.queries = queries
+    return client
+
+
+@pytest.fixture
+def rankings(fake_redis):
+    async def seed():
+        now = time.time()
+        await fake_redis.zadd(blog_rankings.POPULAR_KEY, {"1": 5, "2": 50, "3": 20})
+        await fake_redis.zadd(blog_rankings.TRENDING_KEY, {"1": 9.0, "2": 1.0, "3": 4.0})
+        await blog_rankings.redis_client.set(blog_rankings.TRENDING_EPOCH_KEY, now)
+        await blog_rankings.redis_client.set(blog_rankings.REFRESHED_AT_KEY, now)
+
+    return seed
+
+
+def test_popular_served_from_ranking(client, rankings):
+    asyncio.run(rankings())
+    response = client.get("/blog/posts/popular", params={"limit": 2})
+
+    assert response.status_code == 200
+    assert [post['id'] for post in response.json()['data']] == [2, 3]
+    assert blog_rankings.POPULAR_ROWS_QUERY in client.queries
+
+
+def test_trending_served_from_ranking(client, rankings):
+    asyncio.run(rankings())
+    response = client.get("/blog/posts/trending", params={"days": 7, "limit": 3})
+
+    assert response.status_code == 200
+    data = response.json()['data']
+    assert [post['id'] for post in data] == [1, 3, 2]
+    assert data[0]['trending_score'] == pytest.approx(9.0, rel=1e-3)
+    assert blog_rankings.TRENDING_ROWS_QUERY in client.queries
+
+
+def test_ranking_etag_changes_after_visit_flush(client, rankings):
+    asyncio.run(rankings())
+    asyncio.run(blog_rankings.BlogRankings._bump_version())
+    etag = client.get("/blog/posts/popular").headers["etag"]
+
+    assert client.get("/blog/posts/popular", headers={"If-None-Match": etag}).status_code == 304
+
+    asyncio.run(blog_rankings.BlogRankings.on_visits_flushed({1: 100}))
+    response = client.get("/blog/posts/popular", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert [post['id'] for post in response.json()['data']] == [1, 2, 3]
+
+
+def test_ranking_without_version_is_never_304(client):
+    etag = client.get("/blog/stats/categories").headers.get("etag")
+
+    assert etag is not None
+    assert client.get("/blog/stats/categories", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_flush_does_not_release_lock_taken_by_another_worker(fake_redis, monkeypatch):
+    lock_key = blog_rankings.BLOG_VISITS_FLUSH_LOCK_KEY
+
+    async def execute_query(query, params=None):
+        # Lô ghi lâu hơn TTL: khóa hết hạn và worker khác giữ khóa trước khi flush xong
+        await fake_redis.delete(lock_key)
+        await blog_rankings.redis_client.set(lock_key, "other-worker")
+        return []
+
+    async def run():
+        await blog_rankings.redis_client.hincrby(blog_visits.BLOG_VISITS_PENDING_KEY, "1", 3)
+        await blog_visits.BlogVisitCounter.flush()
+        return await blog_rankings.redis_client.get(lock_key)
+
+    monkeypatch.setattr(PostgresDB, "execute_query", staticmethod(execute_query))
+    monkeypatch.setattr(blog_visits, "flush_listeners", [])
+
+    assert asyncio.run(run()) == "other-worker"
@@ -0,0 +1,23 @@
+from datetime import date
+
+import pytest
+
+from app.services.cleaning_dates import generate_cleaning_dates, tet_date
+
+
+@pytest.mark.parametrize("year, expected", [
+    (2023, date(2023, 1, 22)),
+    (2024, date(2024, 2, 10)),
+    (2025, date(2025, 1, 29)),
+    (2026, date(2026, 2, 17)),
+    (2030, date(2030, 2, 2)),  # giờ Việt Nam sớm hơn Trung Quốc một ngày
+    (2034, date(2034, 2, 19)),  # năm 2033 nhuận tháng 11
+])
+def test_tet_date(year, expected):
+    assert tet_date(year) == expected
+
+
+def test_exclude_holidays_skips_tet():
+    dates = generate_cleaning_dates([1], date(2026, 2, 1), 1, exclude_holidays=True)
+
+    assert [item['date'] for item in dates] == ['2026-02-03', '2026-02-10', '2026-02-24']
@@ -0,0 +1,74 @@
+import pytest
+from fastapi import Depends, FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from app.main import http_exception_handler
+from app.utils import conditional
+from app.utils.conditional import conditional_get
+
+LAST_MODIFIED = 1700000000.0
+
+
+@pytest.fixture
+def client(monkeypatch):
+    async def get_table_state(tables):
+        return {'state': "product_category:2023-11-14T22:13:20:3", 'last_modified': LAST_MODIFIED}
+
+    monkeypatch.setattr(conditional, "get_table_state", get_table_state)
+
+    app = FastAPI()
+    app.add_exception_handler(HTTPException, http_exception_handler)
+
+    @app.get("/items")
+    async def items(_conditional=Depends(conditional_get("product_category"))):
+        return {"success": True, "data": [1, 2, 3]}
+
+    @app.get("/missing")
+    async def missing():
+        raise HTTPException(status_code=404, detail="Không tìm thấy")
+
+    return TestClient(app)
+
+
+def test_first_request_returns_validators(client):
+    response = client.get("/items")
+
+    assert response.status_code == 200
+    assert response.json() == {"success": True, "data": [1, 2, 3]}
+    assert response.headers["etag"].startswith('W/"')
+    assert response.headers["cache-control"] == "no-cache"
+    assert response.headers["last-modified"] == "Tue, 14 Nov 2023 22:13:20 GMT"
+
+
+def test_if_none_match_returns_empty_304_with_headers(client):
+    etag = client.get("/items").headers["etag"]
+
+    response = client.get("/items", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert "content-type" not in response.headers
+    assert response.headers["etag"] == etag
+    assert response.headers["cache-control"] == "no-cache"
+    assert response.headers["last-modified"] == "Tue, 14 Nov 2023 22:13:20 GMT"
+
+
+def test_if_modified_since_returns_304(client):
+    response = client.get("/items", headers={"If-Modified-Since": "Tue, 14 Nov 2023 22:13:20 GMT"})
+
+    assert response.status_code == 304
+    assert response.content == b""
+
+
+def test_stale_etag_returns_full_response(client):
+    response = client.get("/items", headers={"If-None-Match": 'W/"stale"'})
+
+    assert response.status_code == 200
+    assert response.json()["data"] == [1, 2, 3]
+
+
+def test_other_http_errors_keep_json_body(client):
+    response = client.get("/missing")
+
+    assert response.status_code == 404
+    assert response.json() == {"message": "Không tìm thấy"}
@@ -0,0 +1,92 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.utils import idempotency
+from app.utils.idempotency import run_idempotent
+from app.utils.redis_client import redis_client
+
+USER = SimpleNamespace(partner_id=7)
+KEY = "booking-create-0001"
+STORAGE_KEY = f"{idempotency.IDEMPOTENCY_PREFIX}:booking:{USER.partner_id}:{KEY}"
+
+
+class Handler:
+    """Handler giả đếm số lần được gọi"""
+
+    def __init__(self, response=None, error=None):
+        self.response = response
+        self.error = error
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return self.response
+
+
+def run(payload, handler, **kwargs):
+    return asyncio.run(run_idempotent("booking", KEY, USER, payload, handler, **kwargs))
+
+
+def test_replays_stored_response(fake_redis):
+    handler = Handler({'success': True, 'data': {'id': 1}})
+
+    assert run({'start': "2025-03-01"}, handler) == {'success': True, 'data': {'id': 1}}
+    assert run({'start': "2025-03-01"}, handler) == {'success': True, 'data': {'id': 1}}
+    assert handler.calls == 1
+
+
+def test_same_key_with_other_payload_is_422(fake_redis):
+    run({'start': "2025-03-01"}, Handler({'success': True}))
+
+    with pytest.raises(HTTPException) as exc_info:
+        run({'start': "2025-03-02"}, Handler({'success': True}))
+
+    assert exc_info.value.status_code == 422
+
+
+def test_pending_request_past_wait_deadline_is_409(fake_redis, monkeypatch):
+    monkeypatch.setattr(idempotency, "IDEMPOTENCY_WAIT_TIMEOUT", 0)
+    payload = {'start': "2025-03-01"}
+    asyncio.run(redis_client.set(
+        STORAGE_KEY,
+        {'state': idempotency.STATE_PENDING, 'fingerprint': idempotency._fingerprint(payload)},
+    ))
+    handler = Handler({'success': True})
+
+    with pytest.raises(HTTPException) as exc_info:
+        run(payload, handler)
+
+    assert exc_info.value.status_code == 409
+    assert handler.calls == 0
+
+
+def test_handler_error_releases_key(fake_redis):
+    with pytest.raises(RuntimeError):
+        run({'start': "2025-03-01"}, Handler(error=RuntimeError("Odoo lỗi")))
+
+    assert asyncio.run(redis_client.get(STORAGE_KEY)) is None
+    handler = Handler({'success': True})
+    assert run({'start': "2025-03-01"}, handler) == {'success': True}
+    assert handler.calls == 1
+
+
+def test_cancelled_handler_keeps_pending_key(fake_redis):
+    with pytest.raises(asyncio.CancelledError):
+        run({'start': "2025-03-01"}, Handler(error=asyncio.CancelledError()))
+
+    assert asyncio.run(redis_client.get(STORAGE_KEY))['state'] == idempotency.STATE_PENDING
+
+
+def test_rejected_response_is_not_stored(fake_redis):
+    handler = Handler({'success': False})
+
+    run({'start': "2025-03-01"}, handler, store_if=lambda response: response['success'])
+    run({'start': "2025-03-01"}, handler, store_if=lambda response: response['success'])
+
+    assert handler.calls == 2
+    assert asyncio.run(redis_client.get(STORAGE_KEY)) is None
@@ -0,0 +1,134 @@
+import asyncio
+import base64
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app.api.deps import get_current_user
+from app.api.v1.endpoints.booking_contract.booking_contract_service import (
+    BookingContractService,
+    decode_keyset_cursor,
+    encode_keyset_cursor,
+)
+from app.main import app
+from app.utils.erp_db import PostgresDB
+
+USER = SimpleNamespace(partner_id=7, uid=4, odoo_token="token")
+# Nhiều buổi cùng ngày để trang cắt giữa một ngày, id không theo thứ tự ngày
+SCHEDULES = [
+    {'id': record_id, 'date_cleaning_value': date(2025, 3, 1) + timedelta(days=day)}
+    for record_id, day in [(5, 0), (2, 0), (9, 0), (1, 1), (7, 2), (3, 2), (8, 2), (4, 3), (6, 5)]
+]
+CONTRACTS = [
+    {'id': record_id, 'start_date_value': date(2025, 1, 1) + timedelta(days=day), 'state': 'confirm'}
+    for record_id, day in [(11, 0), (12, 3), (13, 3), (14, 3), (15, 7), (16, 9), (17, 9)]
+]
+
+
+def b64(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+@pytest.fixture
+def database(monkeypatch):
+    """Postgres giả: lọc theo cursor, sắp xếp và LIMIT như câu SQL keyset"""
+    async def execute_query(query, params=None):
+        if "SELECT id FROM booking_contract" in query:
+            return [{'id': params[0]}]
+        if "WITH page AS" in query:
+            rows = sorted(CONTRACTS, key=lambda row: (row['start_date_value'], row['id']), reverse=True)
+            if "(bc.start_date, bc.id) <" in query:
+                before = (params[-5], params[-4])
+                rows = [row for row in rows if (row['start_date_value'], row['id']) < before]
+            limit, offset = params[-2], params[-1]
+            return rows[offset:offset + limit]
+        if "FROM schedule_booking_calendar sbc" in query:
+            rows = sorted(SCHEDULES, key=lambda row: (row['date_cleaning_value'], row['id']))
+            if "(sbc.date_cleaning, sbc.id) >" in query:
+                after = (params[-3], params[-2])
+                rows = [row for row in rows if (row['date_cleaning_value'], row['id']) > after]
+            return [{**row, 'date_cleaning': row['date_cleaning_value'].isoformat()} for row in rows[:params[-1]]]
+        if "GROUP BY bc.state" in query:
+            return [{'state': 'confirm', 'total': len(CONTRACTS)}]
+        raise AssertionError(f"Unexpected query: {query}")
+
+    monkeypatch.setattr(PostgresDB, "execute_query", staticmethod(execute_query))
+
+
+def test_cursor_round_trip():
+    cursor = encode_keyset_cursor(date(2025, 3, 1), 42)
+
+    assert "=" not in cursor
+    assert decode_keyset_cursor(cursor) == (date(2025, 3, 1), 42)
+
+
+@pytest.mark.parametrize("cursor", [
+    "not-a-cursor!",
+    "",
+    b64(b"not json"),
+    b64(b"\xff\xfe"),
+    b64(b"42"),
+    b64(b'["2025-03-01"]'),
+    b64(b'["2025-03-01", 1, 2]'),
+    b64(b'["2025-13-01", 1]'),
+    b64(b'[20250301, 1]'),
+    b64(b'["2025-03-01", "abc"]'),
+    b64(b'["2025-03-01", null]'),
+    b64(b'{"a": 1}'),
+    encode_keyset_cursor(date(2025, 3, 1), 42)[:-3],
+])
+def test_invalid_cursor_is_400(cursor):
+    with pytest.raises(HTTPException) as exc_info:
+        decode_keyset_cursor(cursor)
+
+    assert exc_info.value.status_code == 400
+
+
+def test_tampered_cursor_over_http_is_400(database):
+    app.dependency_overrides[get_current_user] = lambda: USER
+    try:
+        response = TestClient(app).get("/booking-contract/1/schedules", params={'cursor': b64(b'["x", 1]')})
+    finally:
+        app.dependency_overrides.pop(get_current_user)
+
+    assert response.status_code == 400
+    assert response.json()['message'] == "Cursor không hợp lệ"
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 4, 9, 10])
+def test_schedule_pages_stitch_without_gaps(database, limit):
+    async def all_pages():
+        ids, cursor, pages = [], None, 0
+        while True:
+            schedules, cursor = await BookingContractService._get_schedules_page(1, limit, cursor=cursor)
+            assert len(schedules) <= limit
+            ids.extend(schedule['id'] for schedule in schedules)
+            pages += 1
+            if cursor is None:
+                return ids, pages
+
+    ids, pages = asyncio.run(all_pages())
+    expected = [row['id'] for row in sorted(SCHEDULES, key=lambda row: (row['date_cleaning_value'], row['id']))]
+
+    assert ids == expected
+    # limit + 1: trang cuối đủ limit dòng không sinh thêm một trang rỗng
+    assert pages == max(1, -(-len(SCHEDULES) // limit))
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 7, 8])
+def test_contract_pages_stitch_without_gaps(database, limit):
+    async def all_pages():
+        ids, cursor = [], None
+        while True:
+            result = await BookingContractService.get_booking_contracts_local(USER, limit=limit, cursor=cursor)
+            ids.extend(item['id'] for item in result['items'])
+            cursor = result['next_cursor']
+            if cursor is None:
+                return ids
+
+    expected = [row['id'] for row in sorted(CONTRACTS, key=lambda row: (row['start_date_value'], row['id']), reverse=True)]
+
+    assert asyncio.run(all_pages()) == expected
@@ -0,0 +1,91 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.v1.endpoints.booking import booking_service
+from app.api.v1.endpoints.booking.booking_service import BookingService
+from app.utils.erp_db import PostgresDB
+
+USER = SimpleNamespace(partner_id=7, uid=4)
+PACKAGE_DATES = {
+    (1, (0, 3)): ["2025-03-03", "2025-03-06"],
+    (2, (0, 3)): ["2025-03-03", "2025-03-06"],  # gói khác nhưng cùng ngày
+    (1, (1,)): ["2025-03-04"],
+}
+REQUEST = {
+    'candidates': [
+        {'package_id': 1, 'weekdays': [0, 3], 'start_hours': 8},
+        {'package_id': 2, 'weekdays': [0, 3], 'start_hours': 8},
+        {'package_id': 1, 'weekdays': [1], 'start_hours': 14},
+        {'package_id': 9, 'weekdays': [1], 'start_hours': 8},
+    ],
+    'appointment_duration': 3, 'categ_id': 5, 'contact_id': 11, 'employee_quantity': 1,
+}
+
+
+@pytest.fixture
+def odoo_calls(fake_redis, monkeypatch):
+    calls = []
+
+    async def calculate_cleaning_dates(weekdays, package_id, start_date=None, exclude_holidays=False):
+        dates = PACKAGE_DATES.get((package_id, tuple(weekdays)))
+        if dates is None:
+            return {'success': False, 'error': "Không tìm thấy gói định kỳ"}
+        return {'success': True, 'package_name': f"Gói {package_id}", 'duration_months': 1,
+                'data': [{'date': value} for value in dates]}
+
+    async def execute_query(query, params=None):
+        return [{'version': None}]
+
+    async def call_method_not_record(model, method, token=None, kwargs=None, **_):
+        calls.append((method, kwargs))
+        if method == booking_service.PERIODIC_PRICING_BATCH_METHOD:
+            if odoo_calls.batch_missing:
+                raise HTTPException(status_code=500, detail="Method not found")
+            return [{'success': True, 'amount_total': 100000 * len(item['dates'])} for item in kwargs['items']]
+        return {'success': True, 'amount_total': 100000 * len(kwargs['dates'])}
+
+    monkeypatch.setattr(BookingService, "calculate_cleaning_dates", staticmethod(calculate_cleaning_dates))
+    monkeypatch.setattr(PostgresDB, "execute_query", staticmethod(execute_query))
+    monkeypatch.setattr(booking_service.odoo, "call_method_not_record", call_method_not_record)
+    odoo_calls = SimpleNamespace(calls=calls, batch_missing=False)
+    return odoo_calls
+
+
+def price():
+    return asyncio.run(BookingService.calculate_periodic_pricing_batch(dict(REQUEST), USER))
+
+
+def test_candidates_priced_with_one_odoo_call(odoo_calls):
+    result = price()
+
+    assert len(odoo_calls.calls) == 1
+    method, kwargs = odoo_calls.calls[0]
+    assert method == booking_service.PERIODIC_PRICING_BATCH_METHOD
+    # Hai phương án trùng ngày/giờ chỉ báo giá một lần
+    assert [(item['dates'], item['start_hours']) for item in kwargs['items']] == [
+        (["2025-03-03", "2025-03-06"], 8), (["2025-03-04"], 14),
+    ]
+    assert all(item['partner_id'] == USER.partner_id for item in kwargs['items'])
+    assert [item['success'] for item in result] == [True, True, True, False]
+    assert [item.get('pricing', {}).get('amount_total') for item in result] == [200000, 200000, 100000, None]
+    assert result[3]['error'] == "Không tìm thấy gói định kỳ"
+
+
+def test_cached_candidates_skip_odoo(odoo_calls):
+    first = price()
+    second = price()
+
+    assert len(odoo_calls.calls) == 1
+    assert second == first
+
+
+def test_falls_back_to_one_call_per_candidate_without_batch_method(odoo_calls):
+    odoo_calls.batch_missing = True
+    result = price()
+
+    methods = [method for method, _ in odoo_calls.calls]
+    assert methods == [booking_service.PERIODIC_PRICING_BATCH_METHOD] + ['calculate_periodic_booking_price_api'] * 2
+    assert [item.get('pricing', {}).get('amount_total') for item in result] == [200000, 200000, 100000, None]
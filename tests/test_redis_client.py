@@ -0,0 +1,71 @@
+import asyncio
+
+from app.utils.redis_client import redis_client
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_pipeline_results_follow_logical_commands(fake_redis):
+    async def scenario():
+        await redis_client.set("existing", {'id': 1})
+        async with redis_client.pipeline() as pipe:
+            pipe.incr("counter", expiry=60)
+            pipe.incr("counter", expiry=60)
+            pipe.get("existing")
+            pipe.exists("missing")
+            pipe.set("new", ["a", "b"], expiry=30)
+            pipe.hset("hash", "field", {'x': 1})
+            pipe.hget("hash", "field")
+        return pipe.results, await fake_redis.ttl("counter"), await redis_client.get("new")
+
+    results, counter_ttl, new_value = run(scenario())
+
+    assert results == [1, 2, {'id': 1}, False, True, 1, {'x': 1}]
+    assert 0 < counter_ttl <= 60
+    assert new_value == ["a", "b"]
+
+
+def test_incr_keeps_ttl_of_existing_key(fake_redis):
+    async def scenario():
+        async with redis_client.pipeline() as pipe:
+            pipe.incr("counter", expiry=60)
+        await fake_redis.expire("counter", 10)
+        async with redis_client.pipeline() as pipe:
+            pipe.incr("counter", expiry=60)
+        return pipe.results, await fake_redis.ttl("counter")
+
+    results, ttl = run(scenario())
+
+    assert results == [2]
+    assert ttl <= 10
+
+
+def test_mset_and_mget(fake_redis):
+    async def scenario():
+        await redis_client.mset({'a': 1, 'b': {'x': "y"}}, expiry=30)
+        return await redis_client.mget(["a", "missing", "b"])
+
+    assert run(scenario()) == [1, None, {'x': "y"}]
+
+
+def test_delete_if_equals(fake_redis):
+    async def scenario():
+        await redis_client.set("otp", "123456")
+        mismatch = await redis_client.delete_if_equals("otp", "000000")
+        kept = await redis_client.get("otp")
+        match = await redis_client.delete_if_equals("otp", "123456")
+        missing = await redis_client.delete_if_equals("otp", "123456")
+        return mismatch, kept, match, missing
+
+    assert run(scenario()) == (False, "123456", True, None)
+
+
+def test_delete_if_equals_accepts_legacy_value(fake_redis):
+    async def scenario():
+        # Giá trị lưu trước khi có header serializer
+        await fake_redis.set("otp", b"123456")
+        return await redis_client.delete_if_equals("otp", "123456"), await fake_redis.exists("otp")
+
+    assert run(scenario()) == (True, 0)
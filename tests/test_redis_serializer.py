@@ -0,0 +1,75 @@
+import datetime
+import decimal
+import json
+
+import pytest
+
+from app.utils.redis_serializer import (
+    FLAG_ZLIB,
+    HEADER_MAGIC,
+    JsonSerializer,
+    MsgpackSerializer,
+    get_serializer,
+)
+
+VALUES = [
+    "Dọn dẹp nhà",
+    b"\x00\xc1raw",
+    42,
+    3.5,
+    True,
+    None,
+    [1, "hai", {'ba': 3}],
+    {'id': 1, 'name': "Gói tháng", 'tags': ["a", "b"], 'nested': {'x': None}},
+]
+
+
+@pytest.fixture(params=[JsonSerializer, MsgpackSerializer])
+def serializer(request):
+    return request.param()
+
+
+@pytest.mark.parametrize("value", VALUES)
+def test_round_trip(serializer, value):
+    raw = serializer.dumps(value)
+
+    assert raw[:1] == HEADER_MAGIC
+    assert serializer.loads(raw) == value
+
+
+def test_large_payload_is_compressed(serializer):
+    value = {'rows': [{'id': index, 'name': "Nhân viên"} for index in range(500)]}
+    raw = serializer.dumps(value)
+
+    assert raw[2:3] == FLAG_ZLIB
+    assert serializer.loads(raw) == value
+
+
+def test_asyncpg_types_are_converted(serializer):
+    raw = serializer.dumps({'price': decimal.Decimal("150000.50"), 'day': datetime.date(2025, 3, 1)})
+
+    assert serializer.loads(raw) == {'price': 150000.5, 'day': "2025-03-01"}
+
+
+@pytest.mark.parametrize("legacy, expected", [
+    (json.dumps({'id': 1, 'name': "Bài viết"}).encode(), {'id': 1, 'name': "Bài viết"}),
+    (b"[1, 2, 3]", [1, 2, 3]),
+    (b"123456", 123456),
+    (b"plain text", "plain text"),
+    ("chuỗi cũ", "chuỗi cũ"),
+    (b"\xff\xfe", b"\xff\xfe"),
+    (None, None),
+])
+def test_reads_legacy_values_without_header(serializer, legacy, expected):
+    assert serializer.loads(legacy) == expected
+
+
+def test_reads_values_written_by_other_format():
+    value = {'id': 1, 'items': [1, 2]}
+
+    assert JsonSerializer().loads(MsgpackSerializer().dumps(value)) == value
+    assert MsgpackSerializer().loads(JsonSerializer().dumps(value)) == value
+
+
+def test_unknown_serializer_falls_back_to_json():
+    assert isinstance(get_serializer("pickle"), JsonSerializer)